@@ -0,0 +1,462 @@
+#!/usr/bin/python
+# bench_style.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# The style checkers are in the parent directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+
+# The number of lines in each synthetic file at scale 1.
+base_lines = 20000
+# The number of lines of the small files that the startup of the checkers is measured on.
+startup_lines = 50
+# The time that each checker may take to start and check a small file, beyond the startup of the interpreter, in seconds.
+# It is about three times what the checkers take on an idle machine, which leaves room for the noise of shared CI runners.
+startup_budget = 0.3
+# The minimum number of runs of each command that --check-startup takes the median of.
+startup_check_runs = 9
+
+
+# Prints a help message. This is used when the --help option is given.
+# Accepts no parameters and has no return value.
+def print_help():
+	help_message = [
+		["Benchmark script for the style checkers."],
+		["Usage: bench_style [OPTION]..."],
+		["Times the individual checks and complete runs of check_code_style and check_content_style on the 'source' and 'data' directories, and on synthetic files."],
+		["This script should be run from the root of the repository."],
+		[],
+		["Options:"],
+		["", "-h", "--help", "Display this help message and exit."],
+		["", "-n", "--repeat [count]", "Runs each benchmark the specified number of times, and reports the fastest run. The default value is 3."],
+		["", "-s", "--scale [factor]", "Multiplies the size of the synthetic files. At scale 1, each file has about " + str(base_lines) + " lines."],
+		["", "-k", "--filter [text]", "Only runs the benchmarks whose name or corpus contains the specified text."],
+		["", "", "--no-real", "Does not benchmark the 'source' and 'data' directories."],
+		["", "", "--no-synthetic", "Does not benchmark the synthetic files."],
+		["", "-o", "--json [file]", "Writes the results to the specified JSON file."],
+		["", "", "--compare [file]", "Compares the results to an earlier JSON file, such as one created on another commit."],
+		["", "", "--no-startup", "Does not measure the startup of the checker scripts."],
+		["", "", "--check-startup", "Only measures the startup of the checker scripts, and exits with code 4 if any of them exceeds the budget of " + str(round(startup_budget * 1000)) + " ms beyond the startup of the interpreter. Each command is run at least " + str(startup_check_runs) + " times."],
+	]
+	for row in help_message:
+		print("{:<4} {:<2} {:<20} {:<}".format(*[*row, "", "", "", ""]).rstrip())
+
+
+# A class representing a set of files that the benchmarks are run on.
+# name: the name of the corpus
+# kind: either "source" or "data", depending on the checker that the files are meant for
+# files: the paths of the files
+class Corpus(object):
+
+	def __init__(self, name, kind, files):
+		self.name = name
+		self.kind = kind
+		self.files = files
+		# The lines of each file, with their line separators.
+		self.contents = []
+		for file in files:
+			with open(file, "r", newline='') as f:
+				self.contents.append(f.readlines())
+		self.lines = sum(len(contents) for contents in self.contents)
+		self.bytes = sum(os.path.getsize(file) for file in files)
+
+	# Gets the lines of each file without the line separators.
+	# Takes no parameters.
+	# Returns: a list of string lists
+	def stripped(self):
+		return [[line.removesuffix('\n').removesuffix('\r') for line in contents] for contents in self.contents]
+
+
+# A class representing a benchmark of a single check.
+# name: the name of the benchmark
+# kind: the kind of corpus that the benchmark is run on
+# prepare: a function creating the input of the check from a Corpus; its cost is not measured
+# run: a function running the check on the prepared input
+class Benchmark(object):
+
+	def __init__(self, name, kind, prepare, run):
+		self.name = name
+		self.kind = kind
+		self.prepare = prepare
+		self.run = run
+
+
+# Sanitizes the files of a corpus, and prepares the line segments the same way as check_local_format.
+# Parameters:
+# corpus: the Corpus
+# Returns: a list of (lines, sanitized lines, segmented lines) tuples, one for each file
+def sanitize_corpus(corpus):
+	prepared = []
+	for lines in corpus.stripped():
+		segmented_lines = code_style.sanitize(lines)[2]
+		prepared.append((lines, ["".join(segments) for segments in segmented_lines], segmented_lines))
+	return prepared
+
+
+# Runs check_regex_format on every line of the prepared files.
+# The memoized segment exclusions are cleared first, so that every run starts cold.
+# Parameters:
+# prepared: a list of lists of (line, segments) tuples
+# No return value.
+def run_regex_format(prepared):
+	code_style.is_excluded_segment.cache_clear()
+	for lines in prepared:
+		for (line_count, (line, segments)) in enumerate(lines, 1):
+			code_style.check_regex_format(line, segments, line_count)
+
+
+# Prepares the input of check_regex_format, removing the indentation like check_local_format.
+# Parameters:
+# corpus: the Corpus
+# Returns: a list of lists of (line, segments) tuples
+def prepare_regex_format(corpus):
+	prepared = []
+	for (lines, sanitized_lines, segmented_lines) in sanitize_corpus(corpus):
+		file_lines = []
+		for (line, segments) in zip(sanitized_lines, segmented_lines):
+			segments = list(segments)
+			if len(segments) > 0:
+				segments[0] = segments[0].lstrip()
+			file_lines.append((line.lstrip(), segments))
+		prepared.append(file_lines)
+	return prepared
+
+
+# Runs check_code_style.check_file on every file, without the result cache.
+# Parameters:
+# files: the paths of the files
+# No return value.
+def run_code_style(files):
+	code_style.is_excluded_segment.cache_clear()
+	for file in files:
+		code_style.check_file(file)
+
+
+# Prepares the input of check_with_regex: the text lines of every file for every check group.
+# Parameters:
+# corpus: the Corpus
+# rules: the compiled rules of the content style checker
+# Returns: a list of (check group, restricted contents) tuples
+def prepare_with_regex(corpus, rules):
+	prepared = []
+	for contents in corpus.stripped():
+		index = content_style.DataFileIndex(contents, rules)
+		for check_group in rules["regexChecks"]:
+			prepared.append((check_group, index.find_text_lines(check_group.excluded_nodes, check_group.exclude_comments, check_group.exclude_keywords)))
+	return prepared
+
+
+# Finds the text lines of every file for every check group, indexing each file once.
+# Parameters:
+# prepared: the lines of each file, without line separators
+# rules: the compiled rules of the content style checker
+# No return value.
+def run_text_lines(prepared, rules):
+	for contents in prepared:
+		index = content_style.DataFileIndex(contents, rules)
+		for check_group in rules["regexChecks"]:
+			index.find_text_lines(check_group.excluded_nodes, check_group.exclude_comments, check_group.exclude_keywords)
+
+
+# Creates the list of benchmarks.
+# Parameters:
+# rules: the compiled rules of the content style checker
+# Returns: a list of Benchmark objects
+def create_benchmarks(rules):
+	return [
+		Benchmark("sanitize", "source", Corpus.stripped,
+			lambda prepared: [code_style.sanitize(lines) for lines in prepared]),
+		Benchmark("check_regex_format", "source", prepare_regex_format, run_regex_format),
+		Benchmark("check_local_format", "source", sanitize_corpus,
+			lambda prepared: [code_style.check_local_format(sanitized_lines, segmented_lines) for (lines, sanitized_lines, segmented_lines) in prepared]),
+		Benchmark("check_include", "source",
+			lambda corpus: [(sanitized_lines, lines, file) for ((lines, sanitized_lines, segmented_lines), file) in zip(sanitize_corpus(corpus), corpus.files)],
+			lambda prepared: [code_style.check_include(*arguments) for arguments in prepared]),
+		Benchmark("check_copyright", "source",
+			lambda corpus: list(zip(corpus.stripped(), corpus.files)),
+			lambda prepared: [code_style.check_copyright(*arguments) for arguments in prepared]),
+		Benchmark("check_code_style", "source", lambda corpus: corpus.files, run_code_style),
+		Benchmark("check_copyright", "data", Corpus.stripped,
+			lambda prepared: [content_style.check_copyright(contents, False, rules) for contents in prepared]),
+		Benchmark("check_indentation", "data", Corpus.stripped,
+			lambda prepared: [content_style.check_indentation(contents, False, rules) for contents in prepared]),
+		Benchmark("find_text_lines", "data", Corpus.stripped, lambda prepared: run_text_lines(prepared, rules)),
+		Benchmark("check_with_regex", "data", lambda corpus: prepare_with_regex(corpus, rules),
+			lambda prepared: [content_style.check_with_regex(check_group, contents, False, rules) for (check_group, contents) in prepared]),
+		Benchmark("check_content_style", "data", lambda corpus: corpus.files,
+			lambda prepared: [content_style.check_content_style(file, False, rules) for file in prepared]),
+	]
+
+
+# Creates the corpora of the files in the repository.
+# Takes no parameters.
+# Returns: a list of Corpus objects
+def real_corpora():
+	corpora = []
+	source_files = sorted(glob.glob("source/**/*.cpp", recursive=True) + glob.glob("source/**/*.h", recursive=True))
+	if source_files:
+		corpora.append(Corpus("source", "source", source_files))
+	data_files = sorted(glob.glob("data/**/*.txt", recursive=True))
+	if data_files:
+		corpora.append(Corpus("data", "data", data_files))
+	return corpora
+
+
+# Writes the synthetic files to a directory and creates a corpus for each of them.
+# Parameters:
+# directory: the directory to write the files to
+# scale: the size multiplier of the files
+# Returns: a list of Corpus objects
+def synthetic_corpora(directory, scale):
+	corpora = []
+	for (kind, generators) in [("source", synthetic.source_generators), ("data", synthetic.data_generators)]:
+		for (generator, name) in generators:
+			path = os.path.join(directory, name)
+			with open(path, "w", newline='') as f:
+				f.write(generator(int(base_lines * scale)))
+			corpora.append(Corpus("synthetic " + name, kind, [path]))
+	return corpora
+
+
+# Runs a benchmark on a corpus.
+# Parameters:
+# benchmark: the Benchmark
+# corpus: the Corpus
+# repeat: the number of times the benchmark is run
+# Returns: a dictionary describing the fastest run
+def measure(benchmark, corpus, repeat):
+	prepared = benchmark.prepare(corpus)
+	best = None
+	for i in range(repeat):
+		start = time.perf_counter()
+		benchmark.run(prepared)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return {
+		"benchmark": benchmark.name,
+		"corpus": corpus.name,
+		"files": len(corpus.files),
+		"lines": corpus.lines,
+		"bytes": corpus.bytes,
+		"seconds": best,
+		"lines_per_second": corpus.lines / best if best > 0 else None,
+		"mb_per_second": corpus.bytes / 1e6 / best if best > 0 else None,
+	}
+
+
+# Measures the startup of the checker scripts, as the time it takes to run them on a small file.
+# Each command is run once before it is measured, so that the precompiled pattern bundles exist.
+# The median of the runs is used, since single runs of a process vary a lot more than the benchmarks do.
+# Parameters:
+# directory: the directory to write the small files to
+# repeat: the number of times each command is run
+# Returns: a list of dictionaries describing the median run of each command
+def measure_startup(directory, repeat):
+	utils = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	data_file = os.path.join(directory, "startup.txt")
+	source_file = os.path.join(directory, "Startup.cpp")
+	with open(data_file, "w", newline='') as f:
+		f.write(synthetic.huge_data(startup_lines))
+	with open(source_file, "w", newline='') as f:
+		f.write(synthetic.huge_source(startup_lines))
+	commands = [
+		("python", [sys.executable, "-c", "pass"]),
+		("check_content_style --help", [sys.executable, os.path.join(utils, "check_content_style.py"), "--help"]),
+		("check_content_style", [sys.executable, os.path.join(utils, "check_content_style.py"), "--no-cache", "--files", data_file]),
+		("check_code_style", [sys.executable, os.path.join(utils, "check_code_style.py"), "--no-cache", source_file]),
+	]
+	results = []
+	for (name, command) in commands:
+		runs = []
+		for i in range(repeat + 1):
+			start = time.perf_counter()
+			subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+			elapsed = time.perf_counter() - start
+			if i > 0:
+				runs.append(elapsed)
+		median = statistics.median(runs)
+		results.append({
+			"command": name,
+			"seconds": median,
+			# The time beyond the startup of the interpreter
+			"overhead": median - results[0]["seconds"] if results else 0.0
+		})
+	return results
+
+
+# Prints the startup measurements as a table.
+# Parameters:
+# startup: the list of startup dictionaries
+# No return value.
+def print_startup(startup):
+	row = "{:<30} {:>10} {:>10}"
+	print(row.format("Startup", "Seconds", "Overhead"))
+	for result in startup:
+		line = row.format(result["command"], "{:.4f}".format(result["seconds"]), "{:.4f}".format(result["overhead"]))
+		if result["overhead"] > startup_budget:
+			line += "   over budget"
+		print(line)
+
+
+# Prints the results as a table.
+# Parameters:
+# results: the list of result dictionaries
+# baseline: a dictionary of earlier results keyed by benchmark and corpus, or None
+# No return value.
+def print_results(results, baseline):
+	row = "{:<20} {:<26} {:>9} {:>10} {:>12} {:>9}"
+	header = row.format("Benchmark", "Corpus", "Lines", "Seconds", "Lines/s", "MB/s")
+	print(header + ("   Speedup" if baseline is not None else ""))
+	for result in results:
+		line = row.format(result["benchmark"], result["corpus"], result["lines"], "{:.4f}".format(result["seconds"]),
+			"{:.0f}".format(result["lines_per_second"] or 0), "{:.2f}".format(result["mb_per_second"] or 0))
+		if baseline is not None:
+			previous = baseline.get((result["benchmark"], result["corpus"]))
+			if previous is not None and result["seconds"] > 0:
+				line += "   {:>6.2f}x".format(previous["seconds"] / result["seconds"])
+		print(line)
+
+
+# Gets the commit that the benchmarks are run on.
+# Takes no parameters.
+# Returns: the hash of the current commit, or None if it is not available
+def current_commit():
+	try:
+		return run_git(["rev-parse", "HEAD"]).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+# Gets the value of a command line option, exiting with a usage error if it is missing or not valid.
+# Parameters:
+# index: the index of the value in the command line arguments, right after the option
+# convert: the function converting the value, such as int or float
+# Returns: the converted value
+def option_value(index, convert=str):
+	if index >= len(sys.argv):
+		print("Missing value of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+	try:
+		return convert(sys.argv[index])
+	except ValueError:
+		print("Invalid value '" + sys.argv[index] + "' of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+
+
+if __name__ == '__main__':
+	repeat = 3
+	scale = 1.0
+	name_filter = None
+	use_real = True
+	use_synthetic = True
+	json_file = None
+	compare_file = None
+	use_startup = True
+	check_startup = False
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-h" or arg == "--help":
+			print_help()
+			exit(0)
+		elif arg == "-n" or arg == "--repeat":
+			i += 1
+			repeat = max(1, option_value(i, int))
+		elif arg == "-s" or arg == "--scale":
+			i += 1
+			scale = option_value(i, float)
+		elif arg == "-k" or arg == "--filter":
+			i += 1
+			name_filter = option_value(i)
+		elif arg == "--no-real":
+			use_real = False
+		elif arg == "--no-synthetic":
+			use_synthetic = False
+		elif arg == "-o" or arg == "--json":
+			i += 1
+			json_file = option_value(i)
+		elif arg == "--compare":
+			i += 1
+			compare_file = option_value(i)
+		elif arg == "--no-startup":
+			use_startup = False
+		elif arg == "--check-startup":
+			check_startup = True
+		else:
+			print("Unknown option '" + arg + "'")
+			exit(3)
+		i += 1
+
+	# The checkers import the regex module, so they are only imported once the options are known to be valid.
+	import check_code_style as code_style
+	import check_content_style as content_style
+	from style_git import run_git
+
+	if check_startup:
+		with tempfile.TemporaryDirectory() as directory:
+			startup = measure_startup(directory, max(repeat, startup_check_runs))
+		print_startup(startup)
+		exit(4 if any(result["overhead"] > startup_budget for result in startup) else 0)
+
+	config = content_style.load_config("./utils/contentStyle.json")
+	if config is None:
+		exit(2)
+	rules = content_style.compile_rules(config["rules"])
+	code_style.compile_tables()
+
+	baseline = None
+	if compare_file is not None:
+		with open(compare_file, "r") as f:
+			baseline = {(result["benchmark"], result["corpus"]): result for result in json.load(f)["results"]}
+
+	results = []
+	startup = []
+	with tempfile.TemporaryDirectory() as directory:
+		if use_startup:
+			startup = measure_startup(directory, repeat)
+		corpora = (real_corpora() if use_real else []) + (synthetic_corpora(directory, scale) if use_synthetic else [])
+		for corpus in corpora:
+			for benchmark in create_benchmarks(rules):
+				if benchmark.kind != corpus.kind:
+					continue
+				if name_filter is not None and name_filter not in benchmark.name and name_filter not in corpus.name:
+					continue
+				results.append(measure(benchmark, corpus, repeat))
+
+	print_results(results, baseline)
+	if startup:
+		print()
+		print_startup(startup)
+
+	if json_file is not None:
+		with open(json_file, "w") as f:
+			json.dump({
+				"commit": current_commit(),
+				"python": platform.python_version(),
+				"repeat": repeat,
+				"scale": scale,
+				"results": results,
+				"startup": startup
+			}, f, indent="\t")
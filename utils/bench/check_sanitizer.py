@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# check_sanitizer.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+import os
+import random
+import sys
+
+import regex as re
+
+# The style checkers are in the parent directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import check_code_style as code_style
+import synthetic
+
+# Differential test of the sanitizer of check_code_style.
+# The sanitizer jumps between the characters that can change its state, instead of visiting every character.
+# This script keeps the original character loop as the reference, and checks that both return the same errors,
+# warnings and segments for the source files of the repository, for synthetic files, and for random lines.
+
+# The default number of random files.
+default_random_files = 2000
+# The pieces that the random lines are built from, which are the characters and sequences the sanitizer looks for.
+random_pieces = ["\"", "'", "\\", "/", "*", "//", "///", "//<", "/*", "*/", "R\"(", ")\"", "\"\"\"\"", "#", "#include ",
+	"#define ", " ", "\t", "a", "x = 1;", "(", ")", "{", "}"]
+
+
+# Prints a help message. This is used when the --help option is given.
+# Accepts no parameters and has no return value.
+def print_help():
+	help_message = [
+		["Differential test of the sanitizer of check_code_style."],
+		["Usage: check_sanitizer [OPTION]..."],
+		["Compares the sanitizer with the original implementation on the 'source' and 'tests' directories, on synthetic files and on random lines."],
+		["This script should be run from the root of the repository."],
+		[],
+		["Options:"],
+		["", "-h", "--help", "Display this help message and exit."],
+		["", "-n", "--random [count]", "Specifies the number of random files. The default value is " + str(default_random_files) + "."],
+		["", "", "--seed [value]", "Specifies the seed of the random files, as a non-negative integer. The default value is 0."],
+		[],
+		["Exit codes:"],
+		["", "0", "The sanitizers returned the same results for every file."],
+		["", "1", "The sanitizers returned different results for a file."],
+		["", "3", "An unknown option was passed via command line."],
+	]
+	for row in help_message:
+		print("{:<4} {:<2} {:<20} {:<}".format(*[*row, "", "", "", ""]).rstrip())
+
+
+# The original implementation of check_code_style.sanitize, which visits every character of the lines.
+# Parameters:
+# lines: the original contents of the file, without trailing line separators
+# skip_checks: whether to skip checks for formatting errors
+# Returns a tuple containing the errors, warnings and the sanitized line segments.
+def reference_sanitize(lines, skip_checks=False):
+	errors = []
+	warnings = []
+
+	is_multiline_comment = False
+	is_string = False
+	is_char = False
+	is_raw_string = False
+	is_raw_string_short = False
+	line_count = 0
+	header_found = False
+
+	line_segments = []
+
+	for line in lines:
+		line_count += 1
+		segments = []
+		is_escaped = False
+		# Checking for preprocessor text, except includes
+		if not is_string and not is_multiline_comment and not is_char and line.lstrip().startswith("#") and not line.lstrip().startswith("#include"):
+			line_segments.append(segments)
+			continue
+		# Start index is the beginning of the sequence to be tested
+		start_index = 0
+		# Looking for parts of the file that are not strings or comments
+		for i in range(len(line)):
+			char = line[i]
+			# Handling character escapes
+			if is_escaped:
+				is_escaped = False
+				continue
+			elif char == '\\':
+				is_escaped = True
+				continue
+			# Handling comments
+			first_two = line[i:i + 2]
+			if is_multiline_comment:
+				if first_two == "*/":
+					if not skip_checks:
+						# Checking for space after comment
+						if i > 0 and line[i - 1] != ' ' and line[i - 1] != '\t':
+							errors.append(code_style.Error(line[i - 1:i + 2], line_count,
+												"missing space before end of multiline comment"))
+					# End of comment
+					is_multiline_comment = False
+					i += 1
+					start_index = i + 1
+				continue
+			commentMatch = re.search(code_style.singleLineComment, line[i:i + 4])
+			if (not is_string and commentMatch):
+				segments.append(line[start_index:i].rstrip())
+				if not skip_checks:
+					cLen = commentMatch.end()
+					# Checking for space after comment
+					if len(line) > (i + cLen):
+						if re.search(code_style.after_comment, line[i + cLen:i + cLen + 1]):
+							errors.append(code_style.Error(line[i:i + cLen + 1], line_count,
+												"missing space after beginning of single-line comment"))
+				break
+			elif (not is_string) and first_two == "/*":
+				segments.append(line[start_index:i].rstrip())
+				is_multiline_comment = True
+				if not skip_checks:
+					if header_found and not (
+							line[i + 1:].count("*/") >= 1 and (line.endswith(")") or line.endswith("{"))):
+						errors.append(code_style.Error(line.lstrip(), line_count,
+											"multiline comments should only be used for the copyright header"))
+					# Checking for space after comment
+					if len(line) > i + 2 and line[i + 2] != ' ':
+						errors.append(code_style.Error(line[i:i + 3], line_count,
+											"missing space after beginning of multiline comment"))
+				header_found = True
+				continue
+			# Checking for strings (both standard and raw literals)
+			elif (not is_string) and char == "'":
+				if is_char:
+					start_index = i
+				else:
+					segments.append(line[start_index:i + 1])
+				is_char = not is_char
+			elif is_char:
+				continue
+			elif char == '"':
+				if line[i:i + 4] == "\"\"\"\"":
+					if is_raw_string:
+						start_index = i + 3
+					else:
+						segments.append(line[start_index:i + 1])
+					is_raw_string = not is_raw_string
+					is_string = not is_string
+				elif line[i - 1:i + 2] == "R\"(":
+					if is_raw_string:
+						continue
+					if is_raw_string_short:
+						continue
+					is_raw_string_short = True
+					is_string = True
+					segments.append(line[start_index:i + 1])
+				elif line[i - 1:i + 1] == ")\"" and is_raw_string_short:
+					is_raw_string_short = False
+					is_string = False
+					start_index = i
+				else:
+					if is_raw_string or is_raw_string_short:
+						continue
+					if is_string:
+						start_index = i
+					else:
+						segments.append(line[start_index:i + 1])
+					is_string = not is_string
+		else:
+			if (not is_multiline_comment) and (not is_char) and (not is_escaped) and (not is_string):
+				segments.append(line[start_index:])
+		line_segments.append(segments)
+	return errors, warnings, line_segments
+
+
+# Generates a random file from the pieces that the sanitizer looks for.
+# Parameters:
+# rng: the random number generator
+# Returns: the lines of the file, without line separators
+def random_file(rng):
+	return ["".join(rng.choice(random_pieces) for piece in range(rng.randint(0, 12))) for line in range(rng.randint(1, 20))]
+
+
+# Lists the files that the sanitizers are compared on.
+# Parameters:
+# random_files: the number of random files
+# seed: the seed of the random files
+# Returns: a list of (name, lines) tuples, where the lines have no line separators
+def find_inputs(random_files, seed):
+	inputs = []
+	for file in sorted(glob.glob("source/**/*.[ch]*", recursive=True) + glob.glob("tests/**/*.[ch]*", recursive=True)):
+		with open(file, "r", newline='') as f:
+			inputs.append((file, [line.removesuffix('\n').removesuffix('\r') for line in f.readlines()]))
+	for (generator, name) in synthetic.source_generators:
+		inputs.append(("synthetic " + name, generator(2000).split("\n")))
+	rng = random.Random(seed)
+	for index in range(random_files):
+		inputs.append(("random file " + str(index), random_file(rng)))
+	return inputs
+
+
+# Compares the sanitizers on a file, with and without the format checks.
+# Parameters:
+# name: the name of the file
+# lines: the lines of the file, without line separators
+# Returns: true if both sanitizers returned the same results
+def compare(name, lines):
+	for skip_checks in (False, True):
+		expected = reference_sanitize(lines, skip_checks)
+		actual = code_style.sanitize(lines, skip_checks)
+		if expected != actual:
+			print(name + ": the sanitizers differ" + (" without format checks" if skip_checks else ""))
+			for (index, (expected_segments, actual_segments)) in enumerate(zip(expected[2], actual[2])):
+				if expected_segments != actual_segments:
+					print("\tline " + str(index + 1) + ": " + repr(lines[index]))
+					print("\t\texpected " + repr(expected_segments))
+					print("\t\tfound    " + repr(actual_segments))
+					break
+			for (kind, expected_issues, actual_issues) in (("errors", expected[0], actual[0]), ("warnings", expected[1], actual[1])):
+				if expected_issues != actual_issues:
+					print("\texpected " + kind + ":", *expected_issues, sep="\n\t")
+					print("\tfound " + kind + ":", *actual_issues, sep="\n\t")
+			return False
+	return True
+
+
+if __name__ == '__main__':
+	random_files = default_random_files
+	seed = 0
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-h" or arg == "--help":
+			print_help()
+			exit(0)
+		elif (arg == "-n" or arg == "--random") and len(sys.argv) > i + 1 and sys.argv[i + 1].isdigit():
+			random_files = int(sys.argv[i + 1])
+			i += 1
+		elif arg == "--seed" and len(sys.argv) > i + 1 and sys.argv[i + 1].isdigit():
+			seed = int(sys.argv[i + 1])
+			i += 1
+		else:
+			print("Unknown option '" + arg + "'")
+			exit(3)
+		i += 1
+
+	inputs = find_inputs(random_files, seed)
+	failures = sum(not compare(name, lines) for (name, lines) in inputs)
+	print("Compared the sanitizers on " + str(len(inputs)) + " files: " + str(failures) + " differ.")
+	exit(1 if failures else 0)
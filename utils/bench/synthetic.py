@@ -0,0 +1,171 @@
+# synthetic.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import random
+
+# Generators of synthetic source and data files for the style checker benchmarks.
+# Each generator returns the text of a single file. The size scales linearly with the 'lines' parameter,
+# and the output only depends on the parameters, so that results are comparable between runs.
+
+data_header = """# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+source_header = """/* {name}
+Copyright (c) 2026 by the Endless Sky contributors
+
+Endless Sky is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later version.
+
+Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+*/
+
+"""
+
+mission_block = """mission "Synthetic Mission {index}"
+	name "Deliver {index} tons of cargo"
+	description "Deliver <cargo> to <destination> by <date>. Payment is <payment>."
+	cargo "food" {index}
+	destination "Earth"
+	on offer
+		conversation
+			`The dockmaster greets you. "We have {index} tons of food that need to go to Earth," he says.`
+			choice
+				`	"Sure, I can do that."`
+				`	"Sorry, not today."`
+					decline
+	on complete
+		payment 1500
+		dialog "You deliver the cargo and collect your payment."
+
+"""
+
+
+# Generates a large data file made of many ordinary mission definitions.
+# Parameters:
+# lines: the approximate number of lines to generate
+# Returns: the text of the file
+def huge_data(lines):
+	block_lines = mission_block.count("\n")
+	return data_header + "".join(mission_block.format(index=index) for index in range(max(1, lines // block_lines)))
+
+
+# Generates a data file with deeply nested nodes.
+# Parameters:
+# lines: the approximate number of lines to generate
+# depth: the maximum nesting depth
+# Returns: the text of the file
+def deep_data(lines, depth=40):
+	output = [data_header]
+	level = 0
+	for index in range(lines):
+		output.append("\t" * level + ("node " if index % 3 else "\"quoted node\" ") + str(index) + "\n")
+		level = level + 1 if level < depth else 1
+	return "".join(output)
+
+
+# Generates a data file whose nodes are separated by long runs of empty and whitespace-only lines.
+# Parameters:
+# lines: the approximate number of lines to generate
+# run: the length of each run of empty lines
+# Returns: the text of the file
+def blank_run_data(lines, run=200):
+	output = [data_header]
+	count = 0
+	index = 0
+	while count < lines:
+		output.append("phrase \"synthetic " + str(index) + "\"\n\tword\n\t\t\"text " + str(index) + "\"\n")
+		output += ["\t" * (line % 3) + "\n" for line in range(run)]
+		count += run + 3
+		index += 1
+	return "".join(output)
+
+
+# Generates a data file that mixes comments, quoted text and backticks in ways that stress the text line filter.
+# Parameters:
+# lines: the approximate number of lines to generate
+# Returns: the text of the file
+def mixed_data(lines):
+	rng = random.Random(lines)
+	pieces = ["\"text # not a comment\"", "`it's \"quoted\" # here`", "# comment \"with quotes\"", "keyword", "\"a\" \"b\"",
+		"`tick`  # trailing", "word", "\"double  space\"", "\"ends with space \"", "substitutions"]
+	output = [data_header]
+	for index in range(lines):
+		output.append("\t" * rng.randint(0, 4) + " ".join(rng.choice(pieces) for piece in range(rng.randint(1, 4))) + "\n")
+	return "".join(output)
+
+
+function_block = """// Computes the value of the synthetic function {index}.
+int Synthetic{index}(int value, const std::string &name)
+{{
+	/* A block comment with "quotes" and 'chars' inside it. */
+	if(value > {index} && !name.empty())
+		return value * 2 + name.size();
+	for(int i = 0; i < value; ++i)
+	{{
+		const char *text = "string with // a comment inside and an \\" escaped quote";
+		value += text[i % 4] == '"' ? 1 : 0;
+	}}
+	return value;
+}}
+
+
+
+"""
+
+
+# Generates a large C++ source file made of many ordinary functions.
+# Parameters:
+# lines: the approximate number of lines to generate
+# Returns: the text of the file
+def huge_source(lines):
+	block_lines = function_block.count("\n")
+	blocks = "".join(function_block.format(index=index) for index in range(max(1, lines // block_lines)))
+	return source_header.format(name="huge.cpp") + "#include \"huge.h\"\n\n#include <string>\n\nusing namespace std;\n\n\n\n" + blocks
+
+
+# Generates a C++ source file that densely mixes comments, strings, chars and raw strings.
+# Parameters:
+# lines: the approximate number of lines to generate
+# Returns: the text of the file
+def mixed_source(lines):
+	rng = random.Random(lines)
+	pieces = ["\"str // not a comment\"", "'\\''", "/* c \" */", "// tail \" '", "R\"(raw \" // string)\"", "'\"'",
+		"\"escaped \\\\\"", "x = y + z;", "a/b", "\"/*\"", "R\"x(multi)x\""]
+	output = [source_header.format(name="mixed.cpp")]
+	for index in range(lines):
+		output.append("\t" * rng.randint(0, 3) + " ".join(rng.choice(pieces) for piece in range(rng.randint(1, 5))) + "\n")
+	return "".join(output)
+
+
+# The synthetic files of each corpus, as (generator, file name) pairs.
+data_generators = [(huge_data, "huge.txt"), (deep_data, "deep.txt"), (blank_run_data, "blank runs.txt"), (mixed_data, "mixed.txt")]
+source_generators = [(huge_source, "huge.cpp"), (mixed_source, "mixed.cpp")]
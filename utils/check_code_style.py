@@ -13,11 +13,27 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <https://www.gnu.org/licenses/>.
 
+import bisect
+import functools
 import glob
+import io
+import itertools
+import os
+import subprocess
 import sys
+import time
 
 import regex as re
 
+from style_bundle import PatternBundle, bundle_path
+from style_cache import ResultCache, fingerprint
+from style_git import filter_changed
+from style_header import HeaderVerifier, any_line, containing_line, full_line, literal_line, skipped_lines
+from style_output import create_reporter, output_formats
+from style_profile import RuleProfile
+from style_regex import default_timeout, parse_timeout, to_multiline, warn_about_patterns
+from style_watch import watch
+
 # Script that checks for common code formatting pitfalls not covered by clang-format or other tests.
 # The formatting rules are generally based on the guide found at http://endless-sky.github.io/styleguide/styleguide.xml
 # Unit tests mandate the existence of several exceptions to these rules.
@@ -28,64 +44,67 @@ import regex as re
 # String version of the regexes for easy editing
 # List of the standard operators that are checked
 std_op = "\\+/\\*<>&%=\\|!:\\-"
+# The operator characters from std_op, without the escapes
+std_op_characters = "+/*<>&%=|!:-"
 # Dict of patterns for selection potential formatting issues in full lines.
 # These lines don't contain the contents of strings, chars or comments.
-# The dict also contains the error description for the patterns.
-line_include = {re.compile(regex): description for regex, description in {
+# The dict also contains the error description for the patterns,
+# and the characters of which at least one must be present for the pattern to match (None if there are no such characters).
+line_include = {
 	# Matches any '{' following an 'if', 'else if', 'for', 'while' or 'switch' statement.
-	"^(else\\sif|if|else|for|switch|catch|while)\\s?\\(.*{$": "'{' should be on new line",
+	"^(else\\sif|if|else|for|switch|catch|while)\\s?\\(.*{$": ("'{' should be on new line", "{"),
 	# Matches any '{' not preceded by a whitespace or '(', except when the '{' is closed on the same line.
-	"(?<!^(struct|inline).*)[^\\s(]+{(?!.*})": "missing whitespace before '{'",
+	"(?<!^(struct|inline).*)[^\\s(]+{(?!.*})": ("missing whitespace before '{'", "{"),
 	# Matches any parenthesis preceded by a whitespace,
 	# except if the whitespace follows a semicolon,
 	# or follows an all-caps method name
-	"(?![A-Z]+)^.*[^;]\\s\\)": "extra whitespace before closing parenthesis",
+	"(?![A-Z]+)^.*[^;]\\s\\)": ("extra whitespace before closing parenthesis", ")"),
 	# Matches any 'if', 'else if', 'else', 'for', 'catch', 'try', 'do', or 'switch' statements
 	# where the statement is not at the beginning of the line.
-	"(?<!^inline\\s.*)[^\\w0-9]((?<!else\\s)if|else|else\\sif|switch|for|catch|try|do)(\\s{|\\()": "statement should begin on new line",
+	"(?<!^inline\\s.*)[^\\w0-9]((?<!else\\s)if|else|else\\sif|switch|for|catch|try|do)(\\s{|\\()": ("statement should begin on new line", "{("),
 	# Matches any semicolons not at the end of line, unless they are inside 'for' statements
-	";[^\\)}]+$": "semicolon should terminate line",
+	";[^\\)}]+$": ("semicolon should terminate line", ";"),
 	# Matches any whitespaces at the end of a line
-	"\\s+$": "trailing whitespace at end of line",
+	"\\s+$": ("trailing whitespace at end of line", None),
 	# Matches any number of operators that have no leading whitespace,
 	# except if preceded by '(', '[' or '{', or inside a 'case' constant expression.
-	"(?<!^case\\s.*)([^([{\\s" + std_op + "](?<!^.*[^\\w0-9]?operator))[" + std_op + "]+(?<!(->|::|\\.)\\*)([^.\\)" + std_op + "]|$)(?!\\.\\.\\.)": "missing whitespace before operator"
-}.items()}
+	"(?<!^case\\s.*)([^([{\\s" + std_op + "](?<!^.*[^\\w0-9]?operator))[" + std_op + "]+(?<!(->|::|\\.)\\*)([^.\\)" + std_op + "]|$)(?!\\.\\.\\.)": ("missing whitespace before operator", std_op_characters)
+}
 # Dict of patterns for selecting potential formatting issues in a full segment.
 # (a segment is a part of a line that is between any strings, chars or comments)
-# Also contains the error description for the patterns.
-segment_include = {re.compile(regex): description for regex, description in {
+# Also contains the error description and the required characters for the patterns.
+segment_include = {
 	# Matches at least 2 whitespace characters following a non-whitespace character unless the entire line
 	# is made up of commas, numbers or variable names.
 	# This is necessary to avoid flagging array-declaration tables that have custom indentation for readability.
-	"(?!^[\\s\\w\\.,\\d{}+\\-]*$)^.*\\S\\s\\s+.*$": "consecutive whitespace characters",
+	"(?!^[\\s\\w\\.,\\d{}+\\-]*$)^.*\\S\\s\\s+.*$": ("consecutive whitespace characters", None),
 	# Matches any '(' that has no following whitespace,
 	# except if the whitespace is followed by a semicolon,
 	# or follows an all-caps method name.
-	"(?![A-Z]+)^.*\\(\\s(?!;)": "extra whitespace after opening parenthesis",
+	"(?![A-Z]+)^.*\\(\\s(?!;)": ("extra whitespace after opening parenthesis", "("),
 	# Matches any 'if', 'for', 'catch' or 'switch' statements where the '(' is preceded by a whitespace.
-	"(?:if|switch|for|catch)\\s+\\(": "extra whitespace before '('",
+	"(?:if|switch|for|catch)\\s+\\(": ("extra whitespace before '('", "("),
 	# Matches any 'try' or 'do' statements that are not followed by a whitespace and a '{'.
 	# The missing whitespace is checked in another pattern.
-	"^(try|do)$": "'try' or 'do' and '{' should be on the same line",
+	"^(try|do)$": ("'try' or 'do' and '{' should be on the same line", None),
 	# Matches any tabulator characters.
-	"\t": "tabulators should only be used for indentation",
+	"\t": ("tabulators should only be used for indentation", "\t"),
 	# Matches any commas that are not followed by whitespace characters.
-	",\\S": "commas should be followed by whitespaces"
-}.items()}
+	",\\S": ("commas should be followed by whitespaces", ",")
+}
 # Dict of patterns for selecting potential formatting issues in a single word.
-# Also contains the error description for the patterns.
-word_include = {re.compile(regex): description for regex, description in {
+# Also contains the error description and the required characters for the patterns.
+word_include = {
 	# Matches any single '+', '/', '%', '=' operator that has no trailing whitespace.
-	"^([^+/%=]?(?<!operator))[+/%=][^+/%=,\\s\\)\\]}]": "missing whitespace after operator",
+	"^([^+/%=]?(?<!operator))[+/%=][^+/%=,\\s\\)\\]}]": ("missing whitespace after operator", "+/%="),
 	# Matches any series of operators ending with '=', '<' or '>' that have no trailing whitespace.
-	"^[^<>=:]?[" + std_op + "]*[=<>:][^=<>:,\\s\\)\\]}]": "missing whitespace after operator",
+	"^[^<>=:]?[" + std_op + "]*[=<>:][^=<>:,\\s\\)\\]}]": ("missing whitespace after operator", "=<>:"),
 	# Matches any '(void)' arguments in methods
-	"\\(void\\)": "do not use void to denote a function with no arguments"
-}.items()}
+	"\\(void\\)": ("do not use void to denote a function with no arguments", "(")
+}
 
 # Patterns for excluding matches (test()#match) of 'include'
-match_exclude = [re.compile(regex) for regex in [
+match_exclude = [
 	# Matches any repeating +, - or : operators, or any ::* or ::& references
 	"^.?([+:-])\\1+|::&|::\\*.?$",
 	# Matches any matches which have a -> operator surrounded by at most 1 character on either side.
@@ -94,19 +113,72 @@ match_exclude = [re.compile(regex) for regex in [
 	"^\\w[*&]\\($",
 	# Matches any exponent-related matches.
 	"^e[+-]\\d+$"
-]]
+]
 # Patterns for excluding segments that had matches in $include
-segment_exclude = [re.compile(regex) for regex in [
+segment_exclude = [
 	# Matches anything inside '<>'; this is a bit of a hack for getting rid of type-related issues
 	"<.*>",
 	# Matches any visibility modes; these are followed by ':' marks.
 	"^(public|protected|private|default):$"
-]]
+]
+
+
+# Compiles a dict of include patterns to a list of (regex, description, required characters) tuples,
+# with the required characters stored as a set for fast intersection tests.
+# Parameters:
+# table: the dict of patterns
+# compile: the function compiling the patterns
+# Returns the list of tuples.
+def make_dispatch(table, compile=re.compile):
+	return [(compile(regex), description, None if required is None else frozenset(required))
+			for regex, (description, required) in table.items()]
+
+
+# The two halves of the copyright notice: the line of the copyright holder, which is searched for a match
+# of the pattern, and the lines that end the notice.
+copyright_holder = "Copyright \\(c\\) \\d{4}(?:(?:-|, )\\d{4})? by .*"
+copyright_end = [
+	"",
+	"Endless Sky is free software: you can redistribute it and/or modify it under the",
+	"terms of the GNU General Public License as published by the Free Software",
+	"Foundation, either version 3 of the License, or (at your option) any later version.",
+	"",
+	"Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY",
+	"WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A",
+	"PARTICULAR PURPOSE. See the GNU General Public License for more details.",
+	"",
+	"You should have received a copy of the GNU General Public License along with",
+	"this program. If not, see <https://www.gnu.org/licenses/>.",
+	"*/",
+	""
+]
+
+
+# The prefiltered dispatch lists of the include patterns, and the compiled exclude patterns.
+# These are compiled on first use by compile_tables, so that runs that only replay cached results,
+# or that fail early, do not pay for the compilation.
+line_dispatch = None
+# The multiline versions of the line patterns, or None for the patterns that are matched line by line.
+line_multiline = None
+segment_dispatch = None
+word_dispatch = None
+match_exclude_regexes = None
+segment_exclude_regexes = None
+# The HeaderVerifier of the copyright header.
+copyright_header = None
+# The characters of which at least one must be present in a segment for any of the word patterns to match.
+word_characters = frozenset("".join(required for (description, required) in word_include.values()))
+
 # Precompiled  helper regexes
 after_comment = re.compile("[^\\s#]")
 whitespace_only = re.compile("^\\s*$")
 whitespaces = re.compile("\\s+")
 singleLineComment = re.compile("^//(/<?)?")
+# The characters that can change the state of the sanitizer in code, chars, strings and multiline comments.
+code_special = re.compile("[\\\\/'\"]")
+char_special = re.compile("[\\\\/']")
+string_special = re.compile("[\\\\\"]")
+comment_special = re.compile("[\\\\*]")
 
 # List of "" and <> includes to be treated as the other type;
 # that is, any listed "" include should be grouped with <> includes,
@@ -155,12 +227,59 @@ class Warning(Error):
 		return f"\tWARNING: line {self.line}: {self.reason} in '{self.text}'"
 
 
+# A class representing a pattern that ran out of time while matching. These are reported as errors.
+# text: the text that the pattern was matched against
+# line: the current line number
+# description: the description of the pattern
+class Timeout(Error):
+
+	def __init__(self, text, line, description):
+		Error.__init__(self, text, line, "pattern for '" + description + "' timed out after " + str(match_timeout) + "s")
+		self.rule = "regex-timeout"
+
+
+# The time budget of a single match of an include pattern, in seconds, or None for no limit.
+match_timeout = default_timeout
+
+
+# Compiles the include and exclude patterns, unless they are already compiled.
+# The compiled patterns are stored in a bundle next to this script, and restored from there in later runs.
+# Takes no parameters and has no return value.
+def compile_tables():
+	global line_dispatch
+	global line_multiline
+	global segment_dispatch
+	global word_dispatch
+	global match_exclude_regexes
+	global segment_exclude_regexes
+	global copyright_header
+	if line_dispatch is not None:
+		return
+	bundle = PatternBundle(bundle_path(__file__))
+	line_dispatch = make_dispatch(line_include, bundle.compile)
+	# Lookbehinds are evaluated at every position of the joined lines, which makes those patterns slower
+	# than matching the lines one by one.
+	line_multiline = [None if to_multiline(regex) is None or "(?<=" in regex or "(?<!" in regex
+		else bundle.compile(to_multiline(regex)) for regex in line_include]
+	segment_dispatch = make_dispatch(segment_include, bundle.compile)
+	word_dispatch = make_dispatch(word_include, bundle.compile)
+	match_exclude_regexes = [bundle.compile(regex) for regex in match_exclude]
+	segment_exclude_regexes = [bundle.compile(regex) for regex in segment_exclude]
+	# The name in the first line is different for every file, so it is compared separately.
+	# There might be a couple lines of text separating the two halves of the notice,
+	# and the notice has to be followed by at least one more line.
+	copyright_header = HeaderVerifier([[full_line("/\\* .*"), containing_line(copyright_holder), skipped_lines()]
+		+ [literal_line(line) for line in copyright_end] + [any_line()]], bundle.compile)
+	bundle.save()
+
+
 # Checks the format of all source files.
 # Parameters:
 # file: The path to the file being checked
 # lines: The contents of the file, with the trailing line separators
 # Returns: A tuple containing the list of errors and warnings found
 def check_code_style(file, lines):
+	compile_tables()
 	issues = check_line_separators(lines)
 
 	lines = [line.removesuffix('\n').removesuffix('\r') for line in lines]
@@ -187,6 +306,8 @@ def join(first, second):
 
 # Sanitizes the contents of the file by removing the contents of strings and comments.
 # Also performs some minimal format checking that cannot be done elsewhere.
+# Instead of visiting every character, the sanitizer jumps between the characters that can change its state,
+# which are different inside comments, strings, chars and code.
 # Parameters:
 # lines: the original contents of the file, without trailing line separators
 # file: the path to the file
@@ -216,20 +337,33 @@ def sanitize(lines, skip_checks=False):
 			continue
 		# Start index is the beginning of the sequence to be tested
 		start_index = 0
+		has_comment = False
+		i = 0
 		# Looking for parts of the file that are not strings or comments
-		for i in range(len(line)):
+		while True:
+			if is_multiline_comment:
+				special = comment_special
+			elif is_string:
+				special = string_special
+			elif is_char:
+				special = char_special
+			else:
+				special = code_special
+			match = special.search(line, i)
+			if match is None:
+				break
+			i = match.start()
 			char = line[i]
 			# Handling character escapes
-			if is_escaped:
-				is_escaped = False
-				continue
-			elif char == '\\':
-				is_escaped = True
+			if char == '\\':
+				if i + 1 == len(line):
+					is_escaped = True
+					break
+				i += 2
 				continue
 			# Handling comments
-			first_two = line[i:i + 2]
 			if is_multiline_comment:
-				if first_two == "*/":
+				if line.startswith("*/", i):
 					if not skip_checks:
 						# Checking for space after comment
 						if i > 0 and line[i - 1] != ' ' and line[i - 1] != '\t':
@@ -237,21 +371,21 @@ def sanitize(lines, skip_checks=False):
 												"missing space before end of multiline comment"))
 					# End of comment
 					is_multiline_comment = False
-					i += 1
-					start_index = i + 1
+					start_index = i + 2
+				i += 1
 				continue
-			commentMatch = re.search(singleLineComment, line[i:i + 4])
-			if (not is_string and commentMatch):
+			if (not is_string) and line.startswith("//", i):
 				segments.append(line[start_index:i].rstrip())
 				if not skip_checks:
-					cLen = commentMatch.end()
+					cLen = re.search(singleLineComment, line[i:i + 4]).end()
 					# Checking for space after comment
 					if len(line) > (i + cLen):
 						if re.search(after_comment, line[i + cLen:i + cLen + 1]):
 							errors.append(Error(line[i:i + cLen + 1], line_count,
 												"missing space after beginning of single-line comment"))
+				has_comment = True
 				break
-			elif (not is_string) and first_two == "/*":
+			elif (not is_string) and line.startswith("/*", i):
 				segments.append(line[start_index:i].rstrip())
 				is_multiline_comment = True
 				if not skip_checks:
@@ -264,7 +398,6 @@ def sanitize(lines, skip_checks=False):
 						errors.append(Error(line[i:i + 3], line_count,
 											"missing space after beginning of multiline comment"))
 				header_found = True
-				continue
 			# Checking for strings (both standard and raw literals)
 			elif (not is_string) and char == "'":
 				if is_char:
@@ -272,9 +405,7 @@ def sanitize(lines, skip_checks=False):
 				else:
 					segments.append(line[start_index:i + 1])
 				is_char = not is_char
-			elif is_char:
-				continue
-			elif char == '"':
+			elif char == '"' and not is_char:
 				if line[i:i + 4] == "\"\"\"\"":
 					if is_raw_string:
 						start_index = i + 3
@@ -283,26 +414,22 @@ def sanitize(lines, skip_checks=False):
 					is_raw_string = not is_raw_string
 					is_string = not is_string
 				elif line[i - 1:i + 2] == "R\"(":
-					if is_raw_string:
-						continue
-					if is_raw_string_short:
-						continue
-					is_raw_string_short = True
-					is_string = True
-					segments.append(line[start_index:i + 1])
+					if not is_raw_string and not is_raw_string_short:
+						is_raw_string_short = True
+						is_string = True
+						segments.append(line[start_index:i + 1])
 				elif line[i - 1:i + 1] == ")\"" and is_raw_string_short:
 					is_raw_string_short = False
 					is_string = False
 					start_index = i
-				else:
-					if is_raw_string or is_raw_string_short:
-						continue
+				elif not is_raw_string and not is_raw_string_short:
 					if is_string:
 						start_index = i
 					else:
 						segments.append(line[start_index:i + 1])
 					is_string = not is_string
-		else:
+			i += 1
+		if not has_comment:
 			if (not is_multiline_comment) and (not is_char) and (not is_escaped) and (not is_string):
 				segments.append(line[start_index:])
 		line_segments.append(segments)
@@ -315,6 +442,11 @@ def sanitize(lines, skip_checks=False):
 def check_line_separators(lines):
 	errors = []
 	warnings = []
+	# Every line but the last one ends with a separator, so without any CR in the file, only the last line can be wrong.
+	if "\r" not in "".join(lines):
+		if lines and not lines[-1].endswith("\n"):
+			errors.append(Error(lines[-1], len(lines), "Missing line separator"))
+		return errors, warnings
 	for index, line in enumerate(lines):
 		if line.endswith("\r\n"):
 			errors.append(Error(line, index + 1, "Line separators should use LF only; found CRLF"))
@@ -342,44 +474,136 @@ def check_pre_sanitize(lines, file):
 # Returns a tuple of errors and warnings.
 def check_local_format(lines, segmented_lines):
 	issues = ([], [])
+	# Removing indentation
+	lines = [line.lstrip() for line in lines]
+	line_errors = check_line_patterns(lines)
 	line_count = 0
 	for line, segments in zip(lines, segmented_lines):
 		line_count += 1
-		line = line.lstrip()
-		# Removing indentation
 		if len(segments) > 0:
 			segments[0] = segments[0].lstrip()
-		join(issues, check_regex_format(line, segments, line_count))
+		issues[0].extend(line_errors[line_count - 1])
+		join(issues, check_segment_format(segments, line_count))
 	return issues
 
 
-# Tests whether the specified line contains any formatting issues, based on the regex tests. Parameters:
+# Tests every line of a file against the full-line regexes.
+# Where possible, the lines that contain the required characters of a pattern are joined, the pattern is matched
+# once against all of them, and the matches are mapped back to the lines. Parameters:
+# lines: the lines of the file, without indentation and the contents of strings or comments
+# Returns a list of the errors of each line, in the order of the patterns.
+def check_line_patterns(lines):
+	errors = [[] for line in lines]
+	if rule_stats is not None:
+		# The profile records every line separately.
+		for (index, line) in enumerate(lines):
+			errors[index] = check_line_regexes(line, index + 1)
+		return errors
+	for ((regex, description, required), multiline) in zip(line_dispatch, line_multiline):
+		indices = [index for (index, line) in enumerate(lines) if required is None or not required.isdisjoint(line)]
+		pattern_errors = None
+		if multiline is not None:
+			try:
+				pattern_errors = find_line_matches(multiline, lines, indices, description)
+			except TimeoutError:
+				# Every line gets the full time budget below.
+				pass
+		if pattern_errors is None:
+			pattern_errors = []
+			for index in indices:
+				line = lines[index]
+				try:
+					if check_match(regex, line, line):
+						pattern_errors.append((index, Error(line, index + 1, description)))
+				except TimeoutError:
+					pattern_errors.append((index, Timeout(line, index + 1, description)))
+		for (index, error) in pattern_errors:
+			errors[index].append(error)
+	return errors
+
+
+# Matches the multiline version of a full-line pattern against some lines of a file at once.
+# Only the first match in each line counts, the same as when the line is matched on its own. Parameters:
+# multiline: the multiline pattern
+# lines: the lines of the file
+# indices: the indices of the lines to match
+# description: the description of the pattern
+# Returns a list of (line index, Error) tuples.
+# Raises TimeoutError if the pattern runs out of time.
+def find_line_matches(multiline, lines, indices, description):
+	errors = []
+	selected = [lines[index] for index in indices]
+	# The offset of the first character of each selected line in the joined text
+	starts = list(itertools.accumulate((len(line) + 1 for line in selected[:-1]), initial=0))
+	previous = -1
+	for match in multiline.finditer("\n".join(selected), timeout=match_timeout):
+		position = bisect.bisect_right(starts, match.start()) - 1
+		if position == previous:
+			continue
+		previous = position
+		line = selected[position]
+		if not is_excluded_match(match.group(), line):
+			errors.append((indices[position], Error(line, indices[position] + 1, description)))
+	return errors
+
+
+# Tests whether the specified line contains any formatting issues, based on the regex tests.
+# Patterns are only tested against texts that contain at least one of their required characters. Parameters:
 # line: the line to test, without the contents of strings or comments
 # segments: the segments of the line
 # line_count: the position of the line
 # Returns a tuple of errors and warnings.
 def check_regex_format(line, segments, line_count):
+	errors = check_line_regexes(line, line_count)
+	join((errors, []), check_segment_format(segments, line_count))
+	return errors, []
+
+
+# Tests whether the specified line matches any of the full-line regexes. Parameters:
+# line: the line to test, without the contents of strings or comments
+# line_count: the position of the line
+# Returns a list of errors.
+def check_line_regexes(line, line_count):
+	errors = []
+	for regex, description, required in line_dispatch:
+		try:
+			if (required is None or not required.isdisjoint(line)) and check_match(regex, line, line):
+				errors.append(Error(line, line_count, description))
+		except TimeoutError:
+			errors.append(Timeout(line, line_count, description))
+	return errors
+
+
+# Tests whether the segments of a line contain any formatting issues, based on the segment and word regexes. Parameters:
+# segments: the segments of the line
+# line_count: the position of the line
+# Returns a tuple of errors and warnings.
+def check_segment_format(segments, line_count):
 	errors = []
 	warnings = []
-	# Check full-line regexes
-	for regex, description in line_include.items():
-		if check_match(regex, line, line):
-			errors.append(Error(line, line_count, description))
 	for segment in segments:
 		# Skip empty
-		if re.match(whitespace_only, segment):
+		if whitespace_only.match(segment):
 			continue
 		# Check segment regexes
-		for regex, description in segment_include.items():
-			if check_match(regex, segment, segment):
-				errors.append(Error(segment, line_count, description))
+		for regex, description, required in segment_dispatch:
+			try:
+				if (required is None or not required.isdisjoint(segment)) and check_match(regex, segment, segment):
+					errors.append(Error(segment, line_count, description))
+			except TimeoutError:
+				errors.append(Timeout(segment, line_count, description))
 		# Check word regexes
-		for word in re.split(whitespaces, segment):
+		if word_characters.isdisjoint(segment):
+			continue
+		for word in whitespaces.split(segment):
 			word = word.strip()
 			if word != "":
-				for regex, description in word_include.items():
-					if check_match(regex, word, segment):
-						errors.append(Error(word, line_count, description))
+				for regex, description, required in word_dispatch:
+					try:
+						if not required.isdisjoint(word) and check_match(regex, word, segment):
+							errors.append(Error(word, line_count, description))
+					except TimeoutError:
+						errors.append(Timeout(word, line_count, description))
 	return errors, warnings
 
 
@@ -388,18 +612,67 @@ def check_regex_format(line, segments, line_count):
 # text: the text to match
 # segment: the segment the part belongs to
 # Returns True if the regex matches; False otherwise.
+# Raises TimeoutError if the regex runs out of time.
 def check_match(regex, text, segment):
-	pos = re.search(regex, text)
-	if pos is not None:
-		match = text[pos.start():pos.end()]
-		for temp in match_exclude:
-			if re.search(temp, match):
-				return False
-		else:
-			for temp in segment_exclude:
-				if re.search(temp, segment):
-					return False
-		return True
+	if rule_stats is not None:
+		return check_match_profiled(regex, text, segment)
+	pos = regex.search(text, timeout=match_timeout)
+	return pos is not None and not is_excluded_match(pos.group(), segment)
+
+
+# Checks whether a match of an include pattern should be ignored. Parameters:
+# match: the matched text
+# segment: the segment the match belongs to
+# Returns True if the match is excluded; False otherwise.
+def is_excluded_match(match, segment):
+	for temp in match_exclude_regexes:
+		if temp.search(match):
+			return True
+	return is_excluded_segment(segment)
+
+
+# The statistics of each include pattern, keyed by the compiled pattern, or None if profiling is disabled.
+rule_stats = None
+
+
+# Enables the profiling of the include patterns. Parameters:
+# profile: the RuleProfile that the statistics are recorded in
+# No return value.
+def enable_profiling(profile):
+	global rule_stats
+	compile_tables()
+	rule_stats = {}
+	for (table, dispatch) in [("line", line_dispatch), ("segment", segment_dispatch), ("word", word_dispatch)]:
+		for regex, description, required in dispatch:
+			rule_stats[regex] = profile.stats(table, description, regex.pattern)
+
+
+# The same as check_match, but records the time spent on the pattern and its exclusions. Parameters:
+# regex: the regex to match
+# text: the text to match
+# segment: the segment the part belongs to
+# Returns True if the regex matches; False otherwise.
+def check_match_profiled(regex, text, segment):
+	start = time.perf_counter()
+	try:
+		pos = regex.search(text, timeout=match_timeout)
+	except TimeoutError:
+		rule_stats[regex].record(time.perf_counter() - start, False, False)
+		raise
+	result = pos is not None and not is_excluded_match(pos.group(), segment)
+	rule_stats[regex].record(time.perf_counter() - start, pos is not None, pos is not None and not result)
+	return result
+
+
+# Checks whether any matches in the specified segment should be ignored.
+# The result is memoized, since every pattern that matches inside a segment checks the same exclusions. Parameters:
+# segment: the segment to check
+# Returns True if the segment is excluded; False otherwise.
+@functools.lru_cache(maxsize=4096)
+def is_excluded_segment(segment):
+	for temp in segment_exclude_regexes:
+		if temp.search(segment):
+			return True
 	return False
 
 
@@ -424,65 +697,16 @@ def check_copyright(lines, file):
 	warnings = []
 
 	name = file.split("/")[-1]
-	# The two halves of the copyright notice. There might be a couple lines of text separating the two halves.
-	# The bool value stores whether the text is interpreted as a regex.
-	copyright_begin = [
-		["/* " + name, False],
-		["Copyright \\(c\\) \\d{4}(?:(?:-|, )\\d{4})? by .*", True]
-	]
-	copyright_end = [
-		["", False],
-		["Endless Sky is free software: you can redistribute it and/or modify it under the", False],
-		["terms of the GNU General Public License as published by the Free Software", False],
-		["Foundation, either version 3 of the License, or (at your option) any later version.", False],
-		["", False],
-		["Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY", False],
-		["WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A", False],
-		["PARTICULAR PURPOSE. See the GNU General Public License for more details.", False],
-		["", False],
-		["You should have received a copy of the GNU General Public License along with", False],
-		["this program. If not, see <https://www.gnu.org/licenses/>.", False],
-		["*/", False],
-		["", False]
-	]
-	index = 0
-	error_line = -1
-	complete = False
-	for [copyright, is_regex] in copyright_begin:
-		if is_regex:
-			if not re.search(copyright, lines[index]):
-				error_line = index
-				break
-		else:
-			if copyright != lines[index]:
-				error_line = index
-				break
-		index += 1
-	not_found_error_line = index
-	if error_line == -1:
-		index_begin = index
-		while index_begin < len(lines) - len(copyright_end):
-			index = index_begin
-			for [copyright, is_regex] in copyright_end:
-				if is_regex:
-					if not re.search(copyright, lines[index]):
-						error_line = index
-						break
-				else:
-					if copyright != lines[index]:
-						error_line = index
-						break
-				index += 1
-			if error_line == -1:
-				complete = True
-				break
-			index_begin += 1
-			error_line = -1
-	if error_line != -1:
-		errors.append(Error(lines[error_line], error_line + 1, "invalid or missing copyright header"))
-	elif not complete:
-		errors.append(Error(lines[not_found_error_line], not_found_error_line + 1,
-							"invalid or incomplete copyright header"))
+	if not lines or lines[0] != "/* " + name:
+		error_line = 0
+	elif copyright_header.verify(lines):
+		return errors, warnings
+	else:
+		error_line = copyright_header.first_mismatch(lines)
+	if error_line < 2:
+		errors.append(Error(lines[error_line] if error_line < len(lines) else "", error_line + 1, "invalid or missing copyright header"))
+	else:
+		errors.append(Error(lines[2] if len(lines) > 2 else "", 3, "invalid or incomplete copyright header"))
 	return errors, warnings
 
 
@@ -492,19 +716,37 @@ def check_copyright(lines, file):
 def check_line_format(lines):
 	errors = []
 	warnings = []
+	# Most files are plain ASCII and properly wrapped, which is verified in bulk before looking at each line.
+	if "".join(lines).isascii() and max(map(len, lines), default=0) <= 120:
+		return errors, warnings
 
 	line_count = 0
 	for line in lines:
 		line_count += 1
 		if len(line) > 120:
 			errors.append(Error(line, line_count, "lines should hard wrap at 120 characters"))
-		for char in line:
-			if ord(char) < 0 or ord(char) > 127:
-				errors.append(Error(line, line_count, "files should be plain ASCII"))
-				break
+		if not line.isascii():
+			errors.append(Error(line, line_count, "files should be plain ASCII"))
 	return errors, warnings
 
 
+# Finds the groups of include statements of a file, which are separated by other lines.
+# Parameters:
+# sanitized_lines: the lines of the file, without the line separators and the contents of strings and comments
+# Returns a list of groups, each of which is a list of the indices of its include lines.
+def find_include_groups(sanitized_lines):
+	include_lines = [index for index, line in enumerate(sanitized_lines) if line.startswith("#include ")]
+	groups = []
+	previous = -2
+	for i in include_lines:
+		if i == previous + 1:
+			groups[-1].append(i)
+		else:
+			groups.append([i])
+		previous = i
+	return groups
+
+
 # Checks the import statements at the beginning of the file. Parameters:
 # sanitized_lines: the lines of the file, without the line separators and the contents of strings and comments
 # original_lines: the lines of the file, without the terminating line separators
@@ -525,15 +767,7 @@ def check_include(sanitized_lines, original_lines, file):
 	if name.endswith(".cpp"):
 		name = name[0:-4] + ".h"
 
-	include_lines = [index for index, line in enumerate(sanitized_lines) if line.startswith("#include ")]
-	groups = []
-	previous = -2
-	for i in include_lines:
-		if i == previous + 1:
-			groups[-1].append(i)
-		else:
-			groups.append([i])
-		previous = i
+	groups = find_include_groups(sanitized_lines)
 
 	if file.endswith(".cpp") and name[0].isupper():
 		if len(groups) == 0:
@@ -567,45 +801,252 @@ def check_include(sanitized_lines, original_lines, file):
 	return errors, warnings
 
 
+# Gets a JSON-serializable description of the rule tables. This is used to invalidate cached results.
+# Takes no parameters.
+# Returns a dict containing the patterns of each table.
+def describe_rules():
+	return {
+		"line_include": [[regex, *rule] for regex, rule in line_include.items()],
+		"segment_include": [[regex, *rule] for regex, rule in segment_include.items()],
+		"word_include": [[regex, *rule] for regex, rule in word_include.items()],
+		"match_exclude": match_exclude,
+		"segment_exclude": segment_exclude,
+		"reversed_includes": reversed_includes,
+		"exclude_include_check": exclude_include_check
+	}
+
+
+# The result cache, or None if caching is disabled.
+cache = None
+
+
+# Initializes a worker process for parallel checking.
+# Parameters:
+# result_cache: the result cache to use, or None
+# timeout: the time budget of a single match
+# No return value.
+def init_worker(result_cache, timeout):
+	global cache
+	global match_timeout
+	cache = result_cache
+	match_timeout = timeout
+
+
+# Splits the raw contents of a file into lines, the same way as reading the file in text mode with newline=''.
+# Parameters:
+# data: the contents of the file, as bytes
+# Returns: the list of lines, with their line separators
+def split_lines(data):
+	return io.StringIO(data.decode(), newline='').readlines()
+
+
+# Checks a single file. This is the unit of work that is distributed between worker processes.
+# Results are replayed from the cache if the file and the rules have not changed since they were stored.
+# Parameters:
+# file: the path to the file
+# Returns a tuple containing the path, the number of errors and warnings, and the sorted unique errors and warnings.
+def check_file(file):
+	with open(file, "rb") as f:
+		data = f.read()
+	contents = split_lines(data)
+	if cache is not None:
+		key = cache.key(file, data)
+		entry = cache.get(key)
+		if entry is not None:
+			e = [Error(text, line, reason) for (text, line, reason) in entry["errors"]]
+			w = [Warning(text, line, reason) for (text, line, reason) in entry["warnings"]]
+			return file, entry["error_count"], entry["warning_count"], e, w
+	(e, w) = check_code_style(file, contents)
+	result = (file, len(e), len(w), sorted(set(e)), sorted(set(w)))
+	# Timeouts depend on the load of the machine, so results containing them are not stored.
+	if cache is not None and not any(isinstance(error, Timeout) for error in e):
+		cache.put(key, {
+			"error_count": result[1],
+			"warning_count": result[2],
+			"errors": [[error.text, error.line, error.reason] for error in result[3]],
+			"warnings": [[warning.text, warning.line, warning.reason] for warning in result[4]]
+		})
+	return result
+
+
+# Prints the issues found in a single file.
+# Parameters:
+# file: the path to the file
+# e: the sorted unique errors of the file
+# w: the sorted unique warnings of the file
+# No return value.
+def print_file_result(file, e, w):
+	if e or w:
+		print(file)
+		if e:
+			print(*e, sep='\n')
+		if w:
+			print(*w, sep='\n')
+
+
+# Prints the overall result of the checks.
+# Parameters:
+# errors: the number of errors
+# warnings: the number of warnings
+# No return value.
+def print_result(errors, warnings):
+	print()
+	if errors > 0:
+		text = "Found " + str(errors) + " formatting " + ("error" if errors == 1 else "errors")
+		if warnings > 0:
+			text += " and " + str(warnings) + " " + ("warning" if warnings == 1 else "warnings")
+		print(text + ".")
+	elif warnings == 0:
+		print("No formatting errors found.")
+	else:
+		print(warnings, "warning" if warnings == 1 else "warnings", "found.")
+
+
+# Gets the value of a command line option, exiting with a usage error if it is missing or not valid.
+# Parameters:
+# index: the index of the value in the command line arguments, right after the option
+# convert: the function converting the value, such as int or float
+# Returns: the converted value
+def option_value(index, convert=str):
+	if index >= len(sys.argv):
+		print("Missing value of option '" + sys.argv[index - 1] + "'")
+		exit(1)
+	try:
+		return convert(sys.argv[index])
+	except ValueError:
+		print("Invalid value '" + sys.argv[index] + "' of option '" + sys.argv[index - 1] + "'")
+		exit(1)
+
+
 if __name__ == '__main__':
 	errors = 0
 	warnings = 0
 
+	jobs = 1
+	use_cache = True
+	changed_since = None
+	profile = None
+	profile_file = None
+	watch_files = False
+	output_format = "text"
+	patterns = []
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-j" or arg == "--jobs":
+			# A job count of 0 uses every available core.
+			i += 1
+			jobs = option_value(i, int) if i < len(sys.argv) else 0
+			if jobs <= 0:
+				jobs = os.cpu_count() or 1
+		elif arg == "--no-cache":
+			use_cache = False
+		elif arg == "--changed-since":
+			i += 1
+			changed_since = option_value(i)
+		elif arg == "--regex-timeout":
+			i += 1
+			match_timeout = option_value(i, parse_timeout)
+		elif arg == "--profile":
+			profile = RuleProfile()
+		elif arg == "--profile-json":
+			i += 1
+			profile = RuleProfile()
+			profile_file = option_value(i)
+		elif arg == "-w" or arg == "--watch":
+			# After the checks, files are checked again whenever they are saved.
+			watch_files = True
+		elif arg == "--format" or arg.startswith("--format="):
+			# The output format: text, jsonl or sarif.
+			if arg == "--format":
+				i += 1
+				output_format = option_value(i)
+			else:
+				output_format = arg.partition("=")[2]
+			if output_format not in output_formats:
+				print("Unknown output format '" + output_format + "'")
+				exit(1)
+		else:
+			patterns.append(arg)
+		i += 1
+	if watch_files and output_format == "sarif":
+		print("SARIF output is not supported in watch mode")
+		exit(1)
+
 	files = []
-	if len(sys.argv[1:]) > 0:
-		for pattern in sys.argv[1:]:
+	if len(patterns) > 0:
+		for pattern in patterns:
 			files += glob.glob(pattern, recursive=True)
 	else:
 		files = glob.glob('source/**/*.cpp', recursive=True) + glob.glob('source/**/*.h', recursive=True) + glob.glob('tests/**/*.cpp', recursive=True) + glob.glob('tests/**/*.h', recursive=True)
 	files.sort()
+	if changed_since is not None:
+		try:
+			files = filter_changed(files, changed_since)
+		except subprocess.CalledProcessError as e:
+			print("Could not list the files changed since '" + changed_since + "':")
+			print(e.stderr.strip())
+			exit(1)
 
-	for file in files:
-		f = open(file, "r", newline='')
-		contents = f.readlines()
-		(e, w) = check_code_style(file, contents)
-
-		errors += len(e)
-		warnings += len(w)
-
-		e = sorted(set(e))
-		w = sorted(set(w))
-		if e or w:
-			print(file)
-			if e:
-				print(*e, sep='\n')
-			if w:
-				print(*w, sep='\n')
-	print()
-	text = ""
-	if errors > 0:
-		text += "Found " + str(errors) + " formatting " + ("error" if errors == 1 else "errors")
-		if warnings > 0:
-			text += " and " + str(warnings) + " " + ("warning" if warnings == 1 else "warnings")
-		text += "."
-		print(text)
-		exit(1)
-	if warnings == 0:
-		print("No formatting errors found.")
+	if profile is not None:
+		# The patterns are built into this script, so they are only analyzed for rule authors.
+		warn_about_patterns([(table + " pattern '" + description + "'", regex)
+			for (table, patterns) in [("line", line_include), ("segment", segment_include), ("word", word_include)]
+			for (regex, (description, required)) in patterns.items()])
+		# Cached results skip the checks, and the statistics of worker processes are not collected.
+		enable_profiling(profile)
+		use_cache = False
+		jobs = 1
+
+	if use_cache:
+		cache = ResultCache("code", fingerprint([__file__], describe_rules()))
+
+	# The reporter of the machine-readable output, or None for text
+	reporter = create_reporter(output_format, "check_code_style")
+
+	# Writes the issues of a file in the selected output format.
+	def report(file, e, w):
+		if reporter is None:
+			print_file_result(file, e, w)
+		else:
+			reporter.report(file, e, w)
+
+	pool = None
+	if jobs > 1 and len(files) > 1:
+		# Imported here, since single-process runs do not need it.
+		import multiprocessing
+		pool = multiprocessing.Pool(min(jobs, len(files)), init_worker, (cache, match_timeout))
+		# The results are streamed back in the order of the sorted file list.
+		results = pool.imap(check_file, files, chunksize=4)
 	else:
-		print(warnings, "warning" if warnings == 1 else "warnings", "found.")
-	exit(0)
+		results = map(check_file, files)
+
+	for (file, error_count, warning_count, e, w) in results:
+		errors += error_count
+		warnings += warning_count
+
+		report(file, e, w)
+	if pool is not None:
+		pool.close()
+		pool.join()
+	if cache is not None:
+		cache.trim()
+	if profile is not None:
+		# The machine-readable formats own the standard output.
+		profile.print_report(sys.stdout if reporter is None else sys.stderr)
+		if profile_file is not None:
+			profile.write_json(profile_file)
+	if reporter is None:
+		print_result(errors, warnings)
+	else:
+		reporter.finish()
+
+	if watch_files:
+		def check_changed(file):
+			(file, error_count, warning_count, e, w) = check_file(file)
+			report(file, e, w)
+			if reporter is None:
+				print_result(error_count, warning_count)
+
+		watch(files, check_changed)
+	exit(1 if errors > 0 else 0)
@@ -13,13 +13,29 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <https://www.gnu.org/licenses/>.
 
+import collections
 import glob
+import io
+import os
 import os.path
+import shutil
+import subprocess
 import sys
+import tempfile
+import time
 
 import regex as re
 import json
 
+from style_bundle import PatternBundle, bundle_path
+from style_cache import ResultCache, fingerprint
+from style_git import changed_lines, filter_changed
+from style_header import HeaderVerifier, full_line, repeated, truncatable
+from style_output import create_reporter, output_formats
+from style_profile import RuleProfile
+from style_regex import default_timeout, line_body, parse_timeout, warn_about_patterns
+from style_watch import watch
+
 
 # A class representing the result of a formatting check.
 # 'errors' and 'warnings' are lists of Error and Warning objects, respectively.
@@ -95,6 +111,20 @@ class Warning(Error):
 		return f"\tWARNING: line {self.line}: {self.reason}"
 
 
+# A class representing a regex check that ran out of time on a line. These are reported as errors.
+# line: the current line number
+# description: the description of the check
+class Timeout(Error):
+
+	def __init__(self, line, description):
+		Error.__init__(self, line, "regex check '" + description + "' timed out after " + str(match_timeout) + "s")
+		self.rule = "regex-timeout"
+
+
+# The time budget of a single match of a regex check, in seconds, or None for no limit.
+match_timeout = default_timeout
+
+
 # Prints a help message. This is used when the --help option is given.
 # Accepts no parameters and has no return value.
 def print_help():
@@ -111,6 +141,19 @@ def print_help():
 		["", "-f", "--format-file [file]", "Specifies the location of the JSON file with the formatting rules. The default value is './utils/contentStyle.json'."],
 		["", "-R", "--no-recursion", "Do not look for files recursively. Please note that some pathname patterns are implicitly recursive, and are not disabled with this option."],
 		["", "-r", "--recursive", "Look for files recursively. This is the default option. Please note that some pathname patterns are implicitly non-recursive, and are not recursively expanded with this option."],
+		["", "", "--no-cache", "Do not use or update the result cache in './.cache/style-check'. Results of unchanged files are normally replayed from the cache."],
+		["", "", "--changed-since [ref]", "Only checks files that were modified, added or renamed since the specified git reference."],
+		["", "", "--changed-lines-only", "Only reports issues on lines that were changed since the reference given by --changed-since."],
+		["", "-j", "--jobs [count]", "Checks files in parallel using the specified number of worker processes. A count of 0, or a trailing option without a count, uses every available core. The default value is 1."],
+		["", "-s", "--stream", "Checks files line by line, keeping only a bounded window of each file in memory. Files are only rewritten if auto-correction changes them, and are then checked again until nothing more is corrected. Use this for very large data files."],
+		["", "", "", "Unlike the default mode, regex corrections keep the indentation and comments of the corrected lines. The number of fixed issues can also differ, since the default mode checks the file again after each kind of check that corrects something."],
+		["", "", "--regex-timeout [s]", "Limits the time a single regex check may spend on a line, in seconds. Checks that run out of time are reported as errors. The value must be positive. The default value is " + str(default_timeout) + "."],
+		["", "", "--memo-size [count]", "Specifies the number of lines whose regex check results are remembered across files, so that lines repeated in many files are only checked once. A count of 0 disables the memo. The default value is " + str(default_memo_size) + "."],
+		["", "", "--memo-stats", "Prints the hit rate of the line memo after the checks."],
+		["", "", "--profile", "Prints the time spent on each regex check, and how often it matched, was excepted or corrected. This disables the result cache, the line memo and parallel checking. With the jsonl or sarif format, the statistics are printed to the standard error stream."],
+		["", "", "--profile-json [file]", "The same as --profile, but also writes the statistics to the specified JSON file."],
+		["", "", "--format [format]", "Specifies the output format: 'text', 'jsonl' (one JSON object per issue) or 'sarif'. The issues of each file are written as soon as it is checked. The default value is 'text'."],
+		["", "-w", "--watch", "After the checks, keeps running and checks files again whenever they are saved. Only the changed files are checked, with the rules kept in memory. Press Ctrl+C to stop."],
 		[],
 		["After these options, the --files or the --add-files option can be passed. Any further argument should be a file name, that is later added to the list of data roots. Pathname patterns are supported."],
 		["The --files option specifies the list of files or directories where the style checks are performed. This option overrides the 'dataRoots' entry of the configuration file. Pathname patterns are supported."],
@@ -146,6 +189,7 @@ def print_config_help():
 		["", "", "", "copyrightFormats", "An array of supported copyright formats. Each format is a JSON object with the following entries:"],
 		["", "", "", "", "", "holder", "A regex matching the entire 'copyright holder' line. This is repeatedly matched to the beginning of the file."],
 		["", "", "", "", "", "notice", "An array of regexes matching each subsequent line of the copyright notice."],
+		["", "", "", "", "", "", "The regexes of both entries cannot use inline flags, or escapes that can match line feeds."],
 		["", "", "", "regexChecks", "An array of regex-based checks that are applied to individual lines. The checks are grouped by the lines they are applied to. Each entry is a JSON object with the following entries:"],
 		["", "", "", "", "", "excludedNodes", "An array of regexes matching data nodes that the checks are not applied to. Indentation is not taken into account. Defaults to an empty array."],
 		["", "", "", "", "", "excludeComments", "Whether to exclude comments. Defaults to true."],
@@ -176,6 +220,125 @@ def load_config(config_file):
 		print(e)
 
 
+# A class representing a single regex check of a check group, with all of its regexes compiled.
+# entry: the JSON object of the check from the configuration file
+# compile: the function compiling the regexes
+class RegexCheck(object):
+
+	def __init__(self, entry, compile=re.compile):
+		self.description = entry["description"]
+		self.regex = compile(entry["regex"])
+		self.exceptions = [] if "except" not in entry else [compile(exception) for exception in entry["except"]]
+		self.is_error = True if "isError" not in entry else entry["isError"]
+		self.correctable = "correction" in entry
+		if self.correctable:
+			fix = entry["correction"]
+			self.use_entire_line = True if "parseEntireLine" not in fix else fix["parseEntireLine"]
+			self.match_replacement = self.regex if "matchReplacement" not in fix else compile(fix["matchReplacement"])
+			self.replace_with = fix["replaceWith"]
+		# The RuleStats of the check, or None if profiling is disabled.
+		self.stats = None
+
+	# Checks whether any of the exceptions of this check apply to the match.
+	# Parameters:
+	# match: the match object of the check's regex
+	# Return value: true if the match should be discarded, false otherwise
+	def is_excepted(self, match):
+		match_text = match.group()
+		for exception in self.exceptions:
+			if exception.search(match_text, timeout=match_timeout):
+				return True
+		return False
+
+	# Corrects the issue found by this check.
+	# Parameters:
+	# line: the line containing the issue
+	# match: the match object of the check's regex in the line
+	# Return value: the corrected line
+	def correct(self, line, match):
+		return self.match_replacement.sub(self.replace_with, line if self.use_entire_line else match.group(), timeout=match_timeout)
+
+
+# A class representing a group of regex checks, compiled when the configuration is loaded.
+# group: the JSON object of the check group from the configuration file
+# compile: the function compiling the regexes
+class RegexCheckGroup(object):
+
+	def __init__(self, group, compile=re.compile):
+		self.excluded_nodes = [] if "excludedNodes" not in group else [compile(node) for node in group["excludedNodes"]]
+		self.exclude_comments = True if "excludeComments" not in group else group["excludeComments"]
+		self.exclude_keywords = True if "excludeKeywords" not in group else group["excludeKeywords"]
+		self.checks = [RegexCheck(entry, compile) for entry in group["checks"]]
+
+	# Enables the profiling of the checks in this group.
+	# Parameters:
+	# profile: the RuleProfile that the statistics are recorded in
+	# name: the name of the group in the profile
+	# No return value.
+	def enable_profiling(self, profile, name):
+		for check in self.checks:
+			check.stats = profile.stats(name, check.description, check.regex.pattern)
+
+
+# Compiles the regexes of the configuration rules.
+# Parameters:
+# rules: the 'rules' object of the configuration, as loaded from the file
+# bundle: the PatternBundle to take precompiled regexes from, or None to compile every regex
+# Returns: a copy of the rules, where the 'regexChecks' entry is a list of RegexCheckGroup objects,
+# and the 'copyrightHeader' entry is the HeaderVerifier of the 'copyrightFormats' entry
+def compile_rules(rules, bundle=None):
+	compile = re.compile if bundle is None else bundle.compile
+	compiled = dict(rules)
+	compiled["regexChecks"] = [RegexCheckGroup(group, compile) for group in rules["regexChecks"]]
+	compiled["copyrightHeader"] = compile_copyright_header(rules["copyrightFormats"], compile)
+	if bundle is not None:
+		bundle.save()
+	return compiled
+
+
+# Lists the patterns of the copyright formats that cannot be part of a header pattern,
+# because they use inline flags or escapes that can match line feeds.
+# Parameters:
+# copyright_formats: the 'copyrightFormats' entry of the configuration rules
+# Returns: the list of patterns
+def find_unsupported_copyright_patterns(copyright_formats):
+	return [pattern for copyright_format in copyright_formats for pattern in [copyright_format["holder"]] + copyright_format["notice"]
+		if line_body(pattern) is None]
+
+
+# Compiles the copyright formats of the configuration rules into a single header pattern.
+# Each format is one or more holder lines, followed by the lines of the notice. The file may end at any point
+# after the holder lines.
+# Parameters:
+# copyright_formats: the 'copyrightFormats' entry of the configuration rules
+# compile: the function compiling the pattern
+# Returns: the HeaderVerifier
+def compile_copyright_header(copyright_formats, compile=re.compile):
+	unsupported = find_unsupported_copyright_patterns(copyright_formats)
+	if unsupported:
+		raise ValueError("unsupported copyright pattern '" + unsupported[0] + "'")
+	return HeaderVerifier([[repeated(full_line(copyright_format["holder"])), truncatable([full_line(line) for line in copyright_format["notice"]])]
+		for copyright_format in copyright_formats], compile)
+
+
+# Lists the regexes of the configuration rules that are matched against the lines of the files.
+# Parameters:
+# rules: the 'rules' object of the configuration, as loaded from the file
+# Returns: a list of (rule name, pattern) tuples
+def describe_patterns(rules):
+	patterns = []
+	for (index, group) in enumerate(rules["regexChecks"]):
+		name = "group " + str(index + 1)
+		patterns += [("excluded node of " + name, node) for node in group.get("excludedNodes", [])]
+		for entry in group["checks"]:
+			check_name = "regex check '" + entry["description"] + "' of " + name
+			patterns.append((check_name, entry["regex"]))
+			patterns += [(check_name + " (exception)", exception) for exception in entry.get("except", [])]
+			if "matchReplacement" in entry.get("correction", {}):
+				patterns.append((check_name + " (correction)", entry["correction"]["matchReplacement"]))
+	return patterns
+
+
 # Checks that the specified text uses unix-style line endings. Returns immediately if this check is not enabled in the configuration.
 # Parameters:
 # contents: the contents of the file
@@ -219,33 +382,8 @@ def check_line_separators(contents, auto_correct, config):
 # Return value: a CheckResult
 def check_copyright(contents, auto_correct, config):
 	if config["checkCopyright"]:
-		for copyright_format in config["copyrightFormats"]:
-			holder = copyright_format["holder"]
-			notice = copyright_format["notice"]
-
-			# Matching copyright holder line(s)
-			text_index = 0
-			for line in contents:
-				if re.fullmatch(holder, line) is not None:
-					text_index += 1
-				else:
-					break
-
-			# Couldn't match first line
-			if text_index == 0:
-				continue
-
-			# Checking the remaining lines
-			success = True
-			for i, (expected, actual) in enumerate(zip(notice, contents[text_index:])):
-				if re.fullmatch(expected, actual) is None:
-					success = False
-					break
-			# Match
-			if success:
-				return CheckResult()
-		# No format matched
-		return CheckResult([Error(1, "invalid copyright header")])
+		if not config["copyrightHeader"].verify(contents):
+			return CheckResult([Error(1, "invalid copyright header")])
 	return CheckResult()
 
 
@@ -254,13 +392,80 @@ def check_copyright(contents, auto_correct, config):
 # text: the text to count indents in
 # Returns: the number of leading tabulators
 def count_indent(indent, text):
+	if len(set(indent)) == 1:
+		# The indentation is a repeated character, so the level follows from the length of the prefix.
+		return (len(text) - len(text.lstrip(indent[0]))) // len(indent)
 	count = 0
-	while text.startswith(indent):
-		text = text.removeprefix(indent)
+	position = 0
+	while text.startswith(indent, position):
+		position += len(indent)
 		count += 1
 	return count
 
 
+# Checks whether the line is empty or only contains whitespace.
+# Parameters:
+# line: the line to check
+# Return value: true if the line is blank, false otherwise
+def is_blank(line):
+	return line.isspace() or line == ""
+
+
+# Checks the indentation of a single line.
+# Parameters:
+# index: the index of the line
+# line: the line to check
+# previous_level: the indentation level of the previous line that is neither empty nor a comment
+# expected: the indentation level of the first non-empty line after this one, or 0 if there is none
+# expected_previous: the same as 'expected', but counting from the previous line
+# auto_correct: whether to attempt to correct the issue
+# config: the script configuration
+# result: the CheckResult that the issues are added to
+# Return value: a tuple containing the (possibly corrected) line and the new value of 'previous_level'
+def check_line_indentation(index, line, previous_level, expected, expected_previous, auto_correct, config, result):
+	max_delta = config["maxIndentationIncrease"]
+	indent = config["indentation"]
+
+	level = count_indent(indent, line)
+	if level - previous_level > max_delta or (level > previous_level and line.isspace() and level > expected_previous and level > expected):
+		# Too much indentation
+		# This always is checked, even for empty lines, no matter what's configured
+		# In fact, empty lines are not allowed to have more indentation than the previous line.
+		warning = Warning(index + 1, "over-indented line")
+		if auto_correct:
+			if line.isspace():
+				for i in range(level - previous_level):
+					line = line.removeprefix(indent)
+			else:
+				for i in range(level - previous_level - max_delta):
+					line = line.removeprefix(indent)
+			result.fixed_warnings.append(warning)
+		else:
+			result.warnings.append(warning)
+	if is_blank(line):
+		# Not enough indentation - only checked on empty lines
+		if config["indentEmptyLines"] == "never":
+			# No indent on empty lines
+			if line != "":
+				warning = Warning(index + 1, "indented empty line")
+				if auto_correct:
+					line = ""
+					result.fixed_warnings.append(warning)
+				else:
+					result.warnings.append(warning)
+		elif config["indentEmptyLines"] == "always":
+			if level != expected:
+				warning = Warning(index + 1, "incorrect indentation on empty line")
+				if auto_correct:
+					line = indent * expected + line.lstrip()
+					result.fixed_warnings.append(warning)
+				else:
+					result.warnings.append(warning)
+	elif not line.lstrip().startswith("#"):
+		previous_level = count_indent(indent, line)
+	return line, previous_level
+
+
 # Checks the indentation of each line in the file.
 # Parameters:
 # contents: the contents of the file
@@ -268,221 +473,514 @@ def count_indent(indent, text):
 # config: the script configuration
 # Return value: a CheckResult
 def check_indentation(contents, auto_correct, config):
-	# Gets how much indentation an empty line should have.
-	# Parameters:
-	# indent: the type of the indentation
-	# index: the index of the empty line
-	# lines: the lines of text
-	def get_expected_indent(indent, index, lines):
-		for i in range(index + 1, len(lines)):
-			if not (lines[i].isspace() or lines[i] == ""):
-				return count_indent(indent, lines[i])
-		return 0
-
 	result = CheckResult()
 	result.new_file_contents = [line for line in contents]
 
-	max_delta = config["maxIndentationIncrease"]
 	indent = config["indentation"]
-	error_if_indent = config["indentEmptyLines"] == "never"
-	error_if_no_indent = config["indentEmptyLines"] == "always"
+
+	# The indentation level of the first non-empty line at or after each index, or 0 if there is none.
+	# This is how much indentation an empty line should have, if taken from the next index.
+	next_levels = [0] * (len(contents) + 1)
+	for index in range(len(contents) - 1, -1, -1):
+		line = contents[index]
+		next_levels[index] = next_levels[index + 1] if is_blank(line) else count_indent(indent, line)
 
 	previous_level = 0
 	for index, line in enumerate(contents):
-		level = count_indent(indent, line)
-		if level - previous_level > max_delta or (level > previous_level and level > get_expected_indent(indent, index - 2, contents) and level > get_expected_indent(indent, index, contents) and line.isspace()):
-			# Too much indentation
-			# This always is checked, even for empty lines, no matter what's configured
-			# In fact, empty lines are not allowed to have more indentation than the previous line.
-			warning = Warning(index + 1, "over-indented line")
-			if auto_correct:
-				if line.isspace():
-					for i in range(level - previous_level):
-						result.new_file_contents[index] = result.new_file_contents[index].removeprefix(indent)
-				else:
-					for i in range(level - previous_level - max_delta):
-						result.new_file_contents[index] = result.new_file_contents[index].removeprefix(indent)
-				line = result.new_file_contents[index]
-				result.fixed_warnings.append(warning)
+		if is_blank(line):
+			expected = next_levels[index + 1]
+			if index > 0:
+				expected_previous = next_levels[index - 1]
+			elif not is_blank(contents[-1]):
+				# For the first line, the search for the next non-empty line starts at the last line of the file.
+				expected_previous = count_indent(indent, contents[-1])
 			else:
-				result.warnings.append(warning)
-		if line.isspace() or line == "":
-			# Not enough indentation - only checked on empty lines
-			if error_if_indent:
-				# No indent on empty lines
-				if line != "":
-					warning = Warning(index + 1, "indented empty line")
-					if auto_correct:
-						result.new_file_contents[index] = ""
-						result.fixed_warnings.append(warning)
-					else:
-						result.warnings.append(warning)
-			elif error_if_no_indent:
-				expected = get_expected_indent(indent, index, contents)
-				if level != expected:
-					warning = Warning(index + 1, "incorrect indentation on empty line")
-					if auto_correct:
-						result.new_file_contents[index] = indent * expected + result.new_file_contents[index].lstrip()
-						result.fixed_warnings.append(warning)
-					else:
-						result.warnings.append(warning)
-		elif not line.lstrip().startswith("#"):
-			previous_level = count_indent(indent, line)
+				expected_previous = next_levels[0]
+		else:
+			expected = expected_previous = 0
+		(result.new_file_contents[index], previous_level) = check_line_indentation(index, line, previous_level, expected, expected_previous, auto_correct, config, result)
 	return result
 
 
+# A class remembering the results of regex check groups on lines, across all files checked by the process.
+# Data files repeat many lines verbatim, such as the attributes of outfits and ships, so most lines only need to be
+# checked once per run. The least recently used entries are evicted when the memo is full.
+# capacity: the maximum number of entries, or 0 to disable the memo
+class LineMemo(object):
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		# The results, keyed by check group, auto-correction mode and line text. Each result is a tuple of the
+		# descriptions of the errors, warnings, fixed errors and fixed warnings, and the corrected line or None.
+		self.entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	# Looks up the result of a check group on a line.
+	# Parameters:
+	# key: a tuple of the RegexCheckGroup, whether to auto-correct, and the line
+	# Returns: the result, or None if it is not known
+	def get(self, key):
+		entry = self.entries.get(key)
+		if entry is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+			self.entries.move_to_end(key)
+		return entry
+
+	# Stores the result of a check group on a line, evicting the least recently used entry if the memo is full.
+	# Parameters:
+	# key: a tuple of the RegexCheckGroup, whether to auto-correct, and the line
+	# entry: the result
+	# No return value.
+	def put(self, key, entry):
+		self.entries[key] = entry
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+
+	# Removes all entries, for example because the rules changed. The statistics are kept.
+	# Takes no parameters and has no return value.
+	def clear(self):
+		self.entries.clear()
+
+	# Takes the statistics gathered since the last call, so that the statistics of worker processes can be added up.
+	# Takes no parameters.
+	# Returns: a tuple of the numbers of hits, misses and evictions
+	def take_counts(self):
+		counts = (self.hits, self.misses, self.evictions)
+		self.hits = self.misses = self.evictions = 0
+		return counts
+
+	# Adds statistics gathered by another process.
+	# Parameters:
+	# counts: a tuple of the numbers of hits, misses and evictions, as returned by take_counts
+	# No return value.
+	def add_counts(self, counts):
+		self.hits += counts[0]
+		self.misses += counts[1]
+		self.evictions += counts[2]
+
+	# Prints the statistics of the memo to the standard error stream.
+	# The entries in use are only known if the lines were checked by this process, instead of worker processes.
+	# Takes no parameters and has no return value.
+	def print_report(self):
+		lookups = self.hits + self.misses
+		rate = 100 * self.hits / lookups if lookups else 0
+		text = f"Line memo: {self.hits} hits and {self.misses} misses ({rate:.1f}% hit rate), {self.evictions} evictions"
+		if self.entries:
+			text += f", {len(self.entries)} of {self.capacity} entries in use"
+		print(text + ".", file=sys.stderr)
+
+
+# The default number of entries of the line memo.
+default_memo_size = 100000
+# The line memo of this process, or None if it is disabled. Profiling disables it, since it skips the checks.
+line_memo = LineMemo(default_memo_size)
+
+
+# Uses the specified group of regexes to find formatting issues in a single line.
+# Results are taken from the line memo if the same line was checked by the same group before.
+# Parameters:
+# check_group: the RegexCheckGroup to execute
+# index: the index of the line
+# line: the line to check
+# auto_correct: whether to attempt to correct the issue
+# result: the CheckResult that the issues are added to
+# Return value: the corrected line, or None if nothing was corrected
+def check_line_with_regex(check_group, index, line, auto_correct, result):
+	if line_memo is None:
+		return run_line_regexes(check_group, index, line, auto_correct, result)
+	key = (check_group, auto_correct, line)
+	entry = line_memo.get(key)
+	if entry is None:
+		line_result = CheckResult()
+		new_line = run_line_regexes(check_group, index, line, auto_correct, line_result)
+		# Timeouts depend on the load of the machine, so lines with timeouts are checked again.
+		if not any(isinstance(error, Timeout) for error in line_result.errors):
+			line_memo.put(key, (tuple(error.reason for error in line_result.errors), tuple(warning.reason for warning in line_result.warnings),
+								tuple(error.reason for error in line_result.fixed_errors), tuple(warning.reason for warning in line_result.fixed_warnings),
+								new_line))
+		result.errors += line_result.errors
+		result.warnings += line_result.warnings
+		result.fixed_errors += line_result.fixed_errors
+		result.fixed_warnings += line_result.fixed_warnings
+		return new_line
+	(errors, warnings, fixed_errors, fixed_warnings, new_line) = entry
+	if errors or warnings or fixed_errors or fixed_warnings:
+		line_number = index + 1
+		result.errors += [Error(line_number, reason) for reason in errors]
+		result.warnings += [Warning(line_number, reason) for reason in warnings]
+		result.fixed_errors += [Error(line_number, reason) for reason in fixed_errors]
+		result.fixed_warnings += [Warning(line_number, reason) for reason in fixed_warnings]
+	return new_line
+
+
+# Runs the specified group of regexes on a single line, without the line memo.
+# Parameters:
+# check_group: the RegexCheckGroup to execute
+# index: the index of the line
+# line: the line to check
+# auto_correct: whether to attempt to correct the issue
+# result: the CheckResult that the issues are added to
+# Return value: the corrected line, or None if nothing was corrected
+def run_line_regexes(check_group, index, line, auto_correct, result):
+	new_line = None
+	for check in check_group.checks:
+		try:
+			# Looking for issues
+			if check.stats is None:
+				match = check.regex.search(line, timeout=match_timeout)
+				if match is None or check.is_excepted(match):
+					continue
+			else:
+				start = time.perf_counter()
+				match = None
+				excepted = False
+				try:
+					match = check.regex.search(line, timeout=match_timeout)
+					excepted = match is not None and check.is_excepted(match)
+				finally:
+					check.stats.record(time.perf_counter() - start, match is not None, excepted)
+				if match is None or excepted:
+					continue
+			# Formatting issue found
+			if auto_correct and check.correctable:
+				# Fixing issue
+				new_line = check.correct(line, match)
+				if check.stats is not None:
+					check.stats.corrections += 1
+		except TimeoutError:
+			result.errors.append(Timeout(index + 1, check.description))
+			continue
+		if auto_correct and check.correctable:
+			if check.is_error:
+				result.fixed_errors.append(Error(index + 1, check.description))
+			else:
+				result.fixed_warnings.append(Warning(index + 1, check.description))
+		else:
+			if check.is_error:
+				result.errors.append(Error(index + 1, check.description))
+			else:
+				result.warnings.append(Warning(index + 1, check.description))
+	return new_line
+
+
 # Uses the specified list of regexes to find formatting issues.
 # Parameters:
-# check_group: the group of checks to execute
+# check_group: the RegexCheckGroup to execute
 # contents: the contents of the file
 # auto_correct: whether to attempt to correct the issue
 # config: the script configuration
+# memo: an optional dictionary of the results of earlier runs of this check group, keyed by the index of the line.
+# Lines that did not change since the earlier run are not checked again.
 # Return value: a CheckResult
-def check_with_regex(check_group, contents, auto_correct, config):
+def check_with_regex(check_group, contents, auto_correct, config, memo=None):
 	result = CheckResult()
 	result.new_file_contents = [line for line in contents]
 
-	regex_list = check_group["checks"]
-	for entry in regex_list:
-		for index, line in enumerate(contents):
-			# SKip filtered lines
-			if line is None:
-				continue
-			# Looking for issues
-			if re.search(entry["regex"], line) is not None:
-				# Checking exceptions
-				if "except" in entry:
-					match = re.search(entry["regex"], line)
-					match_text = match.string[match.start():match.end()]
-					valid = True
-					for exception in entry["except"]:
-						if re.search(exception, match_text):
-							valid = False
-							break
-					if not valid:
-						continue
-				# Formatting issue found
-				is_error = True if "isError" not in entry else entry["isError"]
-				if auto_correct and "correction" in entry:
-					# Fixing issue
-					fix = entry["correction"]
-
-					use_entire_line = True if "parseEntireLine" not in fix else fix["parseEntireLine"]
-					match_regex = entry["regex"] if "matchReplacement" not in fix else fix["matchReplacement"]
-					replace_with = fix["replaceWith"]
-
-					# Getting match text
-					big_match = re.search(entry["regex"], line)
-					big_match_text = big_match.string[big_match.start():big_match.end()]
-
-					# Replacing
-					result.new_file_contents[index] = re.sub(match_regex, replace_with, line if use_entire_line else big_match_text)
-					if is_error:
-						result.fixed_errors.append(Error(index + 1, entry["description"]))
-					else:
-						result.fixed_warnings.append(Warning(index + 1, entry["description"]))
-				else:
-					if is_error:
-						result.errors.append(Error(index + 1, entry["description"]))
-					else:
-						result.warnings.append(Warning(index + 1, entry["description"]))
+	for index, line in enumerate(contents):
+		# Skip filtered lines
+		if line is None:
+			continue
+		if memo is None:
+			new_line = check_line_with_regex(check_group, index, line, auto_correct, result)
+		else:
+			entry = memo.get(index)
+			if entry is None or entry[0] != line:
+				line_result = CheckResult()
+				new_line = check_line_with_regex(check_group, index, line, auto_correct, line_result)
+				if not (line_result.errors or line_result.warnings or line_result.fixed_errors or line_result.fixed_warnings):
+					line_result = None
+				entry = memo[index] = (line, line_result, new_line)
+			(line, line_result, new_line) = entry
+			if line_result is not None:
+				result.fixed_errors += line_result.fixed_errors
+				result.fixed_warnings += line_result.fixed_warnings
+				result.errors += line_result.errors
+				result.warnings += line_result.warnings
+		if new_line is not None:
+			result.new_file_contents[index] = new_line
 	return result
 
 
-# Finds lines that are not inside excluded nodes and contain text.
-# Parameters:
-# contents: the contents of the file
+# A class that finds lines that are not inside excluded nodes and contain text, one line at a time.
 # config: the script configuration rules.
 # excluded_nodes: the list of regexes that exclude nodes
 # exclude_comments: whether to exclude comments
 # exclude_keywords: whether to exclude keyword lines
-# Return value: the entries of 'contents' that contain text
-def find_text_lines(contents, config, excluded_nodes, exclude_comments, exclude_keywords):
-	new_contents = []
+class TextLineFilter(object):
 
-	indent = config["indentation"]
-	is_word = False
-	word_indent_level = 0
+	def __init__(self, config, excluded_nodes, exclude_comments, exclude_keywords):
+		self.indent = config["indentation"]
+		self.excluded_nodes = excluded_nodes
+		self.exclude_comments = exclude_comments
+		self.exclude_keywords = exclude_keywords
+		self.is_word = False
+		self.word_indent_level = 0
 
-	for line in contents:
-		if ('#' in line and exclude_comments):
+	# Processes the next line of the file.
+	# Parameters:
+	# line: the line
+	# Return value: the part of the line that should be checked, or None if the line should be skipped
+	def filter(self, line):
+		if ('#' in line and self.exclude_comments):
 			line = line.split("#")[0].strip()
 		if line == "" or line.isspace():
-			new_contents.append(None)
 			# Comment or empty line
-			continue
-		if is_word:
-			if count_indent(indent, line) <= word_indent_level:
-				is_word = False
-		if not is_word:
+			return None
+		if self.is_word:
+			if count_indent(self.indent, line) <= self.word_indent_level:
+				self.is_word = False
+		if not self.is_word:
 			stripped = line.strip().split("#")[0]
-			for node in excluded_nodes:
-				if re.search(node, stripped) is not None:
-					is_word = True
-					word_indent_level = count_indent(indent, line)
+			for node in self.excluded_nodes:
+				if node.search(stripped) is not None:
+					self.is_word = True
+					self.word_indent_level = count_indent(self.indent, line)
 					break
-		if not is_word and ("\"" in line or "`" in line or (not exclude_keywords)):
-			new_contents.append(line)
+		if not self.is_word and ("\"" in line or "`" in line or (not self.exclude_keywords)):
+			return line
 		elif line.strip().startswith("#"):
-			new_contents.append(line)
+			return line
+		return None
+
+
+# Finds lines that are not inside excluded nodes and contain text.
+# Parameters:
+# contents: the contents of the file
+# config: the script configuration rules.
+# excluded_nodes: the list of regexes that exclude nodes
+# exclude_comments: whether to exclude comments
+# exclude_keywords: whether to exclude keyword lines
+# Return value: the entries of 'contents' that contain text
+def find_text_lines(contents, config, excluded_nodes, exclude_comments, exclude_keywords):
+	return DataFileIndex(contents, config).find_text_lines(excluded_nodes, exclude_comments, exclude_keywords)
+
+
+# A class representing the node structure of a data file, as seen with or without comments.
+# Only the lines that are not empty are part of the tree. Each of them is identified by its position in 'lines'.
+# lines: the indices of the lines that are not empty
+# texts: the text of each line, with the comment removed if comments are excluded
+# levels: the indentation level of each line
+# quoted: whether each line contains quoted text
+# comments: the positions of the lines that start with a comment
+class DataNodeTree(object):
+
+	def __init__(self, contents, indent, exclude_comments):
+		if exclude_comments:
+			contents = [line.split("#")[0].strip() if '#' in line else line for line in contents]
+		self.lines = [index for (index, line) in enumerate(contents) if line != "" and not line.isspace()]
+		self.texts = [contents[index] for index in self.lines]
+		if len(set(indent)) == 1:
+			self.levels = [(len(text) - len(text.lstrip(indent[0]))) // len(indent) for text in self.texts]
 		else:
-			new_contents.append(None)
-	return new_contents
+			self.levels = [count_indent(indent, text) for text in self.texts]
+		self.quoted = ["\"" in text or "`" in text for text in self.texts]
+		self.comments = [position for (position, text) in enumerate(self.texts) if text.lstrip().startswith("#")]
+		# The positions after the children of each line, found when first needed.
+		self.ends = {}
 
+	# Finds the end of the children of a line, which is the next line that is not indented more than it.
+	# Parameters:
+	# position: the position of the line
+	# Return value: the position of the first line after the children
+	def end(self, position):
+		end = self.ends.get(position)
+		if end is None:
+			level = self.levels[position]
+			end = position + 1
+			while end < len(self.levels) and self.levels[end] > level:
+				end += 1
+			self.ends[position] = end
+		return end
+
+
+# A class that indexes the lines of a data file, so that the text lines for each check group can be found without
+# parsing the file again. The node trees and the results of node patterns are created when first needed,
+# and are shared by every check group.
+# contents: the contents of the file
+# config: the script configuration rules.
+class DataFileIndex(object):
+
+	def __init__(self, contents, config):
+		self.contents = contents
+		self.indent = config["indentation"]
+		# The node trees with and without comments.
+		self.trees = {}
+		# The lines of each tree that match any of a tuple of node patterns.
+		self.node_matches = {}
+
+	# Gets the node tree of the file.
+	# Parameters:
+	# exclude_comments: whether the comments are removed from the lines
+	# Return value: a DataNodeTree
+	def tree(self, exclude_comments):
+		tree = self.trees.get(exclude_comments)
+		if tree is None:
+			tree = self.trees[exclude_comments] = DataNodeTree(self.contents, self.indent, exclude_comments)
+		return tree
+
+	# Finds the lines of a node tree that match any of the specified node patterns.
+	# Parameters:
+	# exclude_comments: whether the tree is the one without comments
+	# excluded_nodes: the list of compiled node patterns
+	# Return value: a list of booleans, one for each line of the tree
+	def excluded(self, exclude_comments, excluded_nodes):
+		key = (exclude_comments, tuple(excluded_nodes))
+		matches = self.node_matches.get(key)
+		if matches is None:
+			keys = [text.strip().split("#")[0] for text in self.tree(exclude_comments).texts]
+			# Data files repeat many lines, so each distinct text is only matched once.
+			results = dict.fromkeys(keys, False)
+			for node in excluded_nodes:
+				for text in results:
+					if not results[text] and node.search(text) is not None:
+						results[text] = True
+			matches = [results[text] for text in keys]
+			self.node_matches[key] = matches
+		return matches
+
+	# Finds lines that are not inside excluded nodes and contain text.
+	# The children of excluded nodes are skipped without being checked.
+	# Parameters:
+	# excluded_nodes: the list of compiled node patterns
+	# exclude_comments: whether to exclude comments
+	# exclude_keywords: whether to exclude keyword lines
+	# Return value: the entries of 'contents' that contain text, in the format of find_text_lines
+	def find_text_lines(self, excluded_nodes, exclude_comments, exclude_keywords):
+		tree = self.tree(exclude_comments)
+		new_contents = [None] * len(self.contents)
+		if not excluded_nodes:
+			if not exclude_keywords:
+				for (index, text) in zip(tree.lines, tree.texts):
+					new_contents[index] = text
+			else:
+				for (index, text, quoted) in zip(tree.lines, tree.texts, tree.quoted):
+					if quoted:
+						new_contents[index] = text
+				for position in tree.comments:
+					new_contents[tree.lines[position]] = tree.texts[position]
+			return new_contents
+
+		excluded = self.excluded(exclude_comments, excluded_nodes)
+		# Comments are kept even inside excluded nodes.
+		for position in tree.comments:
+			new_contents[tree.lines[position]] = tree.texts[position]
+		position = 0
+		while position < len(tree.lines):
+			if excluded[position]:
+				position = tree.end(position)
+				continue
+			if tree.quoted[position] or not exclude_keywords:
+				new_contents[tree.lines[position]] = tree.texts[position]
+			position += 1
+		return new_contents
+
+
+# Joins the lines of a file the same way as they are written by rewrite().
+# Parameters:
+# contents: a string list containing each line of the file
+# Return value: the text of the file
+def join_lines(contents):
+	return "".join(line + "\n" for line in contents[:-1]) + contents[-1]
+
+
+# Creates a uniquely named temporary file in the directory of a file, to replace the file with.
+# If the configuration forces unix line separators, then that is used. Otherwise, it uses the system default.
+# Parameters:
+# file: the (string) pathname of the file
+# config: the script configuration rules.
+# Return value: a tuple of the temporary file, opened for writing, and its pathname
+def open_temp(file, config):
+	(handle, temp) = tempfile.mkstemp(prefix=os.path.basename(file) + ".", suffix=".tmp", dir=os.path.dirname(file) or ".")
+	if config["forceUnixLineSeparator"]:
+		return os.fdopen(handle, "w", newline='\n'), temp
+	return os.fdopen(handle, "w"), temp
+
+
+# Replaces a file with a temporary file created by open_temp, keeping the permission bits of the file.
+# The temporary file is removed if the file could not be replaced.
+# Parameters:
+# temp: the pathname of the temporary file, which is closed
+# file: the (string) pathname of the file
+# No return value.
+def replace_file(temp, file):
+	try:
+		shutil.copymode(file, temp)
+		os.replace(temp, file)
+	finally:
+		if os.path.exists(temp):
+			os.remove(temp)
 
-# Rewrites the file with the specified contents. If the configuration forces unix line separators, then that is used. Otherwise, it uses the system default.
+
+# Rewrites the file with the specified contents, with the line separators chosen by open_temp.
+# The file is replaced atomically, so an interrupted run never leaves a partially written file behind.
 # Parameters:
 # file: the (string) pathname of the file
 # contents: a string list containing each line of the file
 # config: the script configuration rules.
 def rewrite(file, contents, config):
-	# Adding newlines to all but the last line
-	new_contents = [line + "\n" for line in contents[:-1]]
-	new_contents.append(contents[-1])
-
-	if config["forceUnixLineSeparator"]:
-		f = open(file, "w", newline='\n')
-	else:
-		f = open(file, "w")
-	f.writelines(new_contents)
-	f.close()
+	(f, temp) = open_temp(file, config)
+	try:
+		with f:
+			f.write(join_lines(contents))
+	except BaseException:
+		os.remove(temp)
+		raise
+	replace_file(temp, file)
 
 
 # Checks the file for formatting errors.
+# Corrections are applied to an in-memory copy of the file, and the checks are repeated until nothing more is corrected.
+# Each repetition sees the same lines as if the corrected file had been written and read again,
+# but the file itself is only written once, at the end. Regex check groups only check the lines that changed.
 # Parameters:
 # file: the (string) pathname of the file
 # auto_correct: whether to attempt to correct the issue
-# config: the script configuration rules. This is the 'rules' object of the original configuration.
+# config: the script configuration rules. This is the 'rules' object of the original configuration, as returned by compile_rules.
+# text: the contents of the file, or None to read them from the file. If given, the file is neither read nor written,
+# and the corrected lines are only returned in the 'new_file_contents' of the result.
 # Return value: a CheckResult
-def check_content_style(file, auto_correct, config):
+def check_content_style(file, auto_correct, config, text=None):
 	fixed_errors = []
 	fixed_warnings = []
+	# The corrected lines of the file, or None if nothing was corrected.
+	new_file_contents = None
+	memos = [dict() for check_group in config["regexChecks"]]
 
 	def do_reload():
 		nonlocal fixed_errors
 		nonlocal fixed_warnings
-		nonlocal issues
+		nonlocal new_file_contents
+		nonlocal lines
 		fixed_errors += issues.fixed_errors
 		fixed_warnings += issues.fixed_warnings
-		rewrite(file, issues.new_file_contents, config)
+		new_file_contents = issues.new_file_contents
+		lines = io.StringIO(join_lines(new_file_contents), newline='').readlines()
 
-	while True:
+	if text is None:
 		f = open(file, "r", newline='')
-		contents = f.readlines()
+		lines = f.readlines()
 		f.close()
+	else:
+		lines = io.StringIO(text, newline='').readlines()
 
-		# Empty file
-		if not contents:
-			return CheckResult()
+	# Empty file
+	if not lines:
+		return CheckResult()
 
+	while True:
 		# Checking line separators
-		issues = check_line_separators(contents, auto_correct, config)
+		issues = check_line_separators(lines, auto_correct, config)
 		if issues.should_reload():
 			do_reload()
 			continue
 
 		# Removing line separators
-		contents = [line.replace("\r", "").replace("\n", "") for line in contents]
+		contents = [line.replace("\r", "").replace("\n", "") for line in lines]
 
 		# Checking copyright
 		if file not in config["copyrightBlacklist"]:
@@ -497,13 +995,10 @@ def check_content_style(file, auto_correct, config):
 			do_reload()
 			continue
 
-		for check_group in config["regexChecks"]:
-			excluded_nodes = [] if "excludedNodes" not in check_group else check_group["excludedNodes"]
-			exclude_comments = True if "excludeComments" not in check_group else check_group["excludeComments"]
-			exclude_keywords = True if "excludeKeywords" not in check_group else check_group["excludeKeywords"]
-
-			restricted_contents = find_text_lines(contents, config, excluded_nodes, exclude_comments, exclude_keywords)
-			issues.combine_with(check_with_regex(check_group, restricted_contents, auto_correct, config))
+		index = DataFileIndex(contents, config)
+		for check_group, memo in zip(config["regexChecks"], memos):
+			restricted_contents = index.find_text_lines(check_group.excluded_nodes, check_group.exclude_comments, check_group.exclude_keywords)
+			issues.combine_with(check_with_regex(check_group, restricted_contents, auto_correct, config, memo))
 			if issues.should_reload():
 				# Prevent deleting filtered lines
 				issues.new_file_contents = [(line if line is not None else contents[index]) for (index, line) in enumerate(issues.new_file_contents)]
@@ -512,10 +1007,270 @@ def check_content_style(file, auto_correct, config):
 				break
 		else:
 			# All done
+			if new_file_contents is not None:
+				if text is None:
+					rewrite(file, new_file_contents, config)
+				issues.new_file_contents = new_file_contents
 			issues.fixed_errors = fixed_errors
 			issues.fixed_warnings = fixed_warnings
 			return issues
-	return CheckResult()
+
+
+# A class representing a line flowing through the stages of the streaming checker.
+# index: the index of the line
+# raw: the line as it was read from the file, with its line separator
+# text: the current contents of the line, without the line separator; stages replace this when correcting issues
+# is_last: whether this is the last line of the file
+class StreamLine(object):
+
+	def __init__(self, index, raw, text, is_last):
+		self.index = index
+		self.raw = raw
+		self.text = text
+		self.is_last = is_last
+
+
+# A class that checks a file line by line, through a series of generator stages.
+# Only a bounded number of lines is kept in memory: the indentation stage buffers runs of empty lines until the next
+# non-empty line is known, and the rewritten file is only written if auto-correction changed something.
+# Each stage collects its issues separately, so that they are reported in the same order as by check_content_style.
+# file: the (string) pathname of the file
+# auto_correct: whether to attempt to correct the issues
+# config: the script configuration rules, as returned by compile_rules
+class StreamingChecker(object):
+
+	def __init__(self, file, auto_correct, config):
+		self.file = file
+		self.auto_correct = auto_correct
+		self.config = config
+		self.separator_issues = CheckResult()
+		self.copyright_issues = CheckResult()
+		self.indentation_issues = CheckResult()
+		self.regex_issues = [CheckResult() for check_group in config["regexChecks"]]
+		# Whether auto-correction rewrote the file
+		self.rewritten = False
+
+	# Reads the lines of the file, and checks their line separators. Separators are removed from the yielded lines.
+	# Return value: a generator of StreamLine objects
+	def read_lines(self):
+		force_unix = self.config["forceUnixLineSeparator"]
+		trailing = self.config["trailingEmptyLine"]
+		issues = self.separator_issues
+		with open(self.file, "r", newline='') as f:
+			previous = None
+			for index, line in enumerate(f):
+				if previous is not None:
+					yield previous
+				if force_unix:
+					if line.endswith("\r\n"):
+						issues.errors.append(Error(index + 1, "line separators should use LF only; found CRLF"))
+					elif line.endswith("\r"):
+						issues.errors.append(Error(index + 1, "line separators should use LF only; found CR"))
+				previous = StreamLine(index, line, line.replace("\r", "").replace("\n", ""), False)
+			if previous is None:
+				return
+			previous.is_last = True
+			has_separator = previous.raw.endswith('\r') or previous.raw.endswith('\n')
+			if trailing == "always" and not has_separator:
+				issues.errors.append(Error(previous.index + 1, "missing trailing empty line"))
+			elif trailing == "never" and has_separator:
+				issues.errors.append(Error(previous.index + 1, "trailing empty line"))
+			yield previous
+		if self.auto_correct:
+			# Separators are always normalized when the file is rewritten.
+			issues.fixed_errors = issues.errors
+			issues.errors = []
+
+	# Checks the copyright header of the lines.
+	# Parameters:
+	# lines: the generator of the previous stage
+	# Return value: a generator of StreamLine objects
+	def check_copyright(self, lines):
+		if not self.config["checkCopyright"] or self.file in self.config["copyrightBlacklist"]:
+			yield from lines
+			return
+		header = self.config["copyrightHeader"]
+		# The leading lines are kept until they decide whether the header is valid, which is usually after the first
+		# block of lines the verifier looks at.
+		leading = []
+		valid = None
+		for line in lines:
+			if valid is None:
+				leading.append(line.text)
+				if len(leading) % header.limit == 0:
+					valid = header.verify_prefix(leading)
+			yield line
+		if valid is None:
+			valid = header.verify(leading)
+		if not valid:
+			self.copyright_issues.errors.append(Error(1, "invalid copyright header"))
+
+	# Checks the indentation of the lines.
+	# Empty lines are held back until the indentation of the next non-empty line is known.
+	# Parameters:
+	# lines: the generator of the previous stage
+	# Return value: a generator of StreamLine objects
+	def check_indentation(self, lines):
+		indent = self.config["indentation"]
+		previous_level = 0
+		# The original indentation level of the previous line, or None if it was empty.
+		last_level = None
+		pending = []
+		for line in lines:
+			if is_blank(line.text):
+				pending.append((line, last_level))
+				last_level = None
+				continue
+			level = count_indent(indent, line.text)
+			for (blank, blank_previous) in pending:
+				if blank.index == 0:
+					expected_previous = self.find_first_expected_previous(level)
+				else:
+					expected_previous = level if blank_previous is None else blank_previous
+				(blank.text, previous_level) = check_line_indentation(blank.index, blank.text, previous_level, level, expected_previous, self.auto_correct, self.config, self.indentation_issues)
+				yield blank
+			pending = []
+			last_level = level
+			(line.text, previous_level) = check_line_indentation(line.index, line.text, previous_level, 0, 0, self.auto_correct, self.config, self.indentation_issues)
+			yield line
+		for (blank, blank_previous) in pending:
+			if blank.index == 0:
+				expected_previous = self.find_first_expected_previous(0)
+			else:
+				expected_previous = 0 if blank_previous is None else blank_previous
+			(blank.text, previous_level) = check_line_indentation(blank.index, blank.text, previous_level, 0, expected_previous, self.auto_correct, self.config, self.indentation_issues)
+			yield blank
+
+	# Gets the indentation level that an empty first line is expected to have, counting from the previous line.
+	# As in check_indentation, the search wraps around to the last line of the file, which is found by reading
+	# the file once more.
+	# Parameters:
+	# next_level: the indentation level of the first non-empty line of the file, or 0 if there is none
+	# Return value: the expected indentation level
+	def find_first_expected_previous(self, next_level):
+		last = ""
+		with open(self.file, "r", newline='') as f:
+			for last in f:
+				pass
+		last = last.replace("\r", "").replace("\n", "")
+		return next_level if is_blank(last) else count_indent(self.config["indentation"], last)
+
+	# Runs the regex checks on the lines. Each check group keeps its own node state.
+	# Corrected lines are checked again by the same group, so that the reported issues describe the corrected line.
+	# Parameters:
+	# lines: the generator of the previous stage
+	# Return value: a generator of StreamLine objects
+	def check_regexes(self, lines):
+		groups = [(check_group, TextLineFilter(self.config, check_group.excluded_nodes, check_group.exclude_comments, check_group.exclude_keywords), result)
+				  for check_group, result in zip(self.config["regexChecks"], self.regex_issues)]
+		for line in lines:
+			for (check_group, text_filter, result) in groups:
+				text = text_filter.filter(line.text)
+				if text is None:
+					continue
+				# Correcting until the line no longer changes, with a bound to prevent oscillating corrections.
+				for i in range(8):
+					issues = CheckResult()
+					new_text = check_line_with_regex(check_group, line.index, text, self.auto_correct, issues)
+					result.fixed_errors += issues.fixed_errors
+					result.fixed_warnings += issues.fixed_warnings
+					if new_text is not None and new_text != text:
+						# Splicing the correction into the line, so that its indentation and comment are kept.
+						start = len(line.text) - len(line.text.lstrip())
+						if line.text.startswith(text, start):
+							line.text = line.text[:start] + new_text + line.text[start + len(text):]
+						else:
+							line.text = new_text
+						text = new_text
+						if i < 7:
+							continue
+					result.errors += issues.errors
+					result.warnings += issues.warnings
+					break
+			yield line
+
+	# Checks whether the indentation or regex checks corrected any issue.
+	# Takes no parameters.
+	# Return value: true if an issue was corrected
+	def has_corrections(self):
+		return any(issues.should_reload() for issues in [self.indentation_issues] + self.regex_issues)
+
+	# Writes the lines to a temporary file if auto-correction changed any of them, and replaces the file with it.
+	# The unchanged lines before the first change are copied from the original file only when that change is found.
+	# Parameters:
+	# lines: the generator of the previous stage
+	# No return value.
+	def write(self, lines):
+		trailing = self.config["trailingEmptyLine"]
+		output = None
+		try:
+			for line in lines:
+				if not line.is_last:
+					new_raw = line.text + "\n"
+				elif self.has_corrections():
+					# Like check_content_style, the corrected lines are joined without a separator after the last one,
+					# which the next check of the file restores. An empty last line is removed that way.
+					new_raw = line.text
+				elif trailing == "always" or (trailing == "either" and (line.raw.endswith('\r') or line.raw.endswith('\n'))):
+					new_raw = line.text + "\n"
+				else:
+					new_raw = line.text
+				if output is None:
+					if new_raw == line.raw:
+						continue
+					(output, temp) = open_temp(self.file, self.config)
+					with open(self.file, "r", newline='') as f:
+						for i, original in enumerate(f):
+							if i == line.index:
+								break
+							output.write(original.replace("\r", "").replace("\n", "") + "\n")
+				output.write(new_raw)
+		except BaseException:
+			if output is not None:
+				output.close()
+				os.remove(temp)
+			raise
+		if output is not None:
+			output.close()
+			replace_file(temp, self.file)
+			self.rewritten = True
+
+	# Checks the file.
+	# Takes no parameters.
+	# Return value: a CheckResult
+	def check(self):
+		lines = self.check_regexes(self.check_indentation(self.check_copyright(self.read_lines())))
+		if self.auto_correct:
+			self.write(lines)
+		else:
+			for line in lines:
+				pass
+		result = CheckResult()
+		for issues in [self.separator_issues, self.copyright_issues, self.indentation_issues] + self.regex_issues:
+			result.combine_with(issues)
+		return result
+
+
+# Checks the file for formatting errors, processing it one line at a time.
+# Like check_content_style, a file that was corrected is checked again until nothing more is corrected,
+# so that corrections exposing other issues are handled the same way. Each check reads the rewritten file.
+# Parameters:
+# file: the (string) pathname of the file
+# auto_correct: whether to attempt to correct the issue
+# config: the script configuration rules, as returned by compile_rules.
+# Return value: a CheckResult
+def check_content_style_streaming(file, auto_correct, config):
+	fixed_errors = []
+	fixed_warnings = []
+	while True:
+		checker = StreamingChecker(file, auto_correct, config)
+		result = checker.check()
+		fixed_errors += result.fixed_errors
+		fixed_warnings += result.fixed_warnings
+		if not checker.rewritten:
+			result.fixed_errors = fixed_errors
+			result.fixed_warnings = fixed_warnings
+			return result
 
 
 # Prints the result of the style checks for the specified file.
@@ -568,15 +1323,118 @@ def print_result(fixed_errors, fixed_warnings, errors, warnings):
 	print(text)
 
 
+# The result cache, or None if caching is disabled.
+cache = None
+
+
+# Checks the file for formatting errors, replaying the result from the cache if the file has not changed.
+# Results that contain corrections are not stored, since the file was rewritten.
+# Results that contain timeouts are not stored either, since timeouts depend on the load of the machine.
+# Parameters:
+# file: the (string) pathname of the file
+# auto_correct: whether to attempt to correct the issue
+# config: the script configuration rules. This is the 'rules' object of the original configuration.
+# stream: whether to use the streaming checker
+# Return value: a CheckResult
+def check_cached(file, auto_correct, config, stream=False):
+	check = check_content_style_streaming if stream else check_content_style
+	if cache is None:
+		return check(file, auto_correct, config)
+	with open(file, "rb") as f:
+		# The streaming checker is meant for files that should not be read into memory at once.
+		key = cache.key(file, f if stream else f.read())
+	entry = cache.get(key)
+	if entry is not None:
+		return CheckResult([Error(line, reason) for (line, reason) in entry["errors"]],
+						   [Warning(line, reason) for (line, reason) in entry["warnings"]])
+	result = check(file, auto_correct, config)
+	if not result.should_reload() and not any(isinstance(error, Timeout) for error in result.errors):
+		cache.put(key, {
+			"errors": [[error.line, error.reason] for error in result.errors],
+			"warnings": [[warning.line, warning.reason] for warning in result.warnings]
+		})
+	return result
+
+
+# The rules and the check modes used by the worker processes. These are loaded separately by each worker.
+worker_config = None
+worker_auto_correct = False
+worker_stream = False
+
+
+# Initializes a worker process for parallel checking by loading the configuration file.
+# Parameters:
+# format_file: the (string) pathname of the config file
+# auto_correct: whether to attempt to correct formatting issues
+# result_cache: the result cache to use, or None
+# stream: whether to use the streaming checker
+# timeout: the time budget of a single match
+# memo_size: the capacity of the line memo
+# No return value.
+def init_worker(format_file, auto_correct, result_cache, stream, timeout, memo_size):
+	global worker_config
+	global worker_auto_correct
+	global worker_stream
+	global cache
+	global match_timeout
+	global line_memo
+	worker_config = compile_rules(load_config(format_file)["rules"], PatternBundle(bundle_path(format_file)))
+	worker_auto_correct = auto_correct
+	worker_stream = stream
+	cache = result_cache
+	match_timeout = timeout
+	line_memo = LineMemo(memo_size) if memo_size > 0 else None
+
+
+# Checks a single file in a worker process.
+# Parameters:
+# file: the (string) pathname of the file
+# Return value: a tuple of the file, its CheckResult, and the statistics of the line memo of the worker, or None
+def check_file(file):
+	result = check_cached(file, worker_auto_correct, worker_config, worker_stream)
+	# The rewritten contents are not needed by the main process.
+	result.new_file_contents = []
+	return file, result, None if line_memo is None else line_memo.take_counts()
+
+
+# Gets the value of a command line option, exiting with a usage error if it is missing or not valid.
+# Parameters:
+# index: the index of the value in the command line arguments, right after the option
+# convert: the function converting the value, such as int or float
+# Returns: the converted value
+def option_value(index, convert=str):
+	if index >= len(sys.argv):
+		print("Missing value of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+	try:
+		return convert(sys.argv[index])
+	except ValueError:
+		print("Invalid value '" + sys.argv[index] + "' of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+
+
 if __name__ == '__main__':
 	auto_correct = False
-	format_file = "./utils/contentStyle.json"
+	default_format_file = "./utils/contentStyle.json"
+	format_file = default_format_file
 	recursive = True
 	add_files = True
 	# Processing command line arguments.
 	# The --files option is processed later.
-	resume_index = 1
-	for i in range(1, len(sys.argv)):
+	jobs = 1
+	use_cache = True
+	changed_since = None
+	changed_lines_only = False
+	stream = False
+	profile = None
+	profile_file = None
+	memo_size = default_memo_size
+	memo_stats = False
+	watch_files = False
+	output_format = "text"
+	resume_index = len(sys.argv)
+	i = 1
+	while i < len(sys.argv):
 		arg = sys.argv[i]
 		if arg == "-h" or arg == "--help":
 			print_help()
@@ -593,9 +1451,48 @@ if __name__ == '__main__':
 		elif arg == "-r" or arg == "--recursive":
 			recursive = True
 		elif arg == "-f" or arg == "--format-file":
-			if len(sys.argv) > i + 1:
-				format_file = sys.argv[i + 1]
-				i = i + 1
+			i += 1
+			format_file = option_value(i)
+		elif arg == "--no-cache":
+			use_cache = False
+		elif arg == "--changed-since":
+			i += 1
+			changed_since = option_value(i)
+		elif arg == "--changed-lines-only":
+			changed_lines_only = True
+		elif arg == "-s" or arg == "--stream":
+			stream = True
+		elif arg == "--regex-timeout":
+			i += 1
+			match_timeout = option_value(i, parse_timeout)
+		elif arg == "--memo-size":
+			i += 1
+			memo_size = max(option_value(i, int), 0)
+		elif arg == "--memo-stats":
+			memo_stats = True
+		elif arg == "--profile":
+			profile = RuleProfile()
+		elif arg == "--profile-json":
+			i += 1
+			profile = RuleProfile()
+			profile_file = option_value(i)
+		elif arg == "-w" or arg == "--watch":
+			watch_files = True
+		elif arg == "--format" or arg.startswith("--format="):
+			if arg == "--format" and len(sys.argv) > i + 1:
+				output_format = sys.argv[i + 1]
+				i += 1
+			else:
+				output_format = arg.partition("=")[2]
+			if output_format not in output_formats:
+				print("Unknown output format '" + output_format + "'")
+				exit(3)
+		elif arg == "-j" or arg == "--jobs":
+			# A job count of 0 uses every available core, as does a trailing option without a count.
+			i += 1
+			jobs = option_value(i, int) if i < len(sys.argv) else 0
+			if jobs <= 0:
+				jobs = os.cpu_count() or 1
 		elif arg == "--files":
 			resume_index = i + 1
 			add_files = False
@@ -606,10 +1503,26 @@ if __name__ == '__main__':
 		else:
 			print("Unknown option '" + sys.argv[i] + "'")
 			exit(3)
+		i += 1
+	if watch_files and output_format == "sarif":
+		print("SARIF output is not supported in watch mode")
+		exit(3)
+	if changed_lines_only and changed_since is None:
+		print("The --changed-lines-only option requires --changed-since")
+		exit(3)
+
 	# loading config file
 	config = load_config(format_file)
 	if config is None:
 		exit(2)
+	if profile is not None or os.path.realpath(format_file) != os.path.realpath(default_format_file):
+		# The shipped rules are known, so they are only analyzed for rule authors.
+		warn_about_patterns(describe_patterns(config["rules"]))
+	unsupported = find_unsupported_copyright_patterns(config["rules"]["copyrightFormats"])
+	for pattern in unsupported:
+		print("Unsupported copyright pattern '" + pattern + "': inline flags and escapes that can match line feeds cannot be used.")
+	if unsupported:
+		exit(2)
 
 	# Adding input files
 	if add_files:
@@ -628,6 +1541,13 @@ if __name__ == '__main__':
 	# Since not all path names are resolved, there could still be duplicate entries after this
 	data_files = list(set(data_files))
 	data_files.sort()
+	if changed_since is not None:
+		try:
+			data_files = filter_changed(data_files, changed_since)
+		except subprocess.CalledProcessError as e:
+			print("Could not list the files changed since '" + changed_since + "':")
+			print(e.stderr.strip())
+			exit(1)
 
 	# Parsing files
 	fixed_error_count = 0
@@ -635,16 +1555,91 @@ if __name__ == '__main__':
 	error_count = 0
 	warning_count = 0
 
-	for file in data_files:
-		result = check_content_style(file, auto_correct, config["rules"])
+	if profile is not None:
+		# Cached and memoized results skip the checks, and the statistics of worker processes are not collected.
+		use_cache = False
+		jobs = 1
+		memo_size = 0
+	line_memo = LineMemo(memo_size) if memo_size > 0 else None
+
+	if use_cache:
+		# The check modes are part of the fingerprint, since cached results only hold for the mode they were created in.
+		cache = ResultCache("content", fingerprint([__file__], {"rules": config["rules"], "autoCorrect": auto_correct, "stream": stream}))
+
+	# The reporter of the machine-readable output, or None for text
+	reporter = create_reporter(output_format, "check_content_style")
+
+	# Writes the result of a file in the selected output format.
+	def report(file, result):
+		if reporter is None:
+			print_file_result(file, result)
+		else:
+			reporter.report(file, result.errors, result.warnings, result.fixed_errors, result.fixed_warnings)
+
+	pool = None
+	if jobs > 1 and len(data_files) > 1:
+		# Every worker owns a distinct file, so auto-correction is safe.
+		# The results are streamed back in the order of the sorted file list.
+		# Imported here, since single-process runs do not need it.
+		import multiprocessing
+		pool = multiprocessing.Pool(min(jobs, len(data_files)), init_worker, (format_file, auto_correct, cache, stream, match_timeout, memo_size))
+		results = pool.imap(check_file, data_files)
+	else:
+		rules = compile_rules(config["rules"], PatternBundle(bundle_path(format_file)))
+		if profile is not None:
+			for (index, check_group) in enumerate(rules["regexChecks"]):
+				check_group.enable_profiling(profile, "group " + str(index + 1))
+		results = ((file, check_cached(file, auto_correct, rules, stream), None) for file in data_files)
+
+	# Only reports the issues on the changed lines, if requested.
+	def filter_lines(file, result):
+		if changed_since is not None and changed_lines_only:
+			lines = changed_lines(changed_since, file)
+			if lines is not None:
+				result.errors = [error for error in result.errors if error.line in lines]
+				result.warnings = [warning for warning in result.warnings if warning.line in lines]
+
+	for (file, result, memo_counts) in results:
+		filter_lines(file, result)
+		if memo_counts is not None and line_memo is not None:
+			line_memo.add_counts(memo_counts)
 
 		fixed_error_count += len(result.fixed_errors)
 		fixed_warning_count += len(result.fixed_warnings)
 		error_count += len(result.errors)
 		warning_count += len(result.warnings)
 
-		print_file_result(file, result)
+		report(file, result)
+	if pool is not None:
+		pool.close()
+		pool.join()
+	if cache is not None:
+		cache.trim()
+	if profile is not None:
+		# The machine-readable formats own the standard output.
+		profile.print_report(sys.stdout if reporter is None else sys.stderr)
+		if profile_file is not None:
+			profile.write_json(profile_file)
+	if memo_stats and line_memo is not None:
+		line_memo.print_report()
+
+	if reporter is None:
+		print_result(fixed_error_count, fixed_warning_count, error_count, warning_count)
+	else:
+		reporter.finish()
+
+	if watch_files:
+		if pool is not None:
+			# The workers are gone; single files are checked faster without them anyway.
+			rules = compile_rules(config["rules"], PatternBundle(bundle_path(format_file)))
+
+		def check_changed(file):
+			result = check_cached(file, auto_correct, rules, stream)
+			filter_lines(file, result)
+			report(file, result)
+			if reporter is None:
+				print_result(len(result.fixed_errors), len(result.fixed_warnings), len(result.errors), len(result.warnings))
 
-	print_result(fixed_error_count, fixed_warning_count, error_count, warning_count)
+		watch(data_files, check_changed)
 
 	exit(4 if error_count > 0 else 0)
@@ -1,20 +1,192 @@
 #!/usr/bin/python
 
-from debian import copyright
+import re
+import subprocess
+import sys
 
 # Script that validates the copyright file.
+# With --coverage, it also checks that every file tracked by git is covered by a 'Files' stanza,
+# and that every pattern of the stanzas matches at least one file.
+# The coverage check is advisory, and is not run by CI: the copyright file has patterns that match no file,
+# mostly of files that were moved or renamed since. Correcting such a pattern changes the attribution of the moved files,
+# which currently fall under a more general stanza, so each one has to be checked against the original contribution.
 
 
-def check_copyright() -> bool:
+# Parses the copyright file, printing the error if it is not valid.
+# Takes no parameters.
+# Returns: the debian.copyright.Copyright object, or None if the file is not valid
+def parse_copyright():
+	# Imported here, since the lookups of a cached index do not need it.
+	from debian import copyright
 	with open('copyright', 'r', encoding='utf-8') as f:
 		try:
-			copyright.Copyright(f, strict=True)
+			return copyright.Copyright(f, strict=True)
 		except copyright.Error as e:
 			print(e)
-			return False
-		return True
+			return None
+
+
+def check_copyright() -> bool:
+	return parse_copyright() is not None
+
+
+# Gets the literal part of a pattern of a 'Files' stanza, up to its first wildcard.
+# Parameters:
+# pattern: the pattern, where '*' matches any text, '?' matches a single character, and '\' escapes either of them
+# Returns: the literal prefix, with escapes resolved
+def literal_prefix(pattern):
+	prefix = []
+	i = 0
+	while i < len(pattern) and pattern[i] not in "*?":
+		if pattern[i] == "\\":
+			i += 1
+		prefix.append(pattern[i:i + 1])
+		i += 1
+	return "".join(prefix)
+
+
+# Converts a pattern of a 'Files' stanza to a regex, the same way as debian.copyright.globs_to_re.
+# Parameters:
+# pattern: the pattern, which is known to be valid
+# Returns: the compiled regex, to be matched against whole paths
+def glob_to_regex(pattern):
+	parts = []
+	i = 0
+	while i < len(pattern):
+		char = pattern[i]
+		if char == "*":
+			parts.append(".*")
+		elif char == "?":
+			parts.append(".")
+		else:
+			if char == "\\":
+				i += 1
+				char = pattern[i]
+			parts.append(re.escape(char))
+		i += 1
+	return re.compile("".join(parts), re.DOTALL)
+
+
+# A class representing a pattern of a 'Files' stanza.
+# stanza: the index of the stanza among the 'Files' stanzas
+# pattern: the pattern
+class StanzaPattern(object):
+
+	def __init__(self, stanza, pattern):
+		self.stanza = stanza
+		self.pattern = pattern
+		self.prefix = literal_prefix(pattern)
+		# Patterns without wildcards or escapes are compared directly.
+		self.literal = not any(char in pattern for char in "*?\\")
+		# The regex is only compiled once a path reaches the pattern in the trie.
+		self.regex = None
+
+	# Checks whether the pattern matches a path. The literal prefix is already known to match.
+	# Parameters:
+	# path: the path of the file
+	# Returns: true if the pattern matches the whole path
+	def matches(self, path):
+		if self.literal:
+			return len(path) == len(self.prefix)
+		if self.regex is None:
+			self.regex = glob_to_regex(self.pattern)
+		return self.regex.fullmatch(path) is not None
+
+
+# A class finding the stanzas of the copyright file that cover a path, without testing every pattern.
+# The patterns are stored in a character trie by their literal prefixes, so the only patterns tested against a path
+# are those whose prefix the path starts with. Of the stanzas covering a file, the last one applies.
+# stanzas: the patterns of each 'Files' stanza of the copyright file, in order
+class StanzaIndex(object):
+
+	def __init__(self, stanzas):
+		self.stanzas = stanzas
+		self.patterns = [StanzaPattern(stanza, pattern) for (stanza, patterns) in enumerate(stanzas) for pattern in patterns]
+		# Each node of the trie is a dict of its children by character. The patterns whose prefix ends at a node
+		# are stored under the key None.
+		self.root = {}
+		for pattern in self.patterns:
+			node = self.root
+			for char in pattern.prefix:
+				node = node.setdefault(char, {})
+			node.setdefault(None, []).append(pattern)
+
+	# Finds the patterns that match a path.
+	# Parameters:
+	# path: the path of the file, relative to the root of the repository
+	# Returns: the list of matching StanzaPatterns
+	def find_patterns(self, path):
+		node = self.root
+		candidates = list(node.get(None, ()))
+		for char in path:
+			node = node.get(char)
+			if node is None:
+				break
+			candidates += node.get(None, ())
+		return [pattern for pattern in candidates if pattern.matches(path)]
+
+	# Finds the stanza that applies to a path.
+	# Parameters:
+	# path: the path of the file, relative to the root of the repository
+	# Returns: the index of the stanza, or None if the file is not covered
+	def find_stanza(self, path):
+		return max((pattern.stanza for pattern in self.find_patterns(path)), default=None)
+
+
+# Finds the line of the 'Files' field of each stanza of the copyright file.
+# Takes no parameters.
+# Returns: the list of 1-based line numbers, in the order of the stanzas
+def find_stanza_lines():
+	with open('copyright', 'r', encoding='utf-8') as f:
+		return [index + 1 for (index, line) in enumerate(f) if line.startswith("Files:")]
+
+
+# Checks that every file tracked by git is covered by the copyright file, and that every pattern matches a file.
+# Parameters:
+# parsed: the debian.copyright.Copyright object
+# Returns: true if every file is covered and every pattern matches
+def check_coverage(parsed):
+	index = StanzaIndex([paragraph.files for paragraph in parsed.all_files_paragraphs()])
+	# Only python-debian is installed in the CI job of this script, so git is called directly.
+	files = [file for file in subprocess.run(["git", "ls-files", "-z"], check=True, capture_output=True, text=True).stdout.split("\0") if file]
+	uncovered = []
+	matched = set()
+	for file in files:
+		patterns = index.find_patterns(file)
+		if not patterns:
+			uncovered.append(file)
+		matched.update(id(pattern) for pattern in patterns)
+	dead = [pattern for pattern in index.patterns if id(pattern) not in matched]
+
+	if uncovered:
+		print("Files not covered by the copyright file:")
+		for file in uncovered:
+			print("\t" + file)
+	if dead:
+		lines = find_stanza_lines()
+		print("Patterns that match no tracked file:")
+		for pattern in dead:
+			print("\tcopyright:" + str(lines[pattern.stanza]) + ": " + pattern.pattern)
+	print("Checked " + str(len(files)) + " files against " + str(len(index.patterns)) + " patterns in "
+		+ str(len(index.stanzas)) + " stanzas: " + str(len(uncovered)) + " uncovered files, "
+		+ str(len(dead)) + " patterns that match nothing.")
+	return not uncovered and not dead
 
 
 if __name__ == '__main__':
-	if not check_copyright():
+	coverage = False
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "--coverage":
+			coverage = True
+		else:
+			print("Unknown option '" + arg + "'")
+			exit(2)
+		i += 1
+
+	parsed = parse_copyright()
+	if parsed is None:
+		exit(1)
+	if coverage and not check_coverage(parsed):
 		exit(1)
@@ -0,0 +1,229 @@
+#!/usr/bin/python
+# copyright_lookup.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import subprocess
+import sys
+
+from check_copyright import StanzaIndex, find_stanza_lines, parse_copyright
+from style_cache import ResultCache, fingerprint
+
+# Answers which copyright holders and license apply to the files of the repository, according to the copyright file.
+# The stanzas of the copyright file are stored in an index in the cache, which is only rebuilt when the copyright file
+# changes, so lookups do not need to parse it. The stanza of each tracked file is stored as well, for reverse lookups
+# by holder or license; it is rebuilt when the copyright file or the list of tracked files changes.
+
+# The number of cache entries to keep. Every change to the list of tracked files adds an entry with the stanza
+# of each file, so only the entries of a few recent states of the repository are kept.
+cache_entries = 16
+
+
+# Prints a help message. This is used when the --help option is given.
+# Accepts no parameters and has no return value.
+def print_help():
+	help_message = [
+		["Usage: copyright_lookup [OPTION]... [PATH]..."],
+		["Prints the license and the copyright holders of each path, as given by the copyright file."],
+		["Paths are relative to the root of the repository, which must be the working directory."],
+		[],
+		["Options:"],
+		["", "-h", "--help", "Prints this help message."],
+		["", "", "--stdin", "Also reads paths from the standard input, one per line."],
+		["", "", "--holder [text]", "Lists the tracked files whose copyright holders contain the specified text, ignoring case."],
+		["", "", "--license [name]", "Lists the tracked files under the specified license, such as 'CC-BY-SA-4.0', ignoring case."],
+		["", "", "", "Both options can be repeated, and the files found by any of them are listed."],
+		["", "", "--json", "Prints one JSON object per path, with its license, copyright holders, and the line of its stanza."],
+		["", "", "--no-cache", "Do not use or update the index in './.cache/style-check'."],
+		[],
+		["Exit codes:"],
+		["", "0", "Successful execution, and every path is covered by the copyright file."],
+		["", "1", "A path is not covered by the copyright file."],
+		["", "2", "The copyright file is not valid."],
+		["", "3", "An unknown option, or an option without its value, was passed via command line."],
+	]
+	for row in help_message:
+		print("{:<4} {:<2} {:<20} {:<}".format(*[*row, "", "", "", ""]).rstrip())
+
+
+# Lists the files tracked by git.
+# Takes no parameters.
+# Returns: the list of paths, relative to the root of the repository
+def tracked_files():
+	return [file for file in subprocess.run(["git", "ls-files", "-z"], check=True, capture_output=True, text=True).stdout.split("\0") if file]
+
+
+# Reads the stanzas of the copyright file.
+# Takes no parameters.
+# Returns: a list of dicts with the line, the patterns, the copyright holders and the license of each 'Files' stanza,
+# or None if the copyright file is not valid
+def read_stanzas():
+	parsed = parse_copyright()
+	if parsed is None:
+		return None
+	stanzas = []
+	for (line, paragraph) in zip(find_stanza_lines(), parsed.all_files_paragraphs()):
+		stanzas.append({
+			"line": line,
+			"files": list(paragraph.files),
+			"copyright": [holder.strip() for holder in paragraph.copyright.splitlines() if holder.strip()],
+			"license": paragraph.license.synopsis
+		})
+	return stanzas
+
+
+# A class answering lookups of the copyright holders and licenses of files.
+# stanzas: the stanzas, as returned by read_stanzas
+# owners: a dict of the index of the stanza of each tracked file, or None for files that are not covered
+class CopyrightLookup(object):
+
+	def __init__(self, stanzas, owners):
+		self.stanzas = stanzas
+		self.owners = owners
+		self.index = StanzaIndex([stanza["files"] for stanza in stanzas])
+
+	# Finds the stanza that applies to a path. Tracked files are looked up directly.
+	# Parameters:
+	# path: the path of the file, relative to the root of the repository
+	# Returns: the stanza, or None if the file is not covered
+	def find(self, path):
+		path = path.replace(os.sep, "/").removeprefix("./")
+		owner = self.owners[path] if path in self.owners else self.index.find_stanza(path)
+		return None if owner is None else self.stanzas[owner]
+
+	# Lists the tracked files whose copyright holders contain the specified text.
+	# Parameters:
+	# holder: the text, which is compared ignoring case
+	# Returns: the sorted list of paths
+	def files_by_holder(self, holder):
+		holder = holder.casefold()
+		stanzas = {index for (index, stanza) in enumerate(self.stanzas) if any(holder in line.casefold() for line in stanza["copyright"])}
+		return sorted(file for (file, owner) in self.owners.items() if owner in stanzas)
+
+	# Lists the tracked files under the specified license.
+	# Parameters:
+	# license: the name of the license, which is compared ignoring case
+	# Returns: the sorted list of paths
+	def files_by_license(self, license):
+		license = license.casefold()
+		stanzas = {index for (index, stanza) in enumerate(self.stanzas) if stanza["license"].casefold() == license}
+		return sorted(file for (file, owner) in self.owners.items() if owner in stanzas)
+
+
+# Loads the lookup of the copyright file, from the cache if the copyright file and the tracked files did not change.
+# Parameters:
+# use_cache: whether to use and update the cache
+# Returns: the CopyrightLookup, or None if the copyright file is not valid
+def load_lookup(use_cache=True):
+	with open("copyright", "rb") as f:
+		data = f.read()
+	files = tracked_files()
+	cache = None
+	if use_cache:
+		source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "check_copyright.py")
+		cache = ResultCache("copyright", fingerprint([__file__, source], {}), max_entries=cache_entries)
+		stanzas_key = cache.key("copyright", data)
+		owners_key = cache.key("copyright\0" + "\0".join(files), data)
+	stanzas = None if cache is None else cache.get(stanzas_key)
+	if stanzas is None:
+		stanzas = read_stanzas()
+		if stanzas is None:
+			return None
+		if cache is not None:
+			cache.put(stanzas_key, stanzas)
+	lookup = CopyrightLookup(stanzas, {})
+	owners = None if cache is None else cache.get(owners_key)
+	if owners is None:
+		owners = [lookup.index.find_stanza(file) for file in files]
+		if cache is not None:
+			cache.put(owners_key, owners)
+			cache.trim()
+	lookup.owners = dict(zip(files, owners))
+	return lookup
+
+
+# Prints the stanza that applies to a path.
+# Parameters:
+# path: the path, as given
+# stanza: the stanza, or None if the path is not covered
+# as_json: whether to print a JSON object instead of text
+# No return value.
+def print_stanza(path, stanza, as_json):
+	if as_json:
+		record = {"path": path, "license": None, "copyright": [], "line": None}
+		if stanza is not None:
+			record.update({"license": stanza["license"], "copyright": stanza["copyright"], "line": stanza["line"]})
+		print(json.dumps(record))
+	elif stanza is None:
+		print(path + ": not covered by the copyright file")
+	else:
+		print(path + ": " + stanza["license"] + "; " + "; ".join(stanza["copyright"]))
+
+
+if __name__ == '__main__':
+	paths = []
+	holders = []
+	licenses = []
+	read_stdin = False
+	as_json = False
+	use_cache = True
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-h" or arg == "--help":
+			print_help()
+			exit(0)
+		elif arg == "--stdin":
+			read_stdin = True
+		elif arg == "--holder" or arg == "--license":
+			i += 1
+			if i >= len(sys.argv):
+				print("Missing value of option '" + arg + "'")
+				exit(3)
+			(holders if arg == "--holder" else licenses).append(sys.argv[i])
+		elif arg == "--json":
+			as_json = True
+		elif arg == "--no-cache":
+			use_cache = False
+		elif arg.startswith("-"):
+			print("Unknown option '" + arg + "'")
+			exit(3)
+		else:
+			paths.append(arg)
+		i += 1
+	if read_stdin:
+		paths += [line.rstrip("\r\n") for line in sys.stdin if line.strip()]
+
+	lookup = load_lookup(use_cache)
+	if lookup is None:
+		exit(2)
+
+	uncovered = False
+	for path in paths:
+		stanza = lookup.find(path)
+		uncovered |= stanza is None
+		print_stanza(path, stanza, as_json)
+	# The files of every --holder and --license option are listed together.
+	files = set()
+	for holder in holders:
+		files.update(lookup.files_by_holder(holder))
+	for license in licenses:
+		files.update(lookup.files_by_license(license))
+	for file in sorted(files):
+		if as_json:
+			print_stanza(file, lookup.find(file), as_json)
+		else:
+			print(file)
+	exit(1 if uncovered else 0)
@@ -0,0 +1,563 @@
+#!/usr/bin/python
+# include_graph.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+import json
+import os
+import sys
+
+import regex as re
+
+from check_code_style import find_include_groups, sanitize, split_lines
+from style_cache import ResultCache, fingerprint
+
+# Builds the include graph of the C++ sources, to find the headers that contribute the most to the compile time.
+# Every file is scanned for its include statements with the same sanitizer as the code style checker,
+# and for the names it declares and uses, which are needed to suggest forward declarations.
+# The scan of each file is cached by the hash of its contents.
+
+# The directories that includes are resolved against, if they are not relative to the including file.
+# These are the include directories of the build.
+include_roots = ["source", "tests/unit/include"]
+# The extensions of the files that are compiled on their own.
+translation_unit_extensions = (".cpp",)
+
+# The parts of an include statement: the opening delimiter and the included path.
+include_statement = re.compile(r'#\s*include\s*([<"])([^>"]*)[>"]')
+# The names that can be declared by a header. Names in this code base are capitalized,
+# so lowercase names, such as the standard library, are not tracked.
+identifier = re.compile(r"\b[A-Z]\w*\b")
+# Definitions at the top level of a header. Forward declarations are not definitions.
+type_definition = re.compile(r"^(?:class|struct)\s+([A-Z]\w*)\b(?!\s*;)")
+other_definitions = [
+	re.compile(r"^enum\s+(?:class\s+|struct\s+)?([A-Z]\w*)"),
+	re.compile(r"^namespace\s+([A-Z]\w*)"),
+	re.compile(r"^using\s+([A-Z]\w*)\s*="),
+	re.compile(r"^typedef\b.*\b([A-Z]\w*)\s*;"),
+	re.compile(r"^(?!(?:class|struct|enum|namespace|using|typedef|template|friend|return)\b)[\w:<>,\s*&]*?\b([A-Z]\w*)\s*\(")
+]
+macro_definition = re.compile(r"^\s*#\s*define\s+([A-Z]\w*)")
+# The text before a name that makes the name the subject of a declaration.
+declaration_prefix = re.compile(r"\b(?:class|struct)\s+$")
+# The text before a name that only needs the declaration of the name, if the name is followed by '>'.
+pointer_prefix = re.compile(r"\b(?:shared_ptr|weak_ptr)<\s*(?:const\s+)?$")
+# The variable declared after a name that is followed by '*' or '&'.
+pointer_variable = re.compile(r"\s*>?\s*[*&]+\s*(?:const\s+)?([a-z_]\w*)")
+
+
+# Prints a help message. This is used when the --help option is given.
+# Accepts no parameters and has no return value.
+def print_help():
+	help_message = [
+		["Usage: include_graph [OPTION]... [FILE]..."],
+		["Builds the include graph of the C++ sources, and reports the transitive include counts, the heaviest headers,"],
+		["include cycles, and includes that could be replaced by forward declarations."],
+		["The default files are the sources and headers in the 'source' and 'tests' directories. Pathname patterns are supported."],
+		[],
+		["Options:"],
+		["", "-h", "--help", "Prints this help message."],
+		["", "-j", "--jobs [count]", "Scans files in parallel using the specified number of worker processes. A count of 0, or a trailing option without a count, uses every available core. The default value is 0."],
+		["", "", "--no-cache", "Do not use or update the scan cache in './.cache/style-check'. Scans of unchanged files are normally replayed from the cache."],
+		["", "", "--top [count]", "Specifies the number of entries listed in each ranking. The default value is 20."],
+		["", "", "--json [file]", "Also writes the graph and the full rankings to the specified JSON file."],
+		[],
+		["The weight of a header is the number of translation units that include it, directly or indirectly, times the number"],
+		["of lines of the header and the project headers it includes. The forward declaration candidates are found by name:"],
+		["they are includes of headers whose names are only used through pointers and references, and should be verified by compiling."],
+		[],
+		["Exit codes:"],
+		["", "0", "Successful execution."],
+		["", "3", "An unknown option, or an option with a missing or invalid value, was passed via command line."],
+	]
+	for row in help_message:
+		print("{:<4} {:<2} {:<20} {:<}".format(*[*row, "", "", "", ""]).rstrip())
+
+
+# Finds how a file uses the capitalized names in its code.
+# A use only needs a declaration of the name if the name is followed by '*' or '&', or is the argument of a shared
+# or weak pointer, unless a variable declared this way is dereferenced by inline code. Declarations of the name itself
+# are ignored, and so are names qualified by another name.
+# Parameters:
+# text: the sanitized contents of the file
+# Returns: a dict of whether each used name only needs a declaration
+def find_uses(text):
+	uses = {}
+	# The variables declared as pointers or references to each name.
+	variables = {}
+	for match in identifier.finditer(text):
+		name = match.group()
+		before = text[max(match.start() - 32, 0):match.start()]
+		if before.endswith(("::", ".", "->")) or declaration_prefix.search(before):
+			continue
+		after = text[match.end():match.end() + 64]
+		declaration_only = after.lstrip().startswith(("*", "&")) or (after.lstrip().startswith(">") and pointer_prefix.search(before) is not None)
+		uses[name] = uses.get(name, True) and declaration_only
+		if declaration_only:
+			variable = pointer_variable.match(after)
+			if variable is not None:
+				variables.setdefault(name, set()).add(variable.group(1))
+	for (name, names) in variables.items():
+		if uses[name]:
+			alternatives = "|".join(sorted(names))
+			if re.search(r"\b(?:" + alternatives + r")\s*(?:->|\.\w)|:\s*\*?(?:" + alternatives + r")\s*\)", text):
+				uses[name] = False
+	return uses
+
+
+# Scans a single file for its includes, and the names it declares and uses.
+# Parameters:
+# data: the contents of the file, as bytes
+# Returns: the scan, as a JSON-serializable dict
+def scan(data):
+	lines = [line.removesuffix('\n').removesuffix('\r') for line in split_lines(data)]
+	sanitized_lines = ["".join(segments) for segments in sanitize(lines, True)[2]]
+	includes = []
+	for group in find_include_groups(sanitized_lines):
+		for index in group:
+			match = include_statement.search(lines[index])
+			if match is not None:
+				includes.append([index + 1, match.group(1) == "<", match.group(2)])
+	types = set()
+	others = set()
+	for line in sanitized_lines:
+		match = type_definition.search(line)
+		if match is not None:
+			types.add(match.group(1))
+			continue
+		for definition in other_definitions:
+			match = definition.search(line)
+			if match is not None:
+				others.add(match.group(1))
+				break
+	for line in lines:
+		match = macro_definition.search(line)
+		if match is not None:
+			others.add(match.group(1))
+	code = "\n".join(line for line in sanitized_lines if not line.startswith("#include "))
+	return {
+		"lines": len(lines),
+		"includes": includes,
+		"types": sorted(types),
+		"others": sorted(others - types),
+		"uses": find_uses(code)
+	}
+
+
+# The scan cache, or None if caching is disabled.
+cache = None
+
+
+# Initializes a worker process for parallel scanning.
+# Parameters:
+# result_cache: the scan cache to use, or None
+# No return value.
+def init_worker(result_cache):
+	global cache
+	cache = result_cache
+
+
+# Scans a single file, replaying the scan from the cache if the file has not changed.
+# This is the unit of work that is distributed between worker processes.
+# Parameters:
+# file: the path to the file
+# Returns: a tuple of the file and its scan
+def scan_file(file):
+	with open(file, "rb") as f:
+		data = f.read()
+	if cache is None:
+		return file, scan(data)
+	key = cache.key(file, data)
+	entry = cache.get(key)
+	if entry is None:
+		entry = scan(data)
+		cache.put(key, entry)
+	return file, entry
+
+
+# Lists the members of a set of files, represented as the bits of an integer.
+# Parameters:
+# bits: the set
+# Returns: the indices of the files in the set, in ascending order
+def members(bits):
+	indices = []
+	while bits:
+		low = bits & -bits
+		indices.append(low.bit_length() - 1)
+		bits ^= low
+	return indices
+
+
+# A class representing the include graph of a set of files.
+# Files are identified by their index in the sorted list of paths, and sets of files are integers with one bit per file.
+# scans: a dict of the scan of each file, keyed by its path
+class IncludeGraph(object):
+
+	def __init__(self, scans):
+		self.files = sorted(scans)
+		self.scans = [scans[file] for file in self.files]
+		self.index = {file: index for (index, file) in enumerate(self.files)}
+		# The project files included by each file, and the includes that are not project files.
+		self.edges = []
+		# The line of each include of a project file, keyed by the including and the included file.
+		self.lines = {}
+		self.unresolved = {}
+		for (index, file) in enumerate(self.files):
+			edges = []
+			for (line, system, path) in self.scans[index]["includes"]:
+				target = None if system else self.resolve(file, path)
+				if target is None:
+					if not system:
+						self.unresolved.setdefault(file, []).append(path)
+				elif target not in edges:
+					edges.append(target)
+					self.lines[(index, target)] = line
+			self.edges.append(edges)
+		self.components = self.find_components()
+		self.closures = self.find_closures()
+
+	# Resolves the path of an include statement to a project file.
+	# Parameters:
+	# file: the path of the including file
+	# path: the included path, as written in the include statement
+	# Returns: the index of the included file, or None if it is not a project file
+	def resolve(self, file, path):
+		for directory in [os.path.dirname(file)] + include_roots:
+			target = self.index.get(os.path.normpath(os.path.join(directory, path)))
+			if target is not None:
+				return target
+		return None
+
+	# Finds the strongly connected components of the graph, with Tarjan's algorithm.
+	# The recursion is replaced by an explicit stack, since include chains can be long.
+	# Takes no parameters.
+	# Returns: the list of components, each a list of file indices, with every component after the components it includes
+	def find_components(self):
+		order = [None] * len(self.files)
+		low = [0] * len(self.files)
+		on_stack = [False] * len(self.files)
+		stack = []
+		components = []
+		counter = 0
+		for root in range(len(self.files)):
+			if order[root] is not None:
+				continue
+			work = [(root, 0)]
+			while work:
+				(node, child) = work.pop()
+				if child == 0:
+					order[node] = low[node] = counter
+					counter += 1
+					stack.append(node)
+					on_stack[node] = True
+				edges = self.edges[node]
+				descended = False
+				while child < len(edges):
+					target = edges[child]
+					child += 1
+					if order[target] is None:
+						work.append((node, child))
+						work.append((target, 0))
+						descended = True
+						break
+					if on_stack[target]:
+						low[node] = min(low[node], order[target])
+				if descended:
+					continue
+				if low[node] == order[node]:
+					component = []
+					while True:
+						member = stack.pop()
+						on_stack[member] = False
+						component.append(member)
+						if member == node:
+							break
+					components.append(component)
+				if work:
+					parent = work[-1][0]
+					low[parent] = min(low[parent], low[node])
+		return components
+
+	# Finds the files that each file includes, directly or indirectly.
+	# Takes no parameters.
+	# Returns: the set of the files included by each file; a file only includes itself if it is part of a cycle
+	def find_closures(self):
+		closures = [0] * len(self.files)
+		# The components are ordered so that every included component is handled first.
+		for component in self.components:
+			bits = 0
+			for member in component:
+				bits |= 1 << member
+			reached = bits if self.is_cycle(component) else 0
+			for member in component:
+				for target in self.edges[member]:
+					if not (bits >> target) & 1:
+						reached |= (1 << target) | closures[target]
+			for member in component:
+				closures[member] = reached
+		return closures
+
+	# Checks whether a strongly connected component is an include cycle.
+	# Parameters:
+	# component: the list of the files of the component
+	# Returns: true if the files of the component include each other
+	def is_cycle(self, component):
+		return len(component) > 1 or component[0] in self.edges[component[0]]
+
+	# Finds a cycle of includes through the files of a component, starting at its first file in path order.
+	# Parameters:
+	# component: the list of the files of the component
+	# Returns: the list of files of the cycle, beginning and ending with the same file
+	def find_cycle(self, component):
+		start = min(component)
+		inside = set(component)
+		parents = {}
+		queue = [start]
+		for node in queue:
+			for target in self.edges[node]:
+				if target == start:
+					path = [start]
+					while node != start:
+						path.append(node)
+						node = parents[node]
+					return [start] + path[:0:-1] + [start]
+				if target in inside and target not in parents:
+					parents[target] = node
+					queue.append(target)
+		return [start, start]
+
+	# Counts the lines of a file and the files it includes.
+	# Parameters:
+	# index: the index of the file
+	# Returns: the number of lines that the preprocessor reads from project files for this file
+	def transitive_lines(self, index):
+		return self.scans[index]["lines"] + sum(self.scans[member]["lines"] for member in members(self.closures[index] & ~(1 << index)))
+
+	# Lists the translation units of the graph.
+	# Takes no parameters.
+	# Returns: the indices of the files that are compiled on their own
+	def translation_units(self):
+		return [index for (index, file) in enumerate(self.files) if file.endswith(translation_unit_extensions)]
+
+	# Ranks the headers by the number of translation units that include them times the lines they bring in.
+	# Takes no parameters.
+	# Returns: a list of tuples of the weight, the translation unit count, the transitive line count and the header index,
+	# ordered by descending weight
+	def rank_headers(self):
+		fan_in = [0] * len(self.files)
+		for unit in self.translation_units():
+			for member in members(self.closures[unit]):
+				fan_in[member] += 1
+		ranking = []
+		for (index, count) in enumerate(fan_in):
+			if count > 0:
+				lines = self.transitive_lines(index)
+				ranking.append((count * lines, count, lines, index))
+		ranking.sort(key=lambda entry: (-entry[0], self.files[entry[3]]))
+		return ranking
+
+	# Finds the includes in headers that could be replaced by forward declarations.
+	# An include is a candidate if every name that the header only gets through it is a class or struct that is
+	# only used through pointers and references. Names that the header also gets through its other includes do not count.
+	# Takes no parameters.
+	# Returns: a list of tuples of the including file, the line of the include, the included file, and the names to declare
+	def find_forward_declarations(self):
+		candidates = []
+		for (index, file) in enumerate(self.files):
+			if file.endswith(translation_unit_extensions):
+				continue
+			uses = self.scans[index]["uses"]
+			edges = self.edges[index]
+			for target in edges:
+				others = 0
+				for other in edges:
+					if other != target:
+						others |= (1 << other) | self.closures[other]
+				provided = ((1 << target) | self.closures[target]) & ~others & ~(1 << index)
+				types = set()
+				names = set()
+				for member in members(provided):
+					types.update(self.scans[member]["types"])
+					names.update(self.scans[member]["others"])
+				used = [name for name in uses if name in types or name in names]
+				if used and all(name in types and uses[name] for name in used):
+					candidates.append((index, self.lines[(index, target)], target, sorted(used)))
+		return candidates
+
+
+# Prints the report of an include graph.
+# Parameters:
+# graph: the IncludeGraph
+# top: the number of entries listed in each ranking
+# No return value.
+def print_report(graph, top):
+	units = graph.translation_units()
+	include_count = sum(len(edges) for edges in graph.edges)
+	unresolved_count = sum(len(paths) for paths in graph.unresolved.values())
+	print("Include graph of " + str(len(graph.files)) + " files: " + str(len(units)) + " translation units, "
+		+ str(include_count) + " includes of project files, " + str(unresolved_count) + " unresolved includes.")
+
+	if units:
+		counts = sorted(((bin(graph.closures[unit]).count("1"), graph.files[unit]) for unit in units), key=lambda entry: (-entry[0], entry[1]))
+		total_lines = sum(graph.transitive_lines(unit) for unit in units)
+		own_lines = sum(graph.scans[unit]["lines"] for unit in units)
+		print()
+		print("Transitive includes of translation units: " + format(sum(count for (count, file) in counts) / len(units), ".1f")
+			+ " on average. The translation units read " + str(total_lines) + " lines of project files, "
+			+ format(100 * (total_lines - own_lines) / max(total_lines, 1), ".1f") + "% of them from headers.")
+		for (count, file) in counts[:top]:
+			print("\t{:>5} {}".format(count, file))
+
+	print()
+	print("Heaviest headers (translation units x transitive lines):")
+	print("\t{:>9} {:>5} {:>7} {}".format("weight", "units", "lines", "header"))
+	for (weight, count, lines, index) in graph.rank_headers()[:top]:
+		print("\t{:>9} {:>5} {:>7} {}".format(weight, count, lines, graph.files[index]))
+
+	print()
+	cycles = [component for component in graph.components if graph.is_cycle(component)]
+	if cycles:
+		print("Include cycles:")
+		for component in cycles:
+			print("\t" + " -> ".join(graph.files[index] for index in graph.find_cycle(component)))
+	else:
+		print("No include cycles found.")
+
+	print()
+	candidates = graph.find_forward_declarations()
+	if candidates:
+		print("Includes that could be replaced by forward declarations:")
+		for (index, line, target, names) in candidates:
+			print("\t" + graph.files[index] + ":" + str(line) + ": " + graph.files[target] + " (" + ", ".join(names) + ")")
+	else:
+		print("No includes could be replaced by forward declarations.")
+
+
+# Writes an include graph and its rankings to a JSON file.
+# Parameters:
+# graph: the IncludeGraph
+# path: the path of the JSON file
+# No return value.
+def write_json(graph, path):
+	files = {}
+	for (index, file) in enumerate(graph.files):
+		files[file] = {
+			"lines": graph.scans[index]["lines"],
+			"includes": [graph.files[target] for target in graph.edges[index]],
+			"transitiveIncludes": len(members(graph.closures[index])),
+			"transitiveLines": graph.transitive_lines(index),
+			"unresolved": graph.unresolved.get(file, [])
+		}
+	data = {
+		"files": files,
+		"headers": [{"header": graph.files[index], "weight": weight, "translationUnits": count, "transitiveLines": lines}
+					for (weight, count, lines, index) in graph.rank_headers()],
+		"cycles": [[graph.files[index] for index in graph.find_cycle(component)] for component in graph.components if graph.is_cycle(component)],
+		"forwardDeclarations": [{"file": graph.files[index], "line": line, "include": graph.files[target], "names": names}
+								for (index, line, target, names) in graph.find_forward_declarations()]
+	}
+	with open(path, "w", encoding="utf-8") as f:
+		json.dump(data, f, indent="\t")
+		f.write("\n")
+
+
+# Gets the value of a command line option, exiting with a usage error if it is missing or not valid.
+# Parameters:
+# index: the index of the value in the command line arguments, right after the option
+# convert: the function converting the value, such as parse_count
+# Returns: the converted value
+def option_value(index, convert=str):
+	if index >= len(sys.argv):
+		print("Missing value of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+	try:
+		return convert(sys.argv[index])
+	except ValueError:
+		print("Invalid value '" + sys.argv[index] + "' of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+
+
+# Parses a count given on the command line.
+# Parameters:
+# text: the text of the count
+# Returns: the count, which is not negative
+def parse_count(text):
+	count = int(text)
+	if count < 0:
+		raise ValueError("negative count " + text)
+	return count
+
+
+if __name__ == '__main__':
+	jobs = 0
+	use_cache = True
+	top = 20
+	json_file = None
+	patterns = []
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-h" or arg == "--help":
+			print_help()
+			exit(0)
+		elif arg == "-j" or arg == "--jobs":
+			i += 1
+			jobs = option_value(i, parse_count) if i < len(sys.argv) else 0
+		elif arg == "--no-cache":
+			use_cache = False
+		elif arg == "--top":
+			i += 1
+			top = option_value(i, parse_count)
+		elif arg == "--json":
+			i += 1
+			json_file = option_value(i)
+		elif arg.startswith("-"):
+			print("Unknown option '" + arg + "'")
+			exit(3)
+		else:
+			patterns.append(arg)
+		i += 1
+	if jobs <= 0:
+		jobs = os.cpu_count() or 1
+
+	files = []
+	if len(patterns) > 0:
+		for pattern in patterns:
+			files += glob.glob(pattern, recursive=True)
+	else:
+		for extension in ("cpp", "h", "hpp"):
+			files += glob.glob("source/**/*." + extension, recursive=True) + glob.glob("tests/**/*." + extension, recursive=True)
+	files = sorted(set(os.path.normpath(file) for file in files if os.path.isfile(file)))
+
+	if use_cache:
+		# The scans depend on the sanitizer of the code style checker.
+		cache = ResultCache("include-graph", fingerprint([__file__, os.path.join(os.path.dirname(os.path.abspath(__file__)), "check_code_style.py")], {}))
+
+	pool = None
+	if jobs > 1 and len(files) > 1:
+		# Imported here, since single-process runs do not need it.
+		import multiprocessing
+		pool = multiprocessing.Pool(min(jobs, len(files)), init_worker, (cache,))
+		scans = dict(pool.imap_unordered(scan_file, files, chunksize=8))
+		pool.close()
+		pool.join()
+	else:
+		scans = dict(map(scan_file, files))
+	if cache is not None:
+		cache.trim()
+
+	graph = IncludeGraph(scans)
+	print_report(graph, top)
+	if json_file is not None:
+		write_json(graph, json_file)
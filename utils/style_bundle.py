@@ -0,0 +1,98 @@
+# style_bundle.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import sys
+
+import regex as re
+
+# Precompiled pattern bundles of the style checker scripts.
+# Compiling the rules is a noticeable part of the startup of the checkers. The regex module pickles a pattern
+# as its compiled program, so a pickled pattern is restored much faster than it is compiled from its source.
+# A bundle maps the source of each pattern to the compiled pattern, so a changed rule never uses a stale entry:
+# its new source is simply missing from the bundle, and the bundle is written again.
+# Loading a bundle unpickles it, which can run arbitrary code, so bundles are only used in the directory
+# of these scripts. The rules of any other configuration file, such as one of a plugin, are always compiled.
+
+# The version of the bundle file format.
+bundle_format = 1
+
+
+# Gets the path of the bundle that belongs to a file, such as the configuration file of the rules.
+# Parameters:
+# file: the path of the file
+# Returns: the path of the bundle, next to the file, or None if the file is not in the directory of this script
+def bundle_path(file):
+	directory = os.path.dirname(os.path.realpath(file))
+	if directory != os.path.dirname(os.path.realpath(__file__)):
+		return None
+	return os.path.splitext(file)[0] + ".bundle"
+
+
+# A class compiling patterns, reusing the patterns of a bundle file.
+# path: the path of the bundle file, or None to compile every pattern
+class PatternBundle(object):
+
+	def __init__(self, path):
+		self.path = path
+		# The compiled programs depend on the regex module and the Python version.
+		self.version = [bundle_format, re.__version__, sys.version]
+		# The patterns loaded from the bundle, and the patterns that were compiled or looked up since, by source.
+		self.loaded = {}
+		self.used = {}
+		# Whether any pattern was missing from the bundle.
+		self.missing = False
+		if path is not None:
+			try:
+				with open(path, "rb") as f:
+					(version, patterns) = pickle.load(f)
+				if version == self.version:
+					self.loaded = patterns
+			except (OSError, EOFError, ValueError, TypeError, AttributeError, pickle.UnpicklingError):
+				# A missing or damaged bundle is rebuilt.
+				pass
+
+	# Compiles a pattern, or takes it from the bundle.
+	# Parameters:
+	# pattern: the source of the pattern
+	# Returns: the compiled pattern
+	def compile(self, pattern):
+		compiled = self.used.get(pattern)
+		if compiled is None:
+			compiled = self.loaded.get(pattern)
+			if compiled is None:
+				compiled = re.compile(pattern)
+				self.missing = True
+			self.used[pattern] = compiled
+		return compiled
+
+	# Writes the patterns that were used to the bundle file, if the bundle was missing any of them,
+	# or had patterns that are no longer used.
+	# Takes no parameters and has no return value.
+	def save(self):
+		if self.path is None or (not self.missing and len(self.used) == len(self.loaded)):
+			return
+		temp = self.path + ".tmp" + str(os.getpid())
+		try:
+			with open(temp, "wb") as f:
+				pickle.dump((self.version, self.used), f)
+			os.replace(temp, self.path)
+		except OSError:
+			# The bundle is only an optimization; read-only checkouts simply compile every time.
+			if os.path.exists(temp):
+				os.remove(temp)
+			return
+		self.loaded = dict(self.used)
+		self.missing = False
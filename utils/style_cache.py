@@ -0,0 +1,133 @@
+# style_cache.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import glob
+import hashlib
+import json
+import os
+
+# Persistent result cache shared by the style checker scripts.
+# Each entry is stored as a small JSON file, keyed by the hash of the checked file's contents and the checker's rules.
+# Entries are evicted in least-recently-used order, using the file modification times to track usage.
+
+# The default location of the cache, relative to the root of the repository.
+default_directory = ".cache/style-check"
+# The default maximum number of entries kept per checker.
+default_max_entries = 4096
+# The size of the chunks in which files are read when computing their keys.
+read_size = 1 << 16
+
+
+# Computes a fingerprint of the checker's rules and implementation.
+# The source files of the shared style modules are always included, so any change to the scripts invalidates the cache.
+# Parameters:
+# sources: the paths of additional files whose contents are part of the fingerprint
+# rules: a JSON-serializable object describing the checker's rules
+# Returns: the hexadecimal fingerprint
+def fingerprint(sources, rules):
+	digest = hashlib.sha256()
+	shared = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "style_*.py"))
+	for source in sorted(set(os.path.abspath(source) for source in sources)) + sorted(shared):
+		with open(source, "rb") as f:
+			digest.update(f.read())
+	digest.update(json.dumps(rules, sort_keys=True).encode("utf-8"))
+	return digest.hexdigest()
+
+
+# A class representing an on-disk cache of check results.
+# name: the name of the checker; each checker has its own subdirectory
+# rules_fingerprint: the fingerprint of the checker's rules, as returned by fingerprint()
+# directory: the root directory of the cache
+# max_entries: the maximum number of entries to keep after trimming
+class ResultCache(object):
+
+	def __init__(self, name, rules_fingerprint, directory=default_directory, max_entries=default_max_entries):
+		self.directory = os.path.join(directory, name)
+		self.rules_fingerprint = rules_fingerprint
+		self.max_entries = max_entries
+
+	# Computes the cache key of a file.
+	# Parameters:
+	# file: the path to the file; this is part of the key, since some checks depend on the file name
+	# contents: the contents of the file, as a string or bytes, or a binary file object, which is read in chunks
+	# so that the whole file is never in memory. Either way, the same contents give the same key.
+	# Returns: the key
+	def key(self, file, contents):
+		digest = hashlib.sha256()
+		digest.update(self.rules_fingerprint.encode("utf-8"))
+		digest.update(b"\0" + file.encode("utf-8", "surrogateescape") + b"\0")
+		if isinstance(contents, str):
+			digest.update(contents.encode("utf-8", "surrogateescape"))
+		elif isinstance(contents, bytes):
+			digest.update(contents)
+		else:
+			for chunk in iter(lambda: contents.read(read_size), b""):
+				digest.update(chunk)
+		return digest.hexdigest()
+
+	# Gets the path of the entry with the specified key.
+	# Parameters:
+	# key: the key of the entry
+	# Returns: the path of the file storing the entry
+	def path(self, key):
+		return os.path.join(self.directory, key[:2], key + ".json")
+
+	# Looks up an entry, marking it as recently used.
+	# Parameters:
+	# key: the key of the entry
+	# Returns: the stored value, or None if there is no valid entry
+	def get(self, key):
+		path = self.path(key)
+		try:
+			with open(path, "r", encoding="utf-8") as f:
+				value = json.load(f)
+			os.utime(path)
+			return value
+		except (OSError, ValueError):
+			return None
+
+	# Stores an entry. Writes are atomic, so concurrent workers never observe partial entries.
+	# Parameters:
+	# key: the key of the entry
+	# value: the JSON-serializable value
+	# No return value.
+	def put(self, key, value):
+		path = self.path(key)
+		temp = path + "." + str(os.getpid()) + ".tmp"
+		try:
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			with open(temp, "w", encoding="utf-8") as f:
+				json.dump(value, f)
+			os.replace(temp, path)
+		except OSError:
+			# The cache is only an optimization; failing to store an entry is not an error.
+			pass
+
+	# Evicts the least recently used entries until at most max_entries remain.
+	# Takes no parameters and has no return value.
+	def trim(self):
+		entries = []
+		for path in glob.glob(os.path.join(self.directory, "*", "*.json")):
+			try:
+				entries.append((os.path.getmtime(path), path))
+			except OSError:
+				pass
+		if len(entries) <= self.max_entries:
+			return
+		entries.sort()
+		for (mtime, path) in entries[:len(entries) - self.max_entries]:
+			try:
+				os.remove(path)
+			except OSError:
+				pass
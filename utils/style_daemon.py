@@ -0,0 +1,393 @@
+#!/usr/bin/python
+# style_daemon.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+import socket
+import sys
+
+# A long-running server for the style checkers, and a client for it.
+# The server loads the content style rules and the code style tables once, and checks files or in-memory buffers
+# on request, so that editors and hooks do not pay the startup of the checker scripts for every file.
+#
+# The protocol is line-based: each request and each response is a single JSON object on its own line,
+# and a connection may carry any number of requests. Requests have a "command" entry:
+# - "check": checks a file. "path" is the path of the file, relative to the directory of the server or absolute.
+#   If "text" is given, it is checked instead of the contents of the file, and the file is not touched.
+#   "kind" is either "content" or "code"; by default, it is "code" for .cpp and .h files, and "content" otherwise.
+#   If "autoCorrect" is true, the issues of data files are corrected where possible. Corrections of files are written
+#   to the files; corrections of buffers are returned in the "text" entry of the response.
+#   The response contains the "path" and the "kind", and "errors", "warnings", "fixedErrors" and "fixedWarnings" lists.
+#   Each issue has a "line", a "reason" and the "message" as the checker script would print it.
+# - "ping": responds with the "root" directory of the server and its process "pid".
+# - "shutdown": stops the server after responding.
+# Failed requests are answered with an "error" entry.
+#
+# The client is the command line interface of this script. The checker modules are only imported by the server,
+# so the client starts quickly.
+
+# The default path of the socket, relative to the root of the repository.
+default_socket = os.path.join(".cache", "style-check", "daemon.sock")
+# The extensions of the files checked by the code style checker.
+code_extensions = (".cpp", ".h")
+
+
+# Prints a help message. This is used when the --help option is given.
+# Accepts no parameters and has no return value.
+def print_help():
+	help_message = [
+		["Style checker daemon for Endless Sky."],
+		["Usage: style_daemon [OPTION]... [FILE]..."],
+		["Checks the specified files with a running style checker daemon. The daemon is started with the --serve option."],
+		["The daemon keeps the rules of both style checkers in memory, so that single files are checked without the startup time of the checker scripts."],
+		["This script should be run from the root of the repository."],
+		[],
+		["Options:"],
+		["", "-h", "--help", "Display this help message and exit."],
+		["", "", "--serve", "Starts the daemon, and serves requests until it is stopped."],
+		["", "", "--stop", "Stops the running daemon."],
+		["", "-S", "--socket [path]", "Specifies the path of the socket. The default value is './" + default_socket + "'."],
+		["", "-f", "--format-file [file]", "Specifies the location of the JSON file with the content formatting rules, when starting the daemon. The default value is './utils/contentStyle.json'."],
+		["", "-a", "--auto-correct", "Attempts to automatically correct formatting issues in data files."],
+		["", "", "--stdin [path]", "Checks the text read from the standard input, as if it was the contents of the specified file. With --auto-correct, the corrected text is written to the standard output instead of the report."],
+		["", "", "--json", "Prints the responses of the daemon as JSON lines, instead of the report."],
+		[],
+		["Exit codes:"],
+		["", "0", "Successful execution and no formatting errors found."],
+		["", "1", "The daemon is not running, or another daemon is already listening on the socket."],
+		["", "2", "Configuration file is not available or is not properly formatted."],
+		["", "3", "An unknown option, or an option without its value, was passed via command line."],
+		["", "4", "Successful execution, but there are remaining formatting errors."],
+	]
+	for row in help_message:
+		print("{:<4} {:<2} {:<20} {:<}".format(*[*row, "", "", "", ""]).rstrip())
+
+
+# A class holding the state of the server: the loaded checker modules and the compiled content style rules.
+# The content style rules are loaded again if the format file changes.
+# format_file: the path of the content style configuration file
+class CheckerState(object):
+
+	def __init__(self, format_file):
+		# The code style tables are compiled when the first source file is checked.
+		import check_code_style
+		import check_content_style
+		self.code_style = check_code_style
+		self.content_style = check_content_style
+		self.format_file = format_file
+		self.format_mtime = None
+		self.rules = None
+		self.load()
+
+	# Loads the content style rules, unless they are up to date.
+	# Takes no parameters.
+	# Returns: true if the rules are available
+	def load(self):
+		mtime = os.stat(self.format_file).st_mtime_ns
+		if mtime != self.format_mtime:
+			config = self.content_style.load_config(self.format_file)
+			if config is None:
+				return self.rules is not None
+			try:
+				rules = self.content_style.compile_rules(config["rules"])
+			except ValueError as e:
+				print("Could not load the configuration: " + str(e), flush=True)
+				return self.rules is not None
+			self.config = config
+			self.rules = rules
+			# The remembered results of the line memo belong to the old rules.
+			if self.content_style.line_memo is not None:
+				self.content_style.line_memo.clear()
+			self.format_mtime = mtime
+		return True
+
+	# Checks a data file or buffer with the content style checker.
+	# Parameters:
+	# path: the path of the file, relative to the root
+	# text: the contents of the buffer, or None to check the file
+	# auto_correct: whether to attempt to correct formatting issues
+	# Returns: the response to the request
+	def check_content(self, path, text, auto_correct):
+		self.load()
+		result = self.content_style.check_content_style(path, auto_correct, self.rules, text)
+		response = {
+			"errors": [issue_to_json(error) for error in sorted(result.errors)],
+			"warnings": [issue_to_json(warning) for warning in sorted(result.warnings)],
+			"fixedErrors": [issue_to_json(error) for error in sorted(result.fixed_errors)],
+			"fixedWarnings": [issue_to_json(warning) for warning in sorted(result.fixed_warnings)]
+		}
+		if text is not None and result.should_reload():
+			response["text"] = self.content_style.join_lines(result.new_file_contents)
+		return response
+
+	# Checks a source file or buffer with the code style checker.
+	# Parameters:
+	# path: the path of the file, relative to the root
+	# text: the contents of the buffer, or None to check the file
+	# Returns: the response to the request
+	def check_code(self, path, text):
+		if text is None:
+			with open(path, "r", newline='') as f:
+				lines = f.readlines()
+		else:
+			lines = io.StringIO(text, newline='').readlines()
+		(errors, warnings) = self.code_style.check_code_style(path, lines)
+		return {
+			"errors": [issue_to_json(error) for error in sorted(set(errors))],
+			"warnings": [issue_to_json(warning) for warning in sorted(set(warnings))],
+			"fixedErrors": [],
+			"fixedWarnings": []
+		}
+
+	# Handles a single request.
+	# Parameters:
+	# request: the decoded request
+	# Returns: the response to the request
+	def handle(self, request):
+		command = request.get("command")
+		if command == "ping":
+			return {"root": os.getcwd(), "pid": os.getpid()}
+		if command != "check":
+			return {"error": "unknown command '" + str(command) + "'"}
+		if not isinstance(request.get("path"), str):
+			return {"error": "missing path"}
+		if not isinstance(request.get("kind"), (str, type(None))) or not isinstance(request.get("text"), (str, type(None))):
+			return {"error": "malformed request"}
+		# Paths are matched against the blacklists of the checkers, which are relative to the root.
+		path = os.path.relpath(request["path"]) if os.path.isabs(request["path"]) else request["path"]
+		kind = request.get("kind") or ("code" if path.endswith(code_extensions) else "content")
+		text = request.get("text")
+		try:
+			if kind == "content":
+				response = self.check_content(path, text, bool(request.get("autoCorrect")))
+			elif kind == "code":
+				response = self.check_code(path, text)
+			else:
+				return {"error": "unknown kind '" + kind + "'"}
+		except (OSError, ValueError) as e:
+			# Files that cannot be read, or that are not valid UTF-8
+			return {"error": str(e), "path": request["path"]}
+		response["path"] = request["path"]
+		response["kind"] = kind
+		return response
+
+
+# Converts an issue found by either checker to JSON.
+# Parameters:
+# issue: the Error or Warning
+# Returns: a dict of the line, the reason and the message of the issue
+def issue_to_json(issue):
+	return {"line": issue.line, "reason": issue.reason, "message": str(issue).lstrip("\t")}
+
+
+# Runs the server until it receives a shutdown request.
+# Parameters:
+# socket_path: the path of the socket
+# format_file: the path of the content style configuration file
+# Returns: the exit code
+def serve(socket_path, format_file):
+	running = connect(socket_path)
+	if running is not None:
+		running.close()
+		print("A style daemon is already listening on '" + socket_path + "'.")
+		return 1
+	try:
+		state = CheckerState(format_file)
+	except OSError as e:
+		print("Could not load the configuration: " + str(e))
+		return 2
+	if state.rules is None:
+		return 2
+
+	os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+	if os.path.exists(socket_path):
+		# The socket of a daemon that did not shut down cleanly.
+		os.remove(socket_path)
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	server.bind(socket_path)
+	server.listen()
+	print("Listening on '" + socket_path + "'.", flush=True)
+	running = True
+	try:
+		while running:
+			(connection, address) = server.accept()
+			try:
+				running = serve_connection(connection, state)
+			except (OSError, ValueError):
+				# The client disconnected, or did not send UTF-8; the next client is still served.
+				pass
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.close()
+		os.remove(socket_path)
+	return 0
+
+
+# Answers the requests of a single client, until it disconnects or sends a shutdown request.
+# Parameters:
+# connection: the socket of the client
+# state: the CheckerState
+# Returns: false if the daemon should shut down
+def serve_connection(connection, state):
+	with connection, connection.makefile("rw", encoding="utf-8", newline="\n") as stream:
+		for line in stream:
+			try:
+				request = json.loads(line)
+			except ValueError:
+				request = None
+			if not isinstance(request, dict):
+				response = {"error": "malformed request"}
+			elif request.get("command") == "shutdown":
+				stream.write(json.dumps({"pid": os.getpid()}) + "\n")
+				stream.flush()
+				return False
+			else:
+				try:
+					response = state.handle(request)
+				except Exception as e:
+					# A failed check must not stop the daemon for every later client.
+					response = {"error": type(e).__name__ + ": " + str(e)}
+			stream.write(json.dumps(response) + "\n")
+			stream.flush()
+	return True
+
+
+# Connects to the daemon.
+# Parameters:
+# socket_path: the path of the socket
+# Returns: the connected socket, or None if no daemon is listening
+def connect(socket_path):
+	client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		client.connect(socket_path)
+	except OSError:
+		client.close()
+		return None
+	return client
+
+
+# Sends requests to the daemon over a single connection.
+# Parameters:
+# client: the connected socket
+# requests: the requests to send
+# Returns: a generator of the responses, in the order of the requests
+def send(client, requests):
+	with client.makefile("rw", encoding="utf-8", newline="\n") as stream:
+		for request in requests:
+			stream.write(json.dumps(request) + "\n")
+			stream.flush()
+			yield json.loads(stream.readline())
+
+
+# Prints a response of the daemon in the format of the checker scripts.
+# Parameters:
+# response: the response to a check request
+# No return value.
+def print_response(response):
+	if "error" in response:
+		print(response.get("path", "") + ": " + response["error"])
+	elif response["errors"] or response["warnings"]:
+		print(response["path"])
+		for issue in response["errors"] + response["warnings"]:
+			print("\t" + issue["message"])
+
+
+# Gets the value of a command line option, exiting with a usage error if it is missing.
+# Parameters:
+# index: the index of the value in the command line arguments, right after the option
+# Returns: the value
+def option_value(index):
+	if index >= len(sys.argv):
+		print("Missing value of option '" + sys.argv[index - 1] + "'")
+		exit(3)
+	return sys.argv[index]
+
+
+if __name__ == '__main__':
+	socket_path = default_socket
+	format_file = "./utils/contentStyle.json"
+	start_server = False
+	stop_server = False
+	auto_correct = False
+	stdin_path = None
+	print_json = False
+	files = []
+	i = 1
+	while i < len(sys.argv):
+		arg = sys.argv[i]
+		if arg == "-h" or arg == "--help":
+			print_help()
+			exit(0)
+		elif arg == "--serve":
+			start_server = True
+		elif arg == "--stop":
+			stop_server = True
+		elif arg == "-S" or arg == "--socket":
+			i += 1
+			socket_path = option_value(i)
+		elif arg == "-f" or arg == "--format-file":
+			i += 1
+			format_file = option_value(i)
+		elif arg == "-a" or arg == "--auto-correct":
+			auto_correct = True
+		elif arg == "--stdin":
+			i += 1
+			stdin_path = option_value(i)
+		elif arg == "--json":
+			print_json = True
+		elif arg.startswith("-"):
+			print("Unknown option '" + arg + "'")
+			exit(3)
+		else:
+			files.append(arg)
+		i += 1
+
+	if start_server:
+		exit(serve(socket_path, format_file))
+
+	client = connect(socket_path)
+	if client is None:
+		print("No style daemon is listening on '" + socket_path + "'. Start one with --serve.")
+		exit(1)
+	if stop_server:
+		with client:
+			for response in send(client, [{"command": "shutdown"}]):
+				pass
+		exit(0)
+
+	if stdin_path is not None:
+		text = sys.stdin.read()
+		requests = [{"command": "check", "path": stdin_path, "text": text, "autoCorrect": auto_correct}]
+		files = [stdin_path]
+	else:
+		requests = [{"command": "check", "path": os.path.abspath(file), "autoCorrect": auto_correct} for file in files]
+
+	error_count = 0
+	with client:
+		for (file, response) in zip(files, send(client, requests)):
+			error_count += len(response.get("errors", [])) + ("error" in response)
+			if print_json:
+				print(json.dumps(response))
+			elif stdin_path is not None and auto_correct:
+				# Used as a formatter: the buffer is replaced by the output.
+				sys.stdout.write(response.get("text", text))
+			else:
+				# Reporting the paths as they were given.
+				response["path"] = file
+				print_response(response)
+
+	exit(4 if error_count > 0 else 0)
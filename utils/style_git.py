@@ -0,0 +1,73 @@
+# style_git.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import os.path
+import subprocess
+
+import regex as re
+
+# Helpers for restricting the style checkers to the files and lines changed relative to a git reference.
+# All paths are relative to the current working directory, which is expected to be inside the repository.
+
+# Matches the header of a hunk in a diff with no context lines, capturing the range of the new lines.
+hunk_header = re.compile("^@@ -\\d+(?:,\\d+)? \\+(\\d+)(?:,(\\d+))? @@")
+
+
+# Runs a git command and returns its output.
+# Parameters:
+# args: the arguments of the git command
+# Returns: the standard output of the command
+# Raises subprocess.CalledProcessError if git fails, for example because the reference does not exist.
+def run_git(args):
+	return subprocess.run(["git"] + args, check=True, capture_output=True, text=True).stdout
+
+
+# Lists the files that were modified, added or renamed since the specified reference.
+# This includes uncommitted changes and untracked files that are not ignored.
+# Parameters:
+# ref: the git reference to compare against
+# Returns: a set of normalized paths
+def changed_files(ref):
+	files = run_git(["diff", "--name-only", "--relative", "--diff-filter=AMR", "-z", ref, "--"]).split("\0")
+	files += run_git(["ls-files", "--others", "--exclude-standard", "-z"]).split("\0")
+	return {os.path.normpath(file) for file in files if file}
+
+
+# Finds the lines of a file that were changed since the specified reference.
+# Parameters:
+# ref: the git reference to compare against
+# file: the path to the file
+# Returns: a set of (1-based) line numbers in the current version of the file,
+# or None if the file is not tracked, in which case every line counts as changed
+def changed_lines(ref, file):
+	if not run_git(["ls-files", "--", file]):
+		return None
+	lines = set()
+	for line in run_git(["diff", "--unified=0", "--no-color", ref, "--", file]).splitlines():
+		match = hunk_header.match(line)
+		if match:
+			start = int(match.group(1))
+			count = 1 if match.group(2) is None else int(match.group(2))
+			lines.update(range(start, start + count))
+	return lines
+
+
+# Filters the specified file list to the files changed since the specified reference.
+# Parameters:
+# files: the list of paths to filter
+# ref: the git reference to compare against
+# Returns: the filtered list, in the original order
+def filter_changed(files, ref):
+	changed = changed_files(ref)
+	return [file for file in files if os.path.normpath(file) in changed]
@@ -0,0 +1,149 @@
+# style_header.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import regex as re
+
+from style_regex import line_body
+
+# Verification of the copyright headers of the style checker scripts.
+# A header format is a sequence of parts, each of which matches one or more lines. The formats are compiled into
+# a single pattern, anchored at the start of the file, which is matched against the lines of the file joined by line
+# feeds, with a line feed after every line. Only the leading lines of a file are matched, unless the header is longer.
+# The parts are built by the functions below; a part is None if its pattern cannot be converted.
+
+# The number of leading lines that are matched first.
+default_limit = 64
+
+
+# Builds a part matching a line with the specified text.
+# Parameters:
+# text: the text of the line
+# Returns: the part
+def literal_line(text):
+	return re.escape(text) + "\\n"
+
+
+# Builds a part matching a line that is entirely matched by a pattern.
+# Parameters:
+# pattern: the pattern
+# Returns: the part, or None if the pattern is not supported
+def full_line(pattern):
+	body = line_body(pattern)
+	return None if body is None else "(?:" + body + ")\\n"
+
+
+# Builds a part matching a line that contains a match of a pattern.
+# Parameters:
+# pattern: the pattern
+# Returns: the part, or None if the pattern is not supported
+def containing_line(pattern):
+	body = line_body(pattern)
+	# The prefix is greedy, since lazy quantifiers can report partial matches where there are none.
+	return None if body is None else "[^\\n]*(?:" + body + ")[^\\n]*\\n"
+
+
+# Builds a part matching any line.
+# Takes no parameters.
+# Returns: the part
+def any_line():
+	return "[^\\n]*\\n"
+
+
+# Builds a part skipping any number of lines, as few as possible.
+# Takes no parameters.
+# Returns: the part
+def skipped_lines():
+	return "(?:[^\\n]*\\n)*?"
+
+
+# Builds a part matching one or more lines that match another part. As many lines as possible are taken,
+# and none of them are given back to the following parts.
+# Parameters:
+# part: the part of a single line
+# Returns: the part, or None if the part of a single line is None
+def repeated(part):
+	return None if part is None else "(?>(?:" + part + ")+)"
+
+
+# Builds a part matching the specified parts in order, where the file may end before any of them.
+# Parameters:
+# parts: the list of parts
+# Returns: the part, or None if any of the parts is None
+def truncatable(parts):
+	if any(part is None for part in parts):
+		return None
+	return "".join("(?:\\Z|" + part for part in parts) + ")" * len(parts)
+
+
+# Joins lines into the text that the header patterns are matched against.
+# Parameters:
+# lines: the lines, without line separators
+# Returns: the text, with a line feed after every line
+def join_lines(lines):
+	return "".join(line + "\n" for line in lines)
+
+
+# A class verifying that files start with a header in one of the specified formats.
+# formats: a list of formats, each a list of parts; without any formats, no header is valid
+# compile: the function compiling the pattern
+# limit: the number of leading lines that are matched first
+class HeaderVerifier(object):
+
+	def __init__(self, formats, compile=re.compile, limit=default_limit):
+		alternatives = "|".join("(?:" + "".join(parts) + ")" for parts in formats) if formats else "(?!)"
+		self.regex = compile("(?m)\\A(?:" + alternatives + ")")
+		self.limit = limit
+
+	# Checks whether the leading lines of a file decide if it starts with a valid header.
+	# Parameters:
+	# lines: the leading lines of the file, without line separators
+	# Returns: true or false if the header is valid or not, or None if that depends on the lines after them
+	def verify_prefix(self, lines):
+		text = join_lines(lines)
+		match = self.regex.match(text, partial=True)
+		if match is None:
+			return False
+		# A match that reaches the end of the leading lines may depend on the lines after them.
+		if not match.partial and match.end() < len(text):
+			return True
+		return None
+
+	# Checks whether the lines start with a valid header.
+	# Parameters:
+	# lines: the lines of the file, without line separators
+	# Returns: true if the header is valid
+	def verify(self, lines):
+		if len(lines) > self.limit:
+			valid = self.verify_prefix(lines[:self.limit])
+			if valid is not None:
+				return valid
+		return self.regex.match(join_lines(lines)) is not None
+
+	# Finds the first line that cannot be part of a valid header.
+	# Each line is checked as if more lines could follow it, so only lines that are wrong in any case are reported.
+	# Parameters:
+	# lines: the lines of the file, without line separators
+	# Returns: the index of the line, or the number of lines if the file ends before the header is complete
+	def first_mismatch(self, lines):
+		# Whether the first count lines can start a valid header only gets false once, so the first mismatch is
+		# found by bisection.
+		low = 0
+		high = len(lines)
+		while low < high:
+			count = (low + high + 1) // 2
+			if self.regex.match(join_lines(lines[:count]), partial=True) is None:
+				high = count - 1
+			else:
+				low = count
+		return low
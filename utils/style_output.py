@@ -0,0 +1,187 @@
+# style_output.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import pathlib
+import sys
+import urllib.parse
+
+import regex as re
+
+# Machine-readable output of the style checker scripts.
+# The issues of each file are written as soon as the file is checked, so that the output can be consumed incrementally.
+# Every issue is identified by a rule ID, which is derived from the description of the rule that reported it.
+
+# The supported output formats. "text" is the format of the checker scripts themselves.
+output_formats = ["text", "jsonl", "sarif"]
+sarif_schema = "https://json.schemastore.org/sarif-2.1.0.json"
+information_uri = "https://github.com/endless-sky/endless-sky"
+# The base of the relative paths in a SARIF log, which consumers such as GitHub code scanning resolve to the root
+# of the repository.
+source_root = "%SRCROOT%"
+
+
+# Gets the rule ID of an issue. Issues whose reason is not a fixed string, such as timeouts, have an explicit rule ID.
+# Parameters:
+# issue: the Error or Warning of either checker
+# Returns: the rule ID, such as 'missing-trailing-empty-line'
+def rule_id(issue):
+	rule = getattr(issue, "rule", None)
+	if rule is not None:
+		return rule
+	return re.sub("[^a-z0-9]+", "-", issue.reason.lower()).strip("-")
+
+
+# Converts an issue to a record of the JSON lines output.
+# Parameters:
+# file: the path of the file
+# issue: the Error or Warning
+# severity: either "error" or "warning"
+# fixed: whether the issue was corrected
+# Returns: the record, as a dict
+def issue_record(file, issue, severity, fixed):
+	record = {
+		"file": file,
+		"line": issue.line,
+		"severity": severity,
+		"rule": rule_id(issue),
+		"message": issue.reason,
+		"fixed": fixed
+	}
+	# The code style checker also reports the offending text.
+	text = getattr(issue, "text", None)
+	if text:
+		record["text"] = text
+	return record
+
+
+# Lists the records of the issues of a single file.
+# Parameters:
+# file: the path of the file
+# errors: the errors of the file
+# warnings: the warnings of the file
+# fixed_errors: the corrected errors of the file
+# fixed_warnings: the corrected warnings of the file
+# Returns: a list of records, ordered by line
+def file_records(file, errors, warnings, fixed_errors=(), fixed_warnings=()):
+	records = [issue_record(file, issue, "error", False) for issue in errors]
+	records += [issue_record(file, issue, "warning", False) for issue in warnings]
+	records += [issue_record(file, issue, "error", True) for issue in fixed_errors]
+	records += [issue_record(file, issue, "warning", True) for issue in fixed_warnings]
+	# The sort is stable, so errors stay before warnings on the same line.
+	records.sort(key=lambda record: record["line"])
+	return records
+
+
+# A class writing one JSON object per issue.
+# output: the stream to write to
+class JsonLinesReporter(object):
+
+	def __init__(self, output):
+		self.output = output
+
+	# Writes the issues of a single file.
+	# Parameters:
+	# file: the path of the file
+	# errors: the errors of the file
+	# warnings: the warnings of the file
+	# fixed_errors: the corrected errors of the file
+	# fixed_warnings: the corrected warnings of the file
+	# No return value.
+	def report(self, file, errors, warnings, fixed_errors=(), fixed_warnings=()):
+		for record in file_records(file, errors, warnings, fixed_errors, fixed_warnings):
+			self.output.write(json.dumps(record) + "\n")
+		self.output.flush()
+
+	# Finishes the output.
+	# Takes no parameters and has no return value.
+	def finish(self):
+		pass
+
+
+# Gets the SARIF artifact location of a file.
+# Parameters:
+# file: the path of the file, relative to the root of the repository or absolute
+# Returns: a dict with the URI of the file, and its base if it is relative
+def artifact_location(file):
+	path = pathlib.PurePath(file)
+	if path.is_absolute():
+		return {"uri": pathlib.Path(path).as_uri()}
+	return {"uri": urllib.parse.quote(path.as_posix()), "uriBaseId": source_root}
+
+
+# A class writing a SARIF log. The results are written as soon as they are reported,
+# and the description of the tool and its rules is written after them, once every rule that was reported is known.
+# output: the stream to write to
+# tool: the name of the checker
+class SarifReporter(object):
+
+	def __init__(self, output, tool):
+		self.output = output
+		self.tool = tool
+		# The description of each reported rule, by rule ID
+		self.rules = {}
+		self.first = True
+		self.output.write("{\"$schema\": " + json.dumps(sarif_schema) + ", \"version\": \"2.1.0\", \"runs\": [{\"results\": [")
+
+	# Writes the issues of a single file.
+	# Parameters:
+	# file: the path of the file
+	# errors: the errors of the file
+	# warnings: the warnings of the file
+	# fixed_errors: the corrected errors of the file
+	# fixed_warnings: the corrected warnings of the file
+	# No return value.
+	def report(self, file, errors, warnings, fixed_errors=(), fixed_warnings=()):
+		for record in file_records(file, errors, warnings, fixed_errors, fixed_warnings):
+			self.rules.setdefault(record["rule"], record["message"])
+			location = {"artifactLocation": artifact_location(file)}
+			# Issues of the whole file are reported on line 0.
+			if record["line"] > 0:
+				location["region"] = {"startLine": record["line"]}
+			result = {
+				"ruleId": record["rule"],
+				"level": "none" if record["fixed"] else record["severity"],
+				"message": {"text": record["message"]},
+				"locations": [{"physicalLocation": location}]
+			}
+			if record["fixed"]:
+				result["properties"] = {"fixed": True}
+			self.output.write(("" if self.first else ", ") + json.dumps(result))
+			self.first = False
+		self.output.flush()
+
+	# Finishes the log by writing the description of the tool.
+	# Takes no parameters and has no return value.
+	def finish(self):
+		driver = {
+			"name": self.tool,
+			"informationUri": information_uri,
+			"rules": [{"id": rule, "shortDescription": {"text": description}} for (rule, description) in sorted(self.rules.items())]
+		}
+		self.output.write("], \"tool\": {\"driver\": " + json.dumps(driver) + "}}]}\n")
+		self.output.flush()
+
+
+# Creates the reporter of an output format.
+# Parameters:
+# output_format: one of the output_formats
+# tool: the name of the checker
+# Returns: the reporter, or None for the text format
+def create_reporter(output_format, tool):
+	if output_format == "jsonl":
+		return JsonLinesReporter(sys.stdout)
+	if output_format == "sarif":
+		return SarifReporter(sys.stdout, tool)
+	return None
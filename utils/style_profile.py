@@ -0,0 +1,119 @@
+# style_profile.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import sys
+
+# Per-rule profiling of the regex checks of the style checker scripts.
+# The checkers record every regex search they perform, so rule authors can see what each pattern costs.
+
+
+# A class representing the statistics of a single rule.
+# group: the group or table the rule belongs to
+# description: the description of the rule
+# pattern: the regex of the rule
+class RuleStats(object):
+
+	def __init__(self, group, description, pattern):
+		self.group = group
+		self.description = description
+		self.pattern = pattern
+		# The number of times the regex was run
+		self.calls = 0
+		# The total time spent running the regex and its exceptions, in seconds
+		self.seconds = 0.0
+		# The number of times the regex matched
+		self.matches = 0
+		# The number of matches that were discarded by exceptions or exclusions
+		self.discarded = 0
+		# The number of matches that were corrected
+		self.corrections = 0
+
+	# Records a single run of the rule.
+	# Parameters:
+	# seconds: the time spent on the run
+	# matched: whether the regex matched
+	# discarded: whether the match was discarded
+	# No return value.
+	def record(self, seconds, matched, discarded):
+		self.calls += 1
+		self.seconds += seconds
+		if matched:
+			self.matches += 1
+			if discarded:
+				self.discarded += 1
+
+	# Converts the statistics to JSON.
+	# Takes no parameters.
+	# Returns: a dict of the group, description and pattern of the rule, and each of its counters
+	def to_json(self):
+		return {
+			"group": self.group,
+			"description": self.description,
+			"pattern": self.pattern,
+			"calls": self.calls,
+			"seconds": self.seconds,
+			"matches": self.matches,
+			"discarded": self.discarded,
+			"corrections": self.corrections
+		}
+
+
+# A class collecting the statistics of every rule, aggregated across all checked files.
+class RuleProfile(object):
+
+	def __init__(self):
+		self.rules = {}
+
+	# Gets the statistics of a rule, creating them if necessary.
+	# Parameters:
+	# group: the group or table the rule belongs to
+	# description: the description of the rule
+	# pattern: the regex of the rule
+	# Returns: the RuleStats of the rule
+	def stats(self, group, description, pattern):
+		key = (group, description, pattern)
+		stats = self.rules.get(key)
+		if stats is None:
+			stats = self.rules[key] = RuleStats(group, description, pattern)
+		return stats
+
+	# Gets the statistics of every rule, with the most expensive rules first.
+	# Takes no parameters.
+	# Returns: a list of RuleStats
+	def sorted(self):
+		return sorted(self.rules.values(), key=lambda stats: stats.seconds, reverse=True)
+
+	# Prints the statistics of every rule as a table.
+	# Parameters:
+	# output: the stream to print to, which is the standard error stream if the issues are written in a machine-readable format
+	# No return value.
+	def print_report(self, output=sys.stdout):
+		row = "{:>10} {:>10} {:>9} {:>9} {:>9}  {:<12} {}"
+		print("", file=output)
+		print("Rule profile:", file=output)
+		print(row.format("Seconds", "Calls", "Matches", "Discarded", "Corrected", "Group", "Rule"), file=output)
+		for stats in self.sorted():
+			print(row.format("{:.4f}".format(stats.seconds), stats.calls, stats.matches, stats.discarded, stats.corrections,
+				stats.group, stats.description), file=output)
+			# Tabulators are shown escaped, so that they stay visible in the report.
+			print(row.format("", "", "", "", "", "", stats.pattern.replace("\t", "\\t")), file=output)
+
+	# Writes the statistics of every rule to a JSON file.
+	# Parameters:
+	# file: the path of the file
+	# No return value.
+	def write_json(self, file):
+		with open(file, "w") as f:
+			json.dump([stats.to_json() for stats in self.sorted()], f, indent="\t")
@@ -0,0 +1,236 @@
+# style_regex.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import sys
+
+# Safeguards against expensive regexes in the rules of the style checker scripts.
+# Patterns are analyzed for constructs that are prone to catastrophic backtracking when rules are written or profiled,
+# and every match of a rule is given a time budget, so that a bad pattern cannot stall the checks indefinitely.
+
+# The default time budget of a single match, in seconds.
+default_timeout = 1.0
+
+
+# Parses the time budget of a single match, as given on the command line.
+# Parameters:
+# text: the time budget, in seconds
+# Returns: the time budget
+# Raises a ValueError if the time budget is not a positive number.
+def parse_timeout(text):
+	timeout = float(text)
+	if not timeout > 0:
+		raise ValueError("the time budget must be positive")
+	return timeout
+
+
+# A class representing the state of a group while a pattern is analyzed.
+# position: the position of the opening parenthesis, or 0 for the whole pattern
+# lookbehind: whether the group is a lookbehind assertion
+class GroupState(object):
+
+	def __init__(self, position, lookbehind):
+		self.position = position
+		self.lookbehind = lookbehind
+		# Whether the group contains a quantifier without an upper bound
+		self.unbounded = False
+		# Whether the group contains a quantifier whose lower and upper bounds differ
+		self.variable = False
+
+
+# Reads the quantifier at the specified position of a pattern.
+# Parameters:
+# pattern: the pattern
+# position: the position right after an atom
+# Returns: a tuple of the kind of the quantifier (None, "fixed", "bounded" or "unbounded") and the position after it
+def read_quantifier(pattern, position):
+	if position >= len(pattern):
+		return None, position
+	char = pattern[position]
+	if char in "*+":
+		kind = "unbounded"
+		position += 1
+	elif char == "?":
+		kind = "bounded"
+		position += 1
+	elif char == "{":
+		end = pattern.find("}", position)
+		bounds = pattern[position + 1:end].split(",") if end > 0 else []
+		if not bounds or not all(bound.strip().isdigit() or bound.strip() == "" for bound in bounds) or len(bounds) > 2:
+			# Not a quantifier, but a literal brace.
+			return None, position
+		if len(bounds) == 1:
+			kind = "fixed"
+		elif bounds[1].strip() == "":
+			kind = "unbounded"
+		else:
+			kind = "fixed" if bounds[0].strip() == bounds[1].strip() else "bounded"
+		position = end + 1
+	else:
+		return None, position
+	# Skipping the lazy and possessive modifiers
+	if position < len(pattern) and pattern[position] in "?+":
+		position += 1
+	return kind, position
+
+
+# Skips the extension syntax at the start of a group, such as '?:' or '?<!'.
+# Parameters:
+# pattern: the pattern
+# position: the position right after the opening parenthesis
+# Returns: a tuple of whether the group is a lookbehind and the position of the first character of its contents
+def read_group_start(pattern, position):
+	if not pattern.startswith("?", position):
+		return False, position
+	position += 1
+	if pattern.startswith(("<=", "<!"), position):
+		return True, position + 2
+	if pattern.startswith(("<", "P<"), position):
+		return False, pattern.find(">", position) + 1 or len(pattern)
+	if position < len(pattern) and pattern[position] in ":=!>|":
+		return False, position + 1
+	# Inline flags, possibly scoped to the contents of the group
+	while position < len(pattern) and pattern[position] not in ":)":
+		position += 1
+	return False, position + 1 if pattern.startswith(":", position) else position
+
+
+# Analyzes a pattern for constructs that are prone to catastrophic backtracking.
+# This is a conservative, syntactic check: it reports quantified groups that contain unbounded quantifiers,
+# and lookbehind assertions whose length is not fixed.
+# Parameters:
+# pattern: the pattern to analyze
+# Returns: a list of the problems found, as strings
+def analyze(pattern):
+	problems = []
+	groups = [GroupState(0, False)]
+	position = 0
+	while position < len(pattern):
+		char = pattern[position]
+		group = None
+		if char == "\\":
+			position += 2
+			# Skipping the braces of escapes such as \p{L} or \x{263a}
+			if pattern[position - 1:position] in ("p", "P", "N", "x") and pattern.startswith("{", position):
+				position = pattern.find("}", position) + 1 or len(pattern)
+		elif char == "[":
+			position += 1
+			if pattern.startswith("^", position):
+				position += 1
+			if pattern.startswith("]", position):
+				position += 1
+			while position < len(pattern) and pattern[position] != "]":
+				position += 2 if pattern[position] == "\\" else 1
+			position += 1
+		elif char == "(":
+			start = position
+			(lookbehind, position) = read_group_start(pattern, position + 1)
+			groups.append(GroupState(start, lookbehind))
+			continue
+		elif char == ")" and len(groups) > 1:
+			group = groups.pop()
+			position += 1
+		else:
+			position += 1
+		(kind, position) = read_quantifier(pattern, position)
+		current = groups[-1]
+		if group is not None:
+			if kind == "unbounded" and group.unbounded:
+				problems.append("nested quantifiers in the group at position " + str(group.position))
+			if group.lookbehind and (group.unbounded or group.variable):
+				problems.append("variable-length lookbehind at position " + str(group.position))
+			current.unbounded |= group.unbounded
+			current.variable |= group.variable
+		if kind == "unbounded":
+			current.unbounded = True
+			current.variable = True
+		elif kind == "bounded":
+			current.variable = True
+	return problems
+
+
+# The replacements of the escapes that can match a line feed, outside of character classes.
+line_escapes = {"s": "[^\\S\\n]", "W": "[^\\w\\n]", "D": "[^\\d\\n]"}
+# The escapes that are kept as they are. None of them can match a line feed.
+kept_escapes = set("wdSbBt0123456789")
+
+
+# Converts a pattern that is matched against single lines to a pattern that is matched against many lines at once,
+# joined by line feeds. No part of the converted pattern can match a line feed, and '^' and '$' match at the line
+# boundaries, so it finds the same first match in each line as the original pattern does in the line alone.
+# Parameters:
+# pattern: the pattern
+# Returns: the converted pattern, or None if the pattern uses a construct that is not supported
+def to_multiline(pattern):
+	body = line_body(pattern)
+	return None if body is None else "(?m)" + body
+
+
+# Converts a pattern that is matched against single lines to a part of a larger pattern that is matched against
+# many lines at once, the same way as to_multiline, but without the flag that makes '^' and '$' match at the line
+# boundaries. The larger pattern has to set that flag itself.
+# Parameters:
+# pattern: the pattern
+# Returns: the converted pattern, or None if the pattern uses a construct that is not supported
+def line_body(pattern):
+	output = []
+	position = 0
+	while position < len(pattern):
+		char = pattern[position]
+		if char == "\\":
+			escape = pattern[position + 1:position + 2]
+			if escape in line_escapes:
+				output.append(line_escapes[escape])
+			elif escape in kept_escapes or (escape and not escape.isalnum()):
+				output.append("\\" + escape)
+			else:
+				return None
+			position += 2
+		elif char == "[":
+			end = position + 1
+			negated = pattern.startswith("^", end)
+			if negated:
+				end += 1
+			if pattern.startswith("]", end):
+				end += 1
+			while end < len(pattern) and pattern[end] != "]":
+				if pattern[end] == "\\":
+					# Positive classes with escapes that match line feeds are not supported.
+					if not negated and pattern[end + 1:end + 2] in ("s", "W", "D", "n", "x", "p", "P", "N", "u", "U"):
+						return None
+					end += 2
+				else:
+					end += 1
+			if end >= len(pattern):
+				return None
+			# Negated classes match line feeds, unless they are excluded explicitly.
+			output.append(pattern[position:end] + ("\\n" if negated else "") + "]")
+			position = end + 1
+		elif char == "(" and pattern.startswith("?", position + 1) and pattern[position + 2:position + 3].isalpha() \
+				and not pattern.startswith("P<", position + 2):
+			# Inline flags could change what '.', '^' and '$' match.
+			return None
+		else:
+			output.append(char)
+			position += 1
+	return "".join(output)
+
+
+# Prints the problems of the specified patterns to the standard error stream.
+# Parameters:
+# rules: a list of (rule name, pattern) tuples
+# No return value.
+def warn_about_patterns(rules):
+	for (name, pattern) in rules:
+		for problem in analyze(pattern):
+			print("Warning: " + name + ": " + problem + " of the pattern '" + pattern + "' may cause excessive backtracking.", file=sys.stderr)
@@ -0,0 +1,193 @@
+# style_watch.py
+# Copyright (c) 2026 by the Endless Sky contributors
+#
+# Endless Sky is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later version.
+#
+# Endless Sky is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+
+# Watch mode of the style checker scripts: waits for files to be saved, and checks them again.
+# On Linux, changes are detected with inotify. Elsewhere, or if inotify is not available, the modification times
+# of the files are polled instead.
+
+# The inotify events that indicate that a file was saved. Editors often save by renaming a temporary file,
+# so the directories of the files are watched, instead of the files themselves.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+# The size of the fixed part of an inotify event: wd, mask, cookie and len.
+event_header = struct.Struct("iIII")
+
+# The interval of polling for changes, in seconds.
+default_interval = 0.5
+# The time to wait for further events after a change, so that a save touching several files is handled at once.
+settle_time = 0.05
+
+
+# Opens an inotify instance watching the specified directories.
+# Parameters:
+# directories: the directories to watch
+# Returns: a tuple of the inotify file descriptor and a dict of the directory of each watch descriptor,
+# or None if inotify is not available
+def open_inotify(directories):
+	if not sys.platform.startswith("linux"):
+		return None
+	# Imported here, since ctypes is slow to import, and only needed in watch mode.
+	import ctypes
+	import ctypes.util
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+		fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+	except (OSError, AttributeError):
+		return None
+	if fd < 0:
+		return None
+	watches = {}
+	for directory in directories:
+		wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+		if wd < 0:
+			# Running out of watches, for example; polling still works.
+			os.close(fd)
+			return None
+		watches[wd] = directory
+	return fd, watches
+
+
+# A class that waits for changes to a fixed set of files.
+# Only changes to the contents count: saving a file without changing it is ignored.
+# files: the paths of the files to watch
+# interval: the polling interval, if inotify is not available
+class FileWatcher(object):
+
+	def __init__(self, files, interval=default_interval):
+		# The watched paths, keyed by their absolute path.
+		self.files = {os.path.abspath(file): file for file in files}
+		self.interval = interval
+		# The digest of the contents of each file, and its modification time and size.
+		self.digests = {}
+		self.stats = {}
+		for path in self.files:
+			self.refresh(self.files[path])
+		inotify = open_inotify(sorted({os.path.dirname(path) for path in self.files}))
+		(self.fd, self.watches) = inotify if inotify is not None else (None, {})
+
+	# Checks whether the watcher uses inotify, as opposed to polling.
+	# Takes no parameters.
+	# Returns: true if inotify is used
+	def uses_inotify(self):
+		return self.fd is not None
+
+	# Records the current contents of a file, so that they are not reported as a change.
+	# This should be called after the file was rewritten by the checker itself.
+	# Parameters:
+	# file: the path of the file
+	# Returns: true if the contents changed since the last time they were recorded
+	def refresh(self, file):
+		path = os.path.abspath(file)
+		try:
+			stat = os.stat(path)
+			with open(path, "rb") as f:
+				digest = hashlib.sha256(f.read()).digest()
+		except OSError:
+			stat = None
+			digest = None
+		self.stats[path] = None if stat is None else (stat.st_mtime_ns, stat.st_size)
+		changed = self.digests.get(path) != digest
+		self.digests[path] = digest
+		return changed
+
+	# Reads the pending inotify events.
+	# Takes no parameters.
+	# Returns: the set of absolute paths that were touched
+	def read_events(self):
+		paths = set()
+		while True:
+			try:
+				buffer = os.read(self.fd, 65536)
+			except BlockingIOError:
+				return paths
+			offset = 0
+			while offset + event_header.size <= len(buffer):
+				(wd, mask, cookie, length) = event_header.unpack_from(buffer, offset)
+				name = buffer[offset + event_header.size:offset + event_header.size + length].rstrip(b"\0")
+				offset += event_header.size + length
+				if wd in self.watches and name:
+					paths.add(os.path.join(self.watches[wd], os.fsdecode(name)))
+
+	# Finds the watched files whose modification time or size changed.
+	# Takes no parameters.
+	# Returns: the set of absolute paths that were touched
+	def poll(self):
+		paths = set()
+		for path in self.files:
+			try:
+				stat = os.stat(path)
+				current = (stat.st_mtime_ns, stat.st_size)
+			except OSError:
+				current = None
+			if current != self.stats[path]:
+				paths.add(path)
+		return paths
+
+	# Waits until the contents of at least one watched file change.
+	# Takes no parameters.
+	# Returns: the sorted list of the changed files, as they were passed to the constructor
+	def wait(self):
+		while True:
+			if self.fd is not None:
+				select.select([self.fd], [], [])
+				time.sleep(settle_time)
+				touched = self.read_events()
+			else:
+				time.sleep(self.interval)
+				touched = self.poll()
+			changed = [self.files[path] for path in touched if path in self.files and self.refresh(self.files[path])]
+			if changed:
+				return sorted(changed)
+
+	# Stops watching the files.
+	# Takes no parameters and has no return value.
+	def close(self):
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
+
+
+# Checks files again whenever they change, until interrupted.
+# The status messages are written to the standard error stream, so that they do not mix with machine-readable output.
+# Parameters:
+# files: the paths of the files to watch
+# check: a function that checks a single file and prints its result
+# No return value.
+def watch(files, check):
+	watcher = FileWatcher(files)
+	print("Watching " + str(len(files)) + (" file" if len(files) == 1 else " files") + " for changes"
+		+ (" with inotify" if watcher.uses_inotify() else "") + ". Press Ctrl+C to stop.", file=sys.stderr)
+	try:
+		while True:
+			for file in watcher.wait():
+				start = time.perf_counter()
+				check(file)
+				sys.stdout.flush()
+				# Auto-correction may have rewritten the file.
+				watcher.refresh(file)
+				print("Checked " + file + " in " + str(round((time.perf_counter() - start) * 1000)) + " ms.", file=sys.stderr)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		watcher.close()